@@ -0,0 +1,373 @@
+"""
+Allocates the seats of every section among a whole cohort of students.
+
+batch.py solves every student on their own, so a popular section is
+recommended to everyone who rated it, however few seats it has. Here the
+schedules are chosen together: the total rating of all of the students is
+maximized while no section gets more students than it has seats left
+(courseSeatsTotal - courseSeatsFilled in the catalog, sections without a
+seat count are not limited).
+
+One model for thousands of students would be far too big, so the seats
+are priced instead (Lagrangian relaxation). Given a price for every
+section, every student is solved on their own with the price taken off
+the rating of each section, in parallel across worker processes. Then
+the price of every section that got more students than it has seats goes
+up, and the price of a section with seats to spare goes down (never below
+zero), with steps that get smaller every iteration. The priced total
+plus the price of every seat is an upper bound on the best allocation.
+
+The schedules of the last iteration usually still put a few too many
+students in some sections. These are repaired: the students who rated an
+oversubscribed section the highest keep it, the others are solved again
+without it, until every section fits.
+
+Input and output are in the format of batch.py, with a summary of the
+allocation (total rating, upper bound, iterations) written to stderr.
+
+Usage:
+    python allocation.py students.jsonl [results.jsonl] [--workers N]
+        [--iterations N] [--time-limit SECONDS]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import anytime
+import batch
+import catalog
+import config
+
+# Chunks of students handed to every worker per iteration
+CHUNKS_PER_WORKER = 4
+
+
+def seat_capacities(students):
+    """
+    Returns a dictionary from every section some student is interested
+    in to the seats it has left, leaving out sections without a limit.
+    """
+    course_catalog = catalog.get_catalog()
+    capacities = {}
+    for data in students:
+        for course in data[0]:
+            if course not in capacities:
+                section = course_catalog.section(course)
+                if section.seats_total > 0:
+                    capacities[course] = max(
+                        section.seats_total - section.seats_filled, 0
+                    )
+    return capacities
+
+
+########## WORKERS ##############
+
+# Optimizer inputs of the students, sent to every worker once
+_students = None
+
+
+def _init_worker(students):
+    global _students
+    batch._init_worker()
+    _students = students
+
+
+def _priced_input(data, prices, banned):
+    set_courses, courses_cost, *requirements = data
+    courses = {course for course in set_courses if course not in banned}
+    priced = {
+        course: courses_cost[course] - prices.get(course, 0.0) for course in courses
+    }
+    return (courses, priced, *requirements)
+
+
+def _solve_chunk(indices, prices, bans, time_limit):
+    """
+    Solves the given students with priced ratings. Returns a list of
+    (index, status, selected courses, upper bound of the priced value).
+    """
+    import optimizer
+
+    solved = []
+    for i in indices:
+        data = _priced_input(_students[i], prices, bans.get(i, ()))
+        # Straight to the engine: priced problems are never asked twice, so
+        # they would only push useful entries out of the solution cache
+        engine = optimizer.get_engine(optimizer.resolve_engine(None, data[0]))
+        report = engine.solve_anytime(data, time_limit, 0.0, None)
+        courses = [course for course, _ in report["courses"] or []]
+        solved.append((i, report["status"], courses, report["bound"]))
+    return solved
+
+
+########## ALLOCATION ##############
+
+
+class Allocation:
+    def __init__(self, students, executor, workers, time_limit):
+        self.students = students
+        self.executor = executor
+        self.workers = workers
+        self.time_limit = time_limit
+        self.capacities = seat_capacities(students)
+        # student index -> sections they may not take
+        self.bans = defaultdict(set)
+        # Sections without any seat left are out for everyone from the start
+        full = {course for course, seats in self.capacities.items() if seats == 0}
+        for i, data in enumerate(students):
+            if full & data[0]:
+                self.bans[i] |= full & data[0]
+        # student index -> (status, selected courses)
+        self.schedules = {}
+        # (total rating, schedules) of the best allocation that fit the
+        # seats while pricing them
+        self.best = None
+
+    def solve(self, indices, prices):
+        """
+        Solves the given students with priced ratings, updating their
+        schedules. Returns the sum of the upper bounds of their priced
+        values, or None if some of them have none.
+        """
+        indices = sorted(indices)
+        size = max(1, math.ceil(len(indices) / (self.workers * CHUNKS_PER_WORKER)))
+        chunks = [indices[i : i + size] for i in range(0, len(indices), size)]
+        futures = [
+            self.executor.submit(
+                _solve_chunk,
+                chunk,
+                prices,
+                {i: self.bans[i] for i in chunk if self.bans.get(i)},
+                self.time_limit,
+            )
+            for chunk in chunks
+        ]
+        bound = 0.0
+        for future in futures:
+            for i, status, courses, student_bound in future.result():
+                self.schedules[i] = (status, courses)
+                if status == anytime.INFEASIBLE:
+                    # Not part of the allocation, whatever the prices
+                    continue
+                if student_bound is None or bound is None:
+                    bound = None
+                else:
+                    bound += student_bound
+        return bound
+
+    def demand(self):
+        # section -> indices of the students whose schedule has it
+        holders = defaultdict(list)
+        for i, (_, courses) in self.schedules.items():
+            for course in courses:
+                holders[course].append(i)
+        return holders
+
+    def oversubscribed(self):
+        return {
+            course: students
+            for course, students in self.demand().items()
+            if len(students) > self.capacities.get(course, math.inf)
+        }
+
+    def value(self):
+        # Total rating of the current schedules, without prices
+        return sum(
+            self.students[i][1][course]
+            for i, (_, courses) in self.schedules.items()
+            for course in courses
+        )
+
+    def price(self, iterations, step):
+        """
+        Prices the seats for up to the given number of iterations. Returns
+        the prices, the lowest upper bound found on the total rating and the
+        history of the iterations.
+        """
+        prices = {}
+        best_bound = None
+        history = []
+        everyone = range(len(self.students))
+        for iteration in range(iterations):
+            start = time.perf_counter()
+            bound = self.solve(everyone, prices)
+            holders = self.demand()
+            if bound is not None:
+                bound += sum(
+                    prices[course] * self.capacities[course] for course in prices
+                )
+                best_bound = bound if best_bound is None else min(best_bound, bound)
+
+            # Students more than seats, for the sections that matter
+            excess = {
+                course: len(holders.get(course, ())) - seats
+                for course, seats in self.capacities.items()
+                if len(holders.get(course, ())) > seats or prices.get(course)
+            }
+            oversubscribed = sum(1 for students in excess.values() if students > 0)
+            value = self.value()
+            if not oversubscribed and (self.best is None or value > self.best[0]):
+                self.best = (value, dict(self.schedules))
+            history.append(
+                {
+                    "iteration": iteration,
+                    "value": value,
+                    "bound": bound,
+                    "oversubscribed": oversubscribed,
+                    "seconds": round(time.perf_counter() - start, 6),
+                }
+            )
+            if not oversubscribed and best_bound is not None:
+                if best_bound - value <= 1e-6 * max(abs(value), 1.0):
+                    # Proven to be the best allocation
+                    break
+            if not excess:
+                break
+
+            # Steps get smaller every iteration, and are relative to the
+            # section with the most students too many (or seats to spare)
+            largest = max(abs(students) for students in excess.values()) or 1
+            size = step / math.sqrt(iteration + 1)
+            for course, students in excess.items():
+                prices[course] = max(
+                    0.0, prices.get(course, 0.0) + size * students / largest
+                )
+            prices = {course: price for course, price in prices.items() if price > 0}
+        return prices, best_bound, history
+
+    def repair(self, prices):
+        """
+        Takes students out of oversubscribed sections until every section
+        fits, the students who rated a section the highest keeping it.
+        Returns the number of rounds it took.
+        """
+        rounds = 0
+        while True:
+            oversubscribed = self.oversubscribed()
+            if not oversubscribed:
+                return rounds
+            rounds += 1
+            resolve = set()
+            for course, students in oversubscribed.items():
+                ranked = sorted(
+                    students, key=lambda i: (-self.students[i][1][course], i)
+                )
+                for i in ranked[self.capacities[course] :]:
+                    self.bans[i].add(course)
+                    resolve.add(i)
+            self.solve(resolve, prices)
+
+
+def allocate(
+    students,
+    workers=config.BATCH_WORKERS,
+    iterations=config.ALLOCATION_ITERATIONS,
+    step=config.ALLOCATION_PRICE_STEP,
+    time_limit=config.SOLVE_TIME_LIMIT_SECONDS,
+):
+    """
+    students is a list of optimizer inputs. Returns (a list of (status,
+    selected courses) for every student, a summary of the allocation).
+    """
+    start = time.perf_counter()
+    # Compiled here if needed, so the workers only ever map it
+    catalog.get_catalog()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(students,),
+    ) as executor:
+        allocation = Allocation(students, executor, workers, time_limit)
+        prices, bound, history = allocation.price(iterations, step)
+        oversubscribed = len(allocation.oversubscribed())
+        rounds = allocation.repair(prices)
+
+    value = allocation.value()
+    schedules = allocation.schedules
+    if allocation.best is not None and allocation.best[0] > value:
+        value, schedules = allocation.best
+    summary = {
+        "students": len(students),
+        "limited_sections": len(allocation.capacities),
+        "iterations": len(history),
+        "value": value,
+        "bound": bound,
+        "gap": anytime.relative_gap(value, bound),
+        "oversubscribed_before_repair": oversubscribed,
+        "repair_rounds": rounds,
+        "seconds": round(time.perf_counter() - start, 6),
+        "history": history,
+    }
+    return [
+        schedules.get(i, (anytime.UNKNOWN, [])) for i in range(len(students))
+    ], summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSONL file with one student per line")
+    parser.add_argument("output", nargs="?", help="JSONL file to write results to")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS)
+    parser.add_argument("--iterations", type=int, default=config.ALLOCATION_ITERATIONS)
+    parser.add_argument("--step", type=float, default=config.ALLOCATION_PRICE_STEP)
+    parser.add_argument(
+        "--time-limit", type=float, default=config.SOLVE_TIME_LIMIT_SECONDS
+    )
+    args = parser.parse_args()
+
+    # Every student has to be known before any of them can be solved
+    students = []
+    lines = []
+    errors = []
+    with open(args.input) as input_file:
+        for line_number, line in enumerate(input_file, 1):
+            if not line.strip():
+                continue
+            try:
+                student = json.loads(line)
+                students.append(batch.to_optimizer_input(student))
+                lines.append((student.get("id", line_number), line_number))
+            except (ValueError, AttributeError, TypeError) as error:
+                errors.append(
+                    {"id": line_number, "line": line_number, "error": str(error)}
+                )
+
+    schedules, summary = allocate(
+        students, args.workers, args.iterations, args.step, args.time_limit
+    )
+
+    course_catalog = catalog.get_catalog()
+    output_file = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for error in errors:
+            output_file.write(json.dumps(error) + "\n")
+        for (student_id, line_number), data, (status, courses) in zip(
+            lines, students, schedules
+        ):
+            result = {
+                "id": student_id,
+                "line": line_number,
+                "status": status,
+                "value": sum(data[1][course] for course in courses),
+                "courses": [
+                    [course, course_catalog.name(course_catalog.index(course))]
+                    for course in sorted(courses)
+                ],
+            }
+            output_file.write(json.dumps(result) + "\n")
+    finally:
+        if args.output:
+            output_file.close()
+    print(json.dumps(summary, indent=4), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
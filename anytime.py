@@ -0,0 +1,52 @@
+"""
+Reports of solves that may stop before the best schedule is proven.
+
+Every engine's solve_anytime() stops once its time limit runs out or the
+schedule it found is within the relative gap limit of the best possible
+one, and describes the outcome with a report:
+
+    status: OPTIMAL (proven, within the gap limit), FEASIBLE (a schedule
+            was found but the time ran out before it could be proven),
+            INFEASIBLE or UNKNOWN (the time ran out before any schedule
+            was found)
+    value, courses: the best schedule found, in the format of optimizer()
+    bound: no schedule can have a higher total rating than this
+    gap: relative difference between the value and the bound
+    elapsed: seconds the solve took
+"""
+
+OPTIMAL = "OPTIMAL"
+FEASIBLE = "FEASIBLE"
+INFEASIBLE = "INFEASIBLE"
+UNKNOWN = "UNKNOWN"
+
+
+def relative_gap(value, bound):
+    if value is None or bound is None:
+        return None
+    return max(bound - value, 0.0) / max(abs(value), 1.0)
+
+
+def report(status, value=None, courses=None, bound=None, gap_limit=0.0, elapsed=0.0):
+    """
+    Builds a report. A schedule found within the gap limit of the bound is
+    OPTIMAL whatever status is given.
+    """
+    gap = relative_gap(value, bound)
+    if status == FEASIBLE and gap is not None and gap <= gap_limit + 1e-9:
+        status = OPTIMAL
+    return {
+        "status": status,
+        "value": value,
+        "courses": courses,
+        "bound": bound,
+        "gap": gap,
+        "elapsed": elapsed,
+    }
+
+
+def as_result(report):
+    # The format optimizer() has always returned
+    if report["status"] in (OPTIMAL, FEASIBLE):
+        return (report["value"], report["courses"])
+    return [("Status: ", report["status"])]
@@ -1,26 +1,33 @@
-import pandas as pd
-import numpy as np
 import json
+import time
+import uuid
 from time import sleep
 
 from random import randint, seed
 
 import dash
+import flask
 from dash.exceptions import PreventUpdate
-from dash.dependencies import Input, Output, State
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import dash_table
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_bootstrap_components as dbc
 from dash import no_update
 
+import catalog
+import config
+import jobs
+import metrics
 import optimizer
+import schedule_store
 
 # Variable used within the HTML:
 requirements_df_columns = ["Total Number of Courses", "Req/Constraint 1"]
-requirements_template_df = pd.DataFrame(
-    np.zeros((13, len(requirements_df_columns))), columns=requirements_df_columns
-)
+# 13 rows of zeros (kept as plain records so pandas isn't needed at import)
+requirements_template_records = [
+    {column: 0.0 for column in requirements_df_columns} for _ in range(13)
+]
 
 
 # Just for Debugging NOTE: Remove Later
@@ -53,9 +60,213 @@ FONT_AWESOME = (
     "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css"
 )
 
+# bgValues = [222, 236, 250]  # blueish
+bgValues = [191, 245, 202]  # greenish
+# bgValues = [0, 0, 0]
+bgString = f"rgb{bgValues[0], bgValues[1], bgValues[2]}"
+
+
+table1Height = "700px"
+table1Width = "1000px"
+table1FontSize = 30
+
+table2Height = "auto"
+table2Width = "1000px"
+table2FontSize = 30
+
+
+def ratings_tables():
+    # The tables of the ratings and requirements, filled in once the
+    # HyperSchedule JSON is pasted
+    courses_datatable = dash_table.DataTable(
+        id="courses-table",
+        columns=[
+            {"name": i, "id": i, "editable": j}
+            for i, j in [
+                ("Course Code", False),
+                ("Course Name", False),
+                ("Rating", True),
+                ("Conflicts With", False),
+            ]
+        ],
+        data=[],
+        sort_action="native",
+        sort_mode="single",
+        column_selectable="multi",
+        row_selectable="multi",
+        selected_rows=[],
+        page_action="native",
+        style_header={"backgroundColor": "rgb(30, 30, 30)", "color": "white"},
+        style_table={
+            "height": table1Height,
+            "width": table1Width,
+            "overflowY": "auto",
+        },
+        style_cell={
+            "backgroundColor": bgString,
+            "color": "black",
+            "overflow": "hidden",
+            "textOverflow": "ellipsis",
+            "textAlign": "left",
+            "fontSize": table1FontSize,
+        },
+        style_data_conditional=[
+            {
+                "if": {"column_id": "Rating"},
+                "backgroundColor": "#32a893",
+                "color": "white",
+                "text-align": "center",
+            },
+            {
+                "if": {"state": "active"},
+                "backgroundColor": "rgb(200, 200, 200)",
+                "border": "1px solid rgb(0, 116, 217)",
+            },
+            {
+                "if": {"state": "selected"},
+                "backgroundColor": "rgb(200, 200, 200)",
+                "border": "1px solid rgb(0, 116, 217)",
+            },
+        ],
+    )
+
+    requirements_table = dash_table.DataTable(
+        id="requirements-table",
+        columns=[
+            {"name": i, "id": i, "deletable": True} for i in requirements_df_columns
+        ],
+        data=requirements_template_records,
+        editable=True,
+        page_action="none",
+        style_header={"backgroundColor": "rgb(30, 30, 30)", "color": "white"},
+        # style_data={
+        #     'height': 'auto'
+        # },
+        style_cell={
+            "backgroundColor": bgString,
+            "color": "black",
+            "whiteSpace": "normal",
+            "minWidth": "250px",
+            # 'maxWidth': '200px',
+            "width": "250px",
+            "height": "auto",
+            "textAlign": "center",
+            "fontSize": table2FontSize,
+        },
+        style_table={
+            "height": table2Height,
+            "width": table2Width,
+            "overflowY": "auto",
+            "overflowX": "auto",
+        },
+    )
+
+    final_button = dbc.Button(
+        id="submit-button-2",
+        type="submit",
+        children="Calculate the Optimal Course Schedule!",
+        size="lg",
+        color="primary",
+        className="mr-1",
+        # style={"width": "600px", "height": "100px"}
+    )
+
+    add_col_button = dbc.Button(
+        "Add Requirement",
+        id="adding-cols-button",
+        color="success",
+        className="mr-1",
+        size="rg",
+        style={"marginLeft": 75, "fontSize": 25},
+    )
+
+    rating_instructions_modal = html.Div(
+        [
+            dbc.Button("Open", id="open-centered"),
+            dbc.Modal(
+                [
+                    dbc.ModalHeader("Header"),
+                    dbc.ModalBody("This modal is vertically centered"),
+                    dbc.ModalFooter(
+                        dbc.Button("Close", id="close-centered", className="ml-auto")
+                    ),
+                ],
+                id="modal-centered",
+                centered=True,
+            ),
+        ]
+    )
+
+    requirement_instructions_modal = html.Div(
+        [
+            dbc.Button("Open", id="open-centered-2"),
+            dbc.Modal(
+                [
+                    dbc.ModalHeader("Header"),
+                    dbc.ModalBody("This modal is vertically centered"),
+                    dbc.ModalFooter(
+                        dbc.Button("Close", id="close-centered", className="ml-auto")
+                    ),
+                ],
+                id="modal-centered-2",
+                centered=True,
+            ),
+        ]
+    )
+
+    return [
+        dbc.Row(
+            [
+                html.H2(
+                    "Enter Your Course Ratings:     ",
+                    style={
+                        "textAlign": "center",
+                    },
+                ),
+                dbc.Button(
+                    [html.I(className="fa fa-question-circle"), ""],
+                    color="info",
+                    style={"marginLeft": 75},
+                ),
+            ],
+            justify="center",
+            align="center",
+            style={"marginTop": 50},
+        ),
+        dbc.Row([courses_datatable], align="center", justify="center"),
+        dbc.Row(
+            [
+                html.H2("Requirements: ", style={"fontSize": 45}),
+                add_col_button,
+                dbc.Button(
+                    [html.I(className="fa fa-question-circle"), ""],
+                    color="info",
+                    style={"marginLeft": 150},
+                ),
+            ],
+            justify="center",
+            align="center",
+            style={"marginTop": 50},
+        ),
+        dbc.Row(
+            [requirements_table],
+            justify="center",
+            align="center",
+        ),
+        dbc.Row(
+            dbc.Col(
+                [final_button],
+                width={"size": 6, "offset": 2},
+                style={"marginTop": 50},
+            ),
+            justify="center",
+        ),
+    ]
+
+
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LITERA, FONT_AWESOME])
 
-app.layout = html.Div(
+main_layout = html.Div(
     [
         # Website Header and Sub Header
         dbc.Container(
@@ -126,13 +337,39 @@ app.layout = html.Div(
         # Two DataTables - Ratings and Alternates
         html.Div(
             [
+                html.Div(id="paste-error", style={"textAlign": "center"}),
+                html.Div(ratings_tables(), id="ratings-div", style={"display": "none"}),
+                # The pasted courses stay in the browser, only their codes
+                # are sent to find_conflicts()
+                dcc.Store(id="pasted-courses"),
+                dcc.Store(id="pasted-codes"),
+                dcc.Store(id="course-conflicts"),
+                dcc.Store(id="calculate-request"),
+            ],
+            id="datatables-div",
+        ),
+        # Progress of the optimization job (see jobs.py)
+        html.Div(
+            [
+                html.Div(id="job-status"),
                 dbc.Row(
-                    id="datatables-row",
-                    style={"marginLeft": 50, "marginTop": 35, "marginRight": 25},
+                    dbc.Button(
+                        "Cancel",
+                        id="cancel-job-button",
+                        color="secondary",
+                        style={"marginTop": 15},
+                    ),
                     justify="center",
-                )
+                ),
+                dcc.Interval(
+                    id="job-interval",
+                    interval=config.JOB_POLL_INTERVAL_MS,
+                    disabled=True,
+                ),
+                dcc.Store(id="job-id"),
             ],
-            id="datatables-div",
+            id="job-status-div",
+            style={"display": "none"},
         ),
         # Final Optimized Course Selection
         html.Div(
@@ -156,380 +393,462 @@ app.layout = html.Div(
         ),
     ]
 )
-# bgValues = [222, 236, 250]  # blueish
-bgValues = [191, 245, 202]  # greenish
-# bgValues = [0, 0, 0]
-bgString = f"rgb{bgValues[0], bgValues[1], bgValues[2]}"
 
 
-table1Height = "700px"
-table1Width = "1000px"
-table1FontSize = 30
+def serve_layout():
+    # Called on every page load, so every visitor gets their own session id.
+    # It is used to keep their model around for faster re-solves.
+    return html.Div([dcc.Store(id="session-id", data=str(uuid.uuid4())), main_layout])
 
-table2Height = "auto"
-table2Width = "1000px"
-table2FontSize = 30
 
+app.layout = serve_layout
 
-@app.callback(
-    [Output("textarea-div", "style"), Output("datatables-div", "children")],
+########## PASTE STEP ##############
+
+# The pasted HyperSchedule JSON is parsed in the browser (see
+# assets/paste.js), which fills in the tables itself: only the course codes
+# are sent here to look up their conflicts.
+app.clientside_callback(
+    ClientsideFunction(namespace="paste", function_name="parse"),
+    [
+        Output("textarea-div", "style"),
+        Output("ratings-div", "style"),
+        Output("pasted-courses", "data"),
+        Output("pasted-codes", "data"),
+        Output("paste-error", "children"),
+    ],
     [Input("submit-button", "n_clicks")],
     [State("textarea-example", "value")],
 )
-def update_output(clicks, input_value):
-    if clicks is not None:
-        # print("Hello")
-        # print(clicks)
-        hyperschedule_input = json.loads(input_value)
-        data = []
-
-        for course in hyperschedule_input:
-            courses_costs = {}
-            courseCode = course["courseCode"]
-            courses_costs["Course Code"] = courseCode
-            courses_costs["Course Name"] = course["courseName"]
-            if False:  # courseCode in course_ratings_dict: # TODO: Change this
-                courses_costs["Rating"] = course_ratings_dict[courseCode]
-            else:
-                courses_costs["Rating"] = 0
-
-            data.append(courses_costs)
-
-        selectable_columns = [i for i in range(len(data))]
-
-        courses_datatable = dash_table.DataTable(
-            id="courses-table",
-            columns=[
-                {"name": i, "id": i, "editable": j}
-                for i, j in [
-                    ("Course Code", False),
-                    ("Course Name", False),
-                    ("Rating", True),
-                ]
-            ],
-            data=data,
-            sort_action="native",
-            sort_mode="single",
-            column_selectable="multi",
-            row_selectable="multi",
-            selected_rows=selectable_columns,
-            page_action="native",
-            style_header={"backgroundColor": "rgb(30, 30, 30)", "color": "white"},
-            style_table={
-                "height": table1Height,
-                "width": table1Width,
-                "overflowY": "auto",
-            },
-            style_cell={
-                "backgroundColor": bgString,
-                "color": "black",
-                "overflow": "hidden",
-                "textOverflow": "ellipsis",
-                "textAlign": "left",
-                "fontSize": table1FontSize,
-            },
-            style_data_conditional=[
-                {
-                    "if": {"column_id": "Rating"},
-                    "backgroundColor": "#32a893",
-                    "color": "white",
-                    "text-align": "center",
-                },
-                {
-                    "if": {"state": "active"},
-                    "backgroundColor": "rgb(200, 200, 200)",
-                    "border": "1px solid rgb(0, 116, 217)",
-                },
-                {
-                    "if": {"state": "selected"},
-                    "backgroundColor": "rgb(200, 200, 200)",
-                    "border": "1px solid rgb(0, 116, 217)",
-                },
-            ],
-        )
 
-        requirements_table = dash_table.DataTable(
-            id="requirements-table",
-            columns=[
-                {"name": i, "id": i, "deletable": True}
-                for i in requirements_template_df.columns
-            ],
-            data=requirements_template_df.to_dict("records"),
-            editable=True,
-            page_action="none",
-            style_header={"backgroundColor": "rgb(30, 30, 30)", "color": "white"},
-            # style_data={
-            #     'height': 'auto'
-            # },
-            style_cell={
-                "backgroundColor": bgString,
-                "color": "black",
-                "whiteSpace": "normal",
-                "minWidth": "250px",
-                # 'maxWidth': '200px',
-                "width": "250px",
-                "height": "auto",
-                "textAlign": "center",
-                "fontSize": table2FontSize,
-            },
-            style_table={
-                "height": table2Height,
-                "width": table2Width,
-                "overflowY": "auto",
-                "overflowX": "auto",
-            },
-        )
 
-        final_button = dbc.Button(
-            id="submit-button-2",
-            type="submit",
-            children="Calculate the Optimal Course Schedule!",
-            size="lg",
-            color="primary",
-            className="mr-1"
-            # style={"width": "600px", "height": "100px"}
-        )
+@app.callback(Output("course-conflicts", "data"), [Input("pasted-codes", "data")])
+def find_conflicts(codes):
+    """
+    Returns, for every pasted course, the positions in codes of the pasted
+    courses it can't be taken with, in the order of their codes. They are
+    looked up in the catalog's interval index (courses of different halves
+    of the semester don't conflict).
+    """
+    if codes is None:
+        raise PreventUpdate
+    with metrics.phase("find_conflicts"):
+        course_catalog = catalog.get_catalog()
+        pasted = {}  # catalog index -> position in codes
+        for position, code in enumerate(codes):
+            if code in course_catalog:
+                pasted.setdefault(course_catalog.index(code), position)
+        interval_index = course_catalog.interval_index()
+        conflicts = []
+        for code in codes:
+            conflicting = ()
+            if code in course_catalog:
+                i = course_catalog.index(code)
+                conflicting = interval_index.conflicts_with(i)
+            conflicts.append(
+                sorted(
+                    (pasted[j] for j in conflicting if j in pasted),
+                    key=lambda position: codes[position],
+                )
+            )
+    return conflicts
 
-        add_col_button = dbc.Button(
-            "Add Requirement",
-            id="adding-cols-button",
-            color="success",
-            className="mr-1",
-            size="rg",
-            style={"marginLeft": 75, "fontSize": 25},
-        )
 
-        rating_instructions_modal = html.Div(
-            [
-                dbc.Button("Open", id="open-centered"),
-                dbc.Modal(
-                    [
-                        dbc.ModalHeader("Header"),
-                        dbc.ModalBody("This modal is vertically centered"),
-                        dbc.ModalFooter(
-                            dbc.Button(
-                                "Close", id="close-centered", className="ml-auto"
-                            )
-                        ),
-                    ],
-                    id="modal-centered",
-                    centered=True,
-                ),
-            ]
-        )
+app.clientside_callback(
+    ClientsideFunction(namespace="paste", function_name="fill_table"),
+    [Output("courses-table", "data"), Output("courses-table", "selected_rows")],
+    [Input("course-conflicts", "data")],
+    [State("pasted-courses", "data")],
+)
 
-        requirement_instructions_modal = html.Div(
-            [
-                dbc.Button("Open", id="open-centered-2"),
-                dbc.Modal(
-                    [
-                        dbc.ModalHeader("Header"),
-                        dbc.ModalBody("This modal is vertically centered"),
-                        dbc.ModalFooter(
-                            dbc.Button(
-                                "Close", id="close-centered", className="ml-auto"
-                            )
-                        ),
-                    ],
-                    id="modal-centered-2",
-                    centered=True,
-                ),
-            ]
-        )
+# Only the codes and ratings of the selected courses and the requirements
+# are sent when calculating
+app.clientside_callback(
+    ClientsideFunction(namespace="paste", function_name="request"),
+    Output("calculate-request", "data"),
+    [Input("submit-button-2", "n_clicks")],
+    [
+        State("courses-table", "derived_virtual_data"),
+        State("courses-table", "derived_virtual_selected_rows"),
+        State("requirements-table", "derived_virtual_data"),
+    ],
+)
 
-        return [
-            {"display": "none"},
-            [
-                dbc.Row(
-                    [
-                        html.H2(
-                            "Enter Your Course Ratings:     ",
-                            style={
-                                "textAlign": "center",
-                            },
-                        ),
-                        dbc.Button(
-                            [html.I(className="fa fa-question-circle"), ""],
-                            color="info",
-                            style={"marginLeft": 75},
-                        ),
-                    ],
-                    justify="center",
-                    align="center",
-                    style={"marginTop": 50},
-                ),
-                dbc.Row([courses_datatable], align="center", justify="center"),
-                dbc.Row(
-                    [
-                        html.H2("Requirements: ", style={"fontSize": 45}),
-                        add_col_button,
-                        dbc.Button(
-                            [html.I(className="fa fa-question-circle"), ""],
-                            color="info",
-                            style={"marginLeft": 150},
-                        ),
-                    ],
-                    justify="center",
-                    align="center",
-                    style={"marginTop": 50},
-                ),
-                dbc.Row(
-                    [requirements_table],
-                    justify="center",
-                    align="center",
-                ),
-                dbc.Row(
-                    dbc.Col(
-                        [final_button],
-                        width={"size": 6, "offset": 2},
-                        style={"marginTop": 50},
-                    ),
-                    justify="center",
-                ),
-            ],
-        ]
 
-    else:
-        return (no_update, no_update)
+def tables_to_optimizer_input(courses, requirements_table):
+    """
+    courses is a list of [course code, rating] of the selected rows of the
+    courses table (see paste.request() in assets/paste.js), and
+    requirements_table the rows of the requirements table.
+    """
+    # pandas is only needed once the user submits, not at import
+    import pandas as pd
 
+    requirements_df = pd.DataFrame.from_records(requirements_table)
 
-@app.callback(
-    [Output("datatables-div", "style"), Output("final-result", "children")],
-    [Input("submit-button-2", "n_clicks")],
-    [State("courses-table", "derived_virtual_data")],
-    [State("courses-table", "derived_virtual_selected_rows")],
-    [State("requirements-table", "derived_virtual_data")],
-)
-def update_output_2(clicks, courses_table, selected_course_row_ids, requirements_table):
-    if clicks is not None:
-        courses_df = pd.DataFrame(courses_table)
-        courses_df = courses_df.iloc[selected_course_row_ids]
-        courses_df.set_index("Course Code", inplace=True)
-        requirements_df = pd.DataFrame.from_records(requirements_table)
-
-        requirements_df = requirements_df.loc[(requirements_df != 0).any(axis=1)]
-
-        courses = courses_df.index.tolist()
-        set_courses = set(courses)
-
-        courses_cost = {}
-        for course in courses:
-            courses_cost[course] = float(courses_df.loc[course, "Rating"])
-
-        # Alternates
-        set_alternates = set()
-        alternates_dict = {}
-        lower_bounds = {}
-        upper_bounds = {}
-
-        for i in range(len(requirements_df.columns.tolist())):
-
-            # set alternates
-            curr_alt_id = "alternates" + str(i)
-            set_alternates.add(curr_alt_id)
-
-            # lower and upper bounds
-            curr_alt = requirements_df.iloc[:, i]
-            lower_bounds[curr_alt_id] = int(curr_alt[0])
-            upper_bounds[curr_alt_id] = int(curr_alt[1])
-
-            # alternates dict
-            if i == 0:
-                curr_alternates = [" "]
-
-            else:
-                curr_alternates = curr_alt[2:]
-                curr_alternates = [
-                    x for x in curr_alternates if (str(x) != "nan") and (str(x) != "0")
-                ]  # Note- will need to change later
-
-            alternates_dict[curr_alt_id] = curr_alternates
-
-        inputToOptimizer = (
-            set_courses,
-            courses_cost,
-            set_alternates,
-            alternates_dict,
-            lower_bounds,
-            upper_bounds,
-        )
+    requirements_df = requirements_df.loc[(requirements_df != 0).any(axis=1)]
+
+    set_courses = {course for course, _ in courses}
 
-        total_value, coursesChosenByOptimizer = optimizer.optimizer(inputToOptimizer)
+    courses_cost = {}
+    for course, rating in courses:
+        courses_cost[course] = float(rating)
 
-        # Helpful for Debugging:
-        # print(coursesChosenByOptimizer)
-        # print("Total Value: ", total_value)
+    # Alternates
+    set_alternates = set()
+    alternates_dict = {}
+    lower_bounds = {}
+    upper_bounds = {}
 
+    for i in range(len(requirements_df.columns.tolist())):
+
+        # set alternates
+        curr_alt_id = "alternates" + str(i)
+        set_alternates.add(curr_alt_id)
+
+        # lower and upper bounds
+        curr_alt = requirements_df.iloc[:, i]
+        lower_bounds[curr_alt_id] = int(curr_alt[0])
+        upper_bounds[curr_alt_id] = int(curr_alt[1])
+
+        # alternates dict
+        if i == 0:
+            curr_alternates = [" "]
+
+        else:
+            curr_alternates = curr_alt[2:]
+            curr_alternates = [
+                x for x in curr_alternates if (str(x) != "nan") and (str(x) != "0")
+            ]  # Note- will need to change later
+
+        alternates_dict[curr_alt_id] = curr_alternates
+
+    return (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    )
+
+
+def render_schedules(schedules, schedule_id=None):
+    if not schedules:
+        return dbc.Row(
+            html.H2("No combination of courses meets these requirements."),
+            justify="center",
+        )
+    total_value, coursesChosenByOptimizer = schedules[0]
+
+    # Helpful for Debugging:
+    # print(coursesChosenByOptimizer)
+    # print("Total Value: ", total_value)
+
+    with metrics.phase("hyperschedule_json"):
         hyperScheduleOutput = optimizer.courseToHyperScheduleFormat(
             coursesChosenByOptimizer
         )
 
         jsonOutput = json.dumps(hyperScheduleOutput)
 
-        modal = html.Div(
-            [
-                dbc.Button(
-                    "Input for HyperSchedule",
-                    id="open-scroll",
-                    className="mr-1",
-                    style={"fontSize": 30},
-                ),
-                # dbc.Button("Modal with scrollable body",
-                #            id="open-body-scroll"),
-                dbc.Modal(
+    modal = html.Div(
+        [
+            dbc.Button(
+                "Input for HyperSchedule",
+                id="open-scroll",
+                className="mr-1",
+                style={"fontSize": 30},
+            ),
+            # dbc.Button("Modal with scrollable body",
+            #            id="open-body-scroll"),
+            dbc.Modal(
+                [
+                    dbc.ModalHeader("Copy this and enter it into HyperSchedule"),
+                    dbc.ModalBody(jsonOutput),
+                    dbc.ModalFooter(
+                        dbc.Button(
+                            "Close",
+                            id="close-scroll",
+                            className="ml-auto",
+                            style={"fontSize": 30},
+                        )
+                    ),
+                ],
+                id="modal-scroll",
+                # size="sm"
+            ),
+        ]
+    )
+
+    colors = ["primary", "secondary", "success", "warning", "danger", "info"]
+
+    list_group = dbc.ListGroup(
+        [
+            dbc.ListGroupItem(
+                f"{coursesChosenByOptimizer[i][0]}: {coursesChosenByOptimizer[i][1]}",
+                color=colors[i % len(colors)],
+            )
+            for i in range(len(coursesChosenByOptimizer))
+        ],
+        style={"fontSize": 30},
+    )
+
+    # Other Options panel
+    alternatives_panel = []
+    for option, (option_value, option_courses) in enumerate(schedules[1:], 2):
+        alternatives_panel.append(
+            dbc.Row(
+                html.H4(f"Option {option} (Total Rating: {option_value:g})"),
+                justify="center",
+                style={"marginTop": 25},
+            )
+        )
+        alternatives_panel.append(
+            dbc.Row(
+                dbc.ListGroup(
                     [
-                        dbc.ModalHeader("Copy this and enter it into HyperSchedule"),
-                        dbc.ModalBody(jsonOutput),
-                        dbc.ModalFooter(
-                            dbc.Button(
-                                "Close",
-                                id="close-scroll",
-                                className="ml-auto",
-                                style={"fontSize": 30},
-                            )
-                        ),
+                        dbc.ListGroupItem(
+                            f"{code}: {name}", color=colors[i % len(colors)]
+                        )
+                        for i, (code, name) in enumerate(option_courses)
                     ],
-                    id="modal-scroll",
-                    # size="sm"
+                    style={"fontSize": 20},
                 ),
-            ]
+                justify="center",
+            )
+        )
+    if alternatives_panel:
+        alternatives_panel.insert(
+            0,
+            dbc.Row(
+                html.H2("Other Options"), justify="center", style={"marginTop": 50}
+            ),
         )
 
-        with open(r"rawData/test.json", "w") as f:
-            json.dump(hyperScheduleOutput, f, indent=4)
+    saved = []
+    if schedule_id is not None:
+        link = f"/schedules/{schedule_id}"
+        saved.append(
+            dbc.Row(
+                html.P(["Saved as ", html.A(link, href=link, target="_blank")]),
+                justify="center",
+                style={"marginTop": 15},
+            )
+        )
 
-        colors = ["primary", "secondary", "success", "warning", "danger", "info"]
+    return (
+        [
+            dbc.Row(html.H2("An Optimal Combination of Courses!"), justify="center"),
+            dbc.Row(list_group, justify="center"),
+            dbc.Row(
+                modal,
+                justify="center",
+                style={
+                    "marginTop": 25,
+                },
+            ),
+        ]
+        + saved
+        + alternatives_panel
+    )
 
-        list_group = dbc.ListGroup(
-            [
-                dbc.ListGroupItem(
-                    f"{coursesChosenByOptimizer[i][0]}: {coursesChosenByOptimizer[i][1]}",
-                    color=colors[i % len(colors)],
-                )
-                for i in range(len(coursesChosenByOptimizer))
-            ],
-            style={"fontSize": 30},
-        )
 
+def render_job_status(status):
+    if status["state"] == jobs.QUEUED:
+        message = f"Waiting for the optimizer ({status['position']} ahead in line)..."
+        progress = 0
+    else:
+        message = "Searching for the best schedules..."
+        progress = min(100, 100 * status["elapsed"] / status["time_limit"])
+    rows = [dbc.Row(html.H4(message), justify="center")]
+    if status["incumbent"] is not None:
+        value, bound = status["incumbent"]
+        best_so_far = f"Best schedule so far: total rating {value:g}"
+        if bound is not None and bound > value + 1e-9:
+            best_so_far += f" (at most {bound:g} is possible)"
+        rows.append(dbc.Row(html.P(best_so_far), justify="center"))
+    return rows + [
+        dbc.Row(
+            dbc.Progress(
+                value=progress, striped=True, animated=True, style={"width": "50%"}
+            ),
+            justify="center",
+        ),
+    ]
+
+
+def message_row(message):
+    return dbc.Row(html.H2(message), justify="center")
+
+
+@app.callback(
+    [
+        Output("datatables-div", "style"),
+        Output("final-result", "children"),
+        Output("job-id", "data"),
+        Output("job-interval", "disabled"),
+        Output("job-status-div", "style"),
+        Output("job-status", "children"),
+        # Also set by paste.request(), this callback only clears it
+        Output("calculate-request", "data", allow_duplicate=True),
+    ],
+    [Input("calculate-request", "data")],
+    [Input("job-interval", "n_intervals")],
+    [Input("cancel-job-button", "n_clicks")],
+    [State("session-id", "data")],
+    [State("job-id", "data")],
+    # Required by allow_duplicate, and there is nothing to do on page load
+    prevent_initial_call=True,
+)
+def update_output_2(request, n_intervals, cancel_clicks, session_id, job_id):
+    """
+    Submitting the tables queues an optimization job (see jobs.py), whose
+    status is then polled by the job-interval until its schedules are
+    ready, it failed or it was cancelled.
+    """
+    triggered = [trigger["prop_id"] for trigger in dash.callback_context.triggered]
+    job_queue = jobs.get_default_queue()
+    hidden = {"display": "none"}
+
+    if "calculate-request.data" in triggered and request is not None:
+        with metrics.phase("read_tables"):
+            inputToOptimizer = tables_to_optimizer_input(
+                request["courses"], request["requirements"]
+            )
+        try:
+            job_id = job_queue.submit(inputToOptimizer, session_id=session_id)
+        except jobs.QueueFull:
+            return [
+                no_update,
+                message_row(
+                    "The optimizer is busy right now, please try again in a moment."
+                ),
+                None,
+                True,
+                hidden,
+                None,
+                no_update,
+            ]
+        return [
+            no_update,
+            None,
+            job_id,
+            False,
+            {"marginTop": 20},
+            render_job_status(job_queue.status(job_id)),
+            # Sent once, not with every poll
+            None,
+        ]
+
+    if job_id is None:
+        raise PreventUpdate
+
+    if "cancel-job-button.n_clicks" in triggered:
+        job_queue.cancel(job_id)
+        return [
+            no_update,
+            message_row("Cancelled."),
+            None,
+            True,
+            hidden,
+            None,
+            no_update,
+        ]
+
+    # Polling
+    status = job_queue.status(job_id)
+    if status is None:
+        return [
+            no_update,
+            message_row("This request expired, please submit it again."),
+            None,
+            True,
+            hidden,
+            None,
+            no_update,
+        ]
+    if status["state"] == jobs.DONE:
+        with metrics.phase("render_schedules"):
+            result = render_schedules(status["result"], status["schedule_id"])
         return [
             {"display": "none"},
-            [
-                dbc.Row(
-                    html.H2("An Optimal Combination of Courses!"), justify="center"
-                ),
-                dbc.Row(list_group, justify="center"),
-                dbc.Row(
-                    modal,
-                    justify="center",
-                    style={
-                        "marginTop": 25,
-                    },
-                ),
-            ],
+            result,
+            None,
+            True,
+            hidden,
+            None,
+            no_update,
         ]
+    if status["state"] == jobs.TIMED_OUT:
+        message = "The optimizer ran out of time, try selecting fewer courses."
+        return [no_update, message_row(message), None, True, hidden, None, no_update]
+    if status["state"] == jobs.FAILED:
+        message = f"Something went wrong: {status['error']}"
+        return [no_update, message_row(message), None, True, hidden, None, no_update]
+    if status["state"] == jobs.CANCELLED:
+        return [no_update, no_update, None, True, hidden, None, no_update]
+    return [
+        no_update,
+        no_update,
+        no_update,
+        no_update,
+        no_update,
+        render_job_status(status),
+        no_update,
+    ]
 
-    else:
-        return (no_update, no_update)
+
+########## METRICS ##############
+
+
+@app.server.before_request
+def start_request_timer():
+    flask.g.request_start = time.perf_counter()
+
+
+@app.server.after_request
+def record_request_time(response):
+    if hasattr(flask.g, "request_start"):
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - flask.g.request_start, path=flask.request.path
+        )
+    return response
+
+
+@app.server.route("/metrics")
+def serve_metrics():
+    # Prometheus text format (see metrics.py)
+    job_metrics = jobs.get_default_queue().metrics()
+    metrics.JOBS.set(job_metrics["queued"], state="queued")
+    metrics.JOBS.set(job_metrics["running"], state="running")
+    return flask.Response(
+        metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4"
+    )
+
+
+########## SAVED SCHEDULES ##############
+
+
+@app.server.route("/schedules/<schedule_id>")
+def serve_saved_schedule(schedule_id):
+    """
+    A saved schedule as JSON (see schedule_store.py), with the HyperSchedule
+    input of its best option built from the current catalog.
+    """
+    saved = schedule_store.get_default_store().get(schedule_id)
+    if saved is None:
+        flask.abort(404)
+    if saved["schedules"]:
+        course_catalog = catalog.get_catalog()
+        saved["hyperschedule"] = optimizer.courseToHyperScheduleFormat(
+            [
+                course
+                for course in saved["schedules"][0]["courses"]
+                if course[0] in course_catalog
+            ]
+        )
+    return flask.jsonify(saved)
 
 
 def toggle_modal(n1, is_open):
@@ -0,0 +1,79 @@
+/*
+ * Clientside callbacks of the paste step (see app.py). The pasted
+ * HyperSchedule JSON is parsed here, in the browser, and never sent to the
+ * server: it only gets the codes of the pasted courses, to find their
+ * conflicts, and the codes and ratings of the selected ones when
+ * calculating.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    paste: {
+        // Returns the style of the textarea and of the tables, the pasted
+        // courses, their codes and an error message
+        parse: function (clicks, text) {
+            const no_update = window.dash_clientside.no_update;
+            if (!clicks) {
+                return [no_update, no_update, no_update, no_update, no_update];
+            }
+            let pasted;
+            try {
+                pasted = JSON.parse(text || "");
+            } catch (error) {
+                return [
+                    no_update, no_update, no_update, no_update,
+                    "This isn't HyperSchedule JSON: " + error.message,
+                ];
+            }
+            if (!Array.isArray(pasted)) {
+                return [
+                    no_update, no_update, no_update, no_update,
+                    "The HyperSchedule JSON should be a list of courses.",
+                ];
+            }
+            const courses = pasted
+                .filter((course) => course && course.courseCode)
+                .map((course) => ({
+                    code: course.courseCode,
+                    name: course.courseName || "",
+                }));
+            return [
+                {display: "none"},
+                {},
+                courses,
+                courses.map((course) => course.code),
+                null,
+            ];
+        },
+
+        // Returns the rows of the courses table, all of them selected
+        fill_table: function (conflicts, courses) {
+            if (!courses) {
+                const no_update = window.dash_clientside.no_update;
+                return [no_update, no_update];
+            }
+            // conflicts holds the positions of the conflicting courses
+            const rows = courses.map((course, i) => ({
+                "Course Code": course.code,
+                "Course Name": course.name,
+                "Rating": 0,
+                "Conflicts With": ((conflicts || [])[i] || [])
+                    .map((j) => courses[j].code)
+                    .join(", "),
+            }));
+            return [rows, rows.map((row, i) => i)];
+        },
+
+        // Returns the input of tables_to_optimizer_input() in app.py
+        request: function (clicks, rows, selected, requirements) {
+            if (!clicks) {
+                return window.dash_clientside.no_update;
+            }
+            return {
+                courses: (selected || []).map((i) => [
+                    rows[i]["Course Code"],
+                    rows[i]["Rating"],
+                ]),
+                requirements: requirements || [],
+            };
+        },
+    },
+});
@@ -0,0 +1,240 @@
+"""
+Solves the schedules of a whole cohort of students at once.
+
+Every line of the input file is the JSON input of one student:
+
+    {"id": "student-1",
+     "ratings": {"CSCI 140 HM-01": 9, "MATH 157 HM-01": 7, ...},
+     "requirements": [{"patterns": ["*"], "min": 3, "max": 4},
+                      {"patterns": ["CSCI"], "min": 1, "max": 2}]}
+
+ratings holds the courses the student is interested in, and every
+requirement the patterns of the courses that count towards it (see
+course_codes.py) with bounds on how many of them to take, like the tables
+of the web page. The students are solved in parallel by a pool of worker
+processes, and a line is written to the output file as soon as a
+student's schedule is ready (so not in the order of the input):
+
+    {"id": "student-1", "line": 1, "status": "OPTIMAL", "value": 31.0,
+     "courses": [["CSCI 140 HM-01", "Algorithms"], ...], "bound": 31.0,
+     "gap": 0.0, "queued_seconds": 0.01, "solve_seconds": 0.05,
+     "worker": 1234}
+
+A student whose input is invalid gets an "error" instead of a schedule.
+The workers don't parse the course data: they map the compiled catalog
+(see catalog.py), which is compiled once before they start, so they all
+share the same read-only pages.
+
+Usage:
+    python batch.py students.jsonl [results.jsonl] [--workers N]
+        [--time-limit SECONDS] [--gap-limit GAP]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import catalog
+import config
+
+# Students handed to the pool ahead of the free workers, so the input
+# file is read as the results come in instead of all at once.
+IN_FLIGHT_PER_WORKER = 4
+
+
+def to_optimizer_input(student):
+    """
+    Returns the input of optimizer() for a line of the input file.
+    Raises ValueError when the line is not a valid student input.
+    """
+    ratings = student.get("ratings")
+    if not isinstance(ratings, dict) or not ratings:
+        raise ValueError("ratings should map course codes to ratings")
+    course_catalog = catalog.get_catalog()
+    unknown = sorted(code for code in ratings if code not in course_catalog)
+    if unknown:
+        raise ValueError(f"unknown courses: {', '.join(unknown)}")
+
+    set_courses = set(ratings)
+    courses_cost = {code: float(rating) for code, rating in ratings.items()}
+    set_alternates = set()
+    alternates_dict = {}
+    lower_bounds = {}
+    upper_bounds = {}
+    for i, requirement in enumerate(student.get("requirements", [])):
+        alternate_id = f"alternates{i}"
+        set_alternates.add(alternate_id)
+        alternates_dict[alternate_id] = requirement.get("patterns") or [" "]
+        lower_bounds[alternate_id] = int(requirement.get("min", 0))
+        upper_bounds[alternate_id] = int(requirement.get("max", len(set_courses)))
+    return (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    )
+
+
+def from_optimizer_input(data):
+    # The inverse of to_optimizer_input(), a student input without an id
+    (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    ) = data
+    return {
+        "ratings": {course: courses_cost[course] for course in sorted(set_courses)},
+        "requirements": [
+            {
+                "patterns": [str(pattern) for pattern in alternates_dict[alternate_id]],
+                "min": lower_bounds[alternate_id],
+                "max": upper_bounds[alternate_id],
+            }
+            for alternate_id in sorted(set_alternates)
+        ],
+    }
+
+
+########## WORKERS ##############
+
+
+def _init_worker():
+    # Maps the catalog and builds its conflict matrix before the first
+    # student instead of during it
+    catalog.get_catalog().conflict_matrix()
+
+
+def _solve(student, time_limit, gap_limit, submitted_at):
+    import optimizer
+
+    started_at = time.time()
+    data = to_optimizer_input(student)
+    report = optimizer.solve_anytime(data, time_limit=time_limit, gap_limit=gap_limit)
+    return {
+        "status": report["status"],
+        "value": report["value"],
+        "courses": report["courses"],
+        "bound": report["bound"],
+        "gap": report["gap"],
+        "queued_seconds": round(started_at - submitted_at, 6),
+        "solve_seconds": round(time.time() - started_at, 6),
+        "worker": os.getpid(),
+    }
+
+
+########## BATCH ##############
+
+
+def run(
+    input_file,
+    output_file,
+    workers=config.BATCH_WORKERS,
+    time_limit=config.SOLVE_TIME_LIMIT_SECONDS,
+    gap_limit=config.SOLVE_GAP_LIMIT,
+):
+    """
+    Solves every student of input_file, writing a line to output_file as
+    soon as each one is done. Returns the number of students solved and
+    the number of errors.
+    """
+    # Compiled here if needed, so the workers only ever map it
+    catalog.get_catalog()
+
+    solved = errors = 0
+    # future -> (id, line number)
+    in_flight = {}
+
+    def write(student_id, line_number, result):
+        output_file.write(
+            json.dumps({"id": student_id, "line": line_number, **result}) + "\n"
+        )
+        output_file.flush()
+
+    def collect(block):
+        nonlocal solved, errors
+        done, _ = wait(
+            list(in_flight), timeout=None if block else 0, return_when=FIRST_COMPLETED
+        )
+        for future in done:
+            student_id, line_number = in_flight.pop(future)
+            error = future.exception()
+            if error is None:
+                solved += 1
+                write(student_id, line_number, future.result())
+            else:
+                errors += 1
+                write(student_id, line_number, {"error": str(error)})
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as executor:
+        for line_number, line in enumerate(input_file, 1):
+            if not line.strip():
+                continue
+            try:
+                student = json.loads(line)
+            except ValueError as error:
+                errors += 1
+                write(line_number, line_number, {"error": f"invalid JSON: {error}"})
+                continue
+            if not isinstance(student, dict):
+                errors += 1
+                write(line_number, line_number, {"error": "not a JSON object"})
+                continue
+
+            while len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                collect(block=True)
+            future = executor.submit(
+                _solve, student, time_limit, gap_limit, time.time()
+            )
+            in_flight[future] = (student.get("id", line_number), line_number)
+            collect(block=False)
+
+        while in_flight:
+            collect(block=True)
+
+    return solved, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSONL file with one student per line")
+    parser.add_argument("output", nargs="?", help="JSONL file to write results to")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS)
+    parser.add_argument(
+        "--time-limit", type=float, default=config.SOLVE_TIME_LIMIT_SECONDS
+    )
+    parser.add_argument("--gap-limit", type=float, default=config.SOLVE_GAP_LIMIT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.input) as input_file:
+        output_file = open(args.output, "w") if args.output else sys.stdout
+        try:
+            solved, errors = run(
+                input_file, output_file, args.workers, args.time_limit, args.gap_limit
+            )
+        finally:
+            if args.output:
+                output_file.close()
+    print(
+        f"Solved {solved} students ({errors} errors) in "
+        f"{time.perf_counter() - start:.1f} s with {args.workers} workers",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Checks the seat allocation of allocation.py on small cohorts against one
+joint MIP over every student at once, which is only possible for a few
+dozen students: the allocation has to fit the seats, its total rating
+can't be higher than the joint optimum, and its upper bound can't be
+lower than it.
+
+Students pick a few sections out of a small pool of popular sections with
+few seats, so that they compete for them, and a few others.
+
+Run from the root of the repository:
+    python -m benchmarks.allocation [number of students] [number of cohorts]
+
+Exits with status 1 on the first cohort that fails a check.
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+
+from ortools.linear_solver import pywraplp
+
+import allocation
+import anytime
+import catalog
+import model_builder
+import optimizer
+
+POPULAR_SECTIONS = 12
+OTHER_SECTIONS = 60
+
+
+def cohort(num_students, rng):
+    # Returns a list of optimizer inputs
+    course_catalog = catalog.get_catalog()
+    limited = sorted(
+        code
+        for code in course_catalog.codes()
+        if 0 < course_catalog.seats(course_catalog.index(code))[0] <= 15
+    )
+    popular = rng.sample(limited, POPULAR_SECTIONS)
+    others = rng.sample(sorted(course_catalog.codes()), OTHER_SECTIONS)
+
+    students = []
+    for _ in range(num_students):
+        courses = set(rng.sample(popular, 4)) | set(rng.sample(others, 8))
+        courses_cost = {
+            course: rng.choice([6, 8, 9, 10] if course in popular else [0, 2, 4, 6])
+            for course in courses
+        }
+        students.append(
+            (
+                courses,
+                courses_cost,
+                {"alternates0"},
+                {"alternates0": [" "]},
+                {"alternates0": 2},
+                {"alternates0": 4},
+            )
+        )
+    return students
+
+
+def joint_optimum(students, capacities):
+    """
+    Solves every student in one MIP with the seats as shared rows. Returns
+    the best total rating, or None if the MIP has no solution.
+    """
+    solver = pywraplp.Solver.CreateSolver("SCIP")
+    objective = solver.Objective()
+    taken = {}  # course -> variables of the students who may take it
+    for data in students:
+        if not isinstance(optimizer.get_engine("mip").solve(data), tuple):
+            # Students without any schedule aren't part of the allocation
+            continue
+        set_courses, courses_cost, *requirements = data
+        variables = {course: solver.IntVar(0, 1, "") for course in set_courses}
+        model_builder.build_constraints(set_courses, *requirements).emit(
+            solver, variables
+        )
+        for course, variable in variables.items():
+            objective.SetCoefficient(variable, courses_cost[course])
+            taken.setdefault(course, []).append(variable)
+    objective.SetMaximization()
+    for course, seats in capacities.items():
+        if course in taken:
+            constraint = solver.RowConstraint(0, seats, "")
+            for variable in taken[course]:
+                constraint.SetCoefficient(variable, 1)
+    if solver.Solve() != pywraplp.Solver.OPTIMAL:
+        return None
+    return objective.Value()
+
+
+def main(num_students=40, num_cohorts=3, seed=0):
+    rng = random.Random(seed)
+    for n in range(num_cohorts):
+        students = cohort(num_students, rng)
+        capacities = allocation.seat_capacities(students)
+
+        start = time.perf_counter()
+        schedules, summary = allocation.allocate(students, workers=2)
+        allocation_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        optimum = joint_optimum(students, capacities)
+        joint_seconds = time.perf_counter() - start
+
+        taken = Counter(course for _, courses in schedules for course in courses)
+        over = [
+            course
+            for course, count in taken.items()
+            if count > capacities.get(course, count)
+        ]
+        value, bound = summary["value"], summary["bound"]
+        bound = None if bound is None else round(bound, 2)
+        print(
+            f"cohort {n}: allocation {value:g} (bound {bound}, "
+            f"{summary['iterations']} iterations, {allocation_seconds:.1f} s), "
+            f"joint MIP {optimum} ({joint_seconds:.1f} s)"
+        )
+        if over:
+            print(f"cohort {n}: oversubscribed sections {over}")
+            return 1
+        if optimum is not None and value > optimum + 1e-6:
+            print(f"cohort {n}: allocation beats the joint optimum")
+            return 1
+        if optimum is not None and bound is not None and bound < optimum - 1e-6:
+            print(f"cohort {n}: upper bound below the joint optimum")
+            return 1
+        if optimum is not None:
+            print(
+                f"cohort {n}: {anytime.relative_gap(value, optimum):.2%} below the optimum"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:3])))
@@ -0,0 +1,92 @@
+"""
+Checks that the engines of optimizer() agree: on random problems drawn
+from the catalog, every engine has to find the same optimal value (and
+the same values for the K best schedules), and every schedule returned
+has to meet all of the constraints.
+
+Run from the root of the repository:
+    python -m benchmarks.differential [number of problems]
+
+Exits with status 1 on the first disagreement.
+"""
+
+import random
+import sys
+import time
+
+import catalog
+import config
+import model_builder
+import optimizer
+from benchmarks.model_build import sample_problem
+
+ENGINES = ["mip", "bitset", "cpsat"]
+SIZES = [1, 5, 10, 20, 30, 40]
+K = 3
+
+
+def check_schedule(problem, schedule):
+    # Every constraint row has to be satisfied by the selected courses
+    set_courses, _, set_alternates, alternates_dict, lower_bounds, upper_bounds = (
+        problem
+    )
+    selected = {course for course, _ in schedule[1]}
+    rows = model_builder.build_constraints(
+        set_courses, set_alternates, alternates_dict, lower_bounds, upper_bounds
+    ).canonical_rows()
+    for row_courses, (lower, upper) in rows.items():
+        count = len(selected & row_courses)
+        if not lower <= count <= upper:
+            return False
+    # And checked again against the interval index, which the rows' time
+    # conflicts don't come from
+    course_catalog = catalog.get_catalog()
+    return course_catalog.interval_index().is_conflict_free(
+        course_catalog.index(course) for course in selected
+    )
+
+
+def values(result):
+    if not isinstance(result, tuple):
+        return None
+    return round(result[0], 6)
+
+
+def main(num_problems=200, seed=0):
+    rng = random.Random(seed)
+    timings = {engine: 0.0 for engine in ENGINES}
+    for n in range(num_problems):
+        problem = sample_problem(rng.choice(SIZES), rng)
+        # Some negative ratings and tight bounds to exercise the edge cases
+        for course in problem[0]:
+            if rng.random() < 0.1:
+                problem[1][course] = -rng.randint(1, 5)
+        problem[4]["alternates0"] = rng.randint(0, 3)
+
+        found = {}
+        for engine in ENGINES:
+            start = time.perf_counter()
+            best = optimizer.get_engine(engine).solve(problem)
+            top, _ = optimizer.get_engine(engine).top_k(
+                problem, K, config.TOP_K_TIME_LIMIT_SECONDS
+            )
+            timings[engine] += time.perf_counter() - start
+
+            for schedule in ([best] if isinstance(best, tuple) else []) + top:
+                if not check_schedule(problem, schedule):
+                    print(f"problem {n}: {engine} returned an infeasible schedule")
+                    return 1
+            found[engine] = (values(best), [values(schedule) for schedule in top])
+
+        if len(set(map(repr, found.values()))) != 1:
+            print(f"problem {n}: engines disagree {found}")
+            return 1
+
+    print(f"{num_problems} problems, all engines agree")
+    for engine, total in timings.items():
+        print(f"{engine:>8} {total * 1000 / num_problems:8.2f} ms per problem")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:2])))
@@ -0,0 +1,52 @@
+"""
+Compares the solver engines of optimizer() (see optimizer.ENGINES) on
+problems drawn from the catalog, reporting the median solve time of each
+engine per problem size and whether they agree on the optimal value.
+
+Run from the root of the repository:
+    python -m benchmarks.engines
+"""
+
+import random
+import time
+
+import optimizer
+from benchmarks.model_build import sample_problem
+
+SIZES = [10, 20, 40, 80, 200]
+PROBLEMS_PER_SIZE = 10
+
+
+def main(seed=0):
+    rng = random.Random(seed)
+    engines = {name: optimizer.get_engine(name) for name in optimizer.ENGINES}
+
+    header = f"{'sections':>8}" + "".join(f" {name + ' ms':>10}" for name in engines)
+    print(header + f" {'fastest':>8} {'agree':>6}")
+    for size in SIZES:
+        timings = {name: [] for name in engines}
+        agree = True
+        for _ in range(PROBLEMS_PER_SIZE):
+            problem = sample_problem(size, rng)
+            values = set()
+            for name, engine in engines.items():
+                start = time.perf_counter()
+                result = engine.solve(problem)
+                timings[name].append(time.perf_counter() - start)
+                values.add(round(result[0], 6) if isinstance(result, tuple) else None)
+            agree = agree and len(values) == 1
+
+        medians = {
+            name: sorted(times)[len(times) // 2] * 1000
+            for name, times in timings.items()
+        }
+        fastest = min(medians, key=medians.get)
+        print(
+            f"{size:>8}"
+            + "".join(f" {medians[name]:>10.2f}" for name in engines)
+            + f" {fastest:>8} {str(agree):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
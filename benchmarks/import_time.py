@@ -0,0 +1,47 @@
+"""
+Checks that importing the web app stays cheap: no catalog loading, solver
+creation or spreadsheet reading should happen at import time.
+
+Run from the root of the repository:
+    python -m benchmarks.import_time [budget in seconds]
+
+Exits with status 1 when `import app` takes longer than the budget.
+"""
+
+import subprocess
+import sys
+
+IMPORT_BUDGET_SECONDS = 1.0
+MODULES = ["app", "optimizer", "excel_parser"]
+REPEATS = 3
+
+
+def import_time(module):
+    # Every measurement is done in a fresh interpreter so nothing is cached.
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main(budget=IMPORT_BUDGET_SECONDS):
+    timings = {}
+    for module in MODULES:
+        timings[module] = min(import_time(module) for _ in range(REPEATS))
+        print(f"import {module:<14} {timings[module] * 1000:8.1f} ms")
+
+    if timings["app"] > budget:
+        print(f"import app took longer than the {budget:.2f} s budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET_SECONDS
+    sys.exit(main(budget))
@@ -0,0 +1,73 @@
+"""
+Checks the JSONStream of data_preprocessing.py against json.loads: a
+document with integers, floats and exponents of every form is read back
+with every chunk size from 1 byte to the size of the document, so that
+each of its numbers (and strings and literals) is cut at every offset.
+The source file is then read in the chunks it is compiled with.
+
+Run from the root of the repository:
+    python -m benchmarks.json_stream
+
+Exits with status 1 on the first difference.
+"""
+
+import io
+import json
+import sys
+
+import config
+import data_preprocessing
+
+DOCUMENT = (
+    '{"until": 1.5, "numbers": [0, -7, 12345, 0.25, -3.125, 1e5, 2.5e-3, '
+    '-6E+12, 7.0E2, 100], "strings": ["a \\" quoted", "été", "}]", ""], '
+    '"literals": [true, false, null, {}, []], '
+    '"nested": {"a": {"b": [1.75, {"c": 1E-7}]}, "d": 12}, "last": 3.0}'
+)
+
+
+class Chunked(io.BytesIO):
+    # A file whose reads return at most chunk_size bytes
+    def __init__(self, data, chunk_size):
+        super().__init__(data)
+        self.chunk_size = chunk_size
+
+    def read(self, size=-1):
+        return super().read(self.chunk_size)
+
+
+def read_all(stream):
+    # The document read back a value (or key) at a time
+    if stream.peek() != "{":
+        return stream.value()
+    return {key: read_all(stream) for key in stream.keys()}
+
+
+def main():
+    data = DOCUMENT.encode("utf-8")
+    expected = json.loads(DOCUMENT)
+    for chunk_size in range(1, len(data) + 1):
+        stream = data_preprocessing.JSONStream(Chunked(data, chunk_size))
+        try:
+            found = read_all(stream)
+        except ValueError as error:
+            print(f"chunks of {chunk_size} bytes: {error}")
+            return 1
+        if found != expected:
+            print(f"chunks of {chunk_size} bytes: read {found!r}")
+            return 1
+    print(f"{len(data)} chunk sizes of a {len(data)} byte document, all agree")
+
+    with open(config.CATALOG_SOURCE, "rb") as f:
+        expected = json.load(f)
+        f.seek(0)
+        found = read_all(data_preprocessing.JSONStream(f))
+    if found != expected:
+        print(f"{config.CATALOG_SOURCE} is read differently")
+        return 1
+    print(f"{config.CATALOG_SOURCE} agrees")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Compares the memory a worker process needs for the course data: the
+source JSON parsed into nested dictionaries (how every worker used to hold
+it) against the mapped catalog with a Course for every section (see
+catalog.py), and with its conflict matrix and interval index on top.
+
+Every case runs in a fresh interpreter, after importing the modules, and
+reports the resident set size (RSS) the course data added to it.
+
+Run from the root of the repository:
+    python -m benchmarks.memory
+
+Exits with status 1 when the catalog takes more memory than the
+dictionaries.
+"""
+
+import subprocess
+import sys
+
+import catalog
+
+MEASURE_RSS = (
+    "import os, resource\n"
+    "def rss():\n"
+    "    try:\n"
+    "        with open('/proc/self/statm') as f:\n"
+    "            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')\n"
+    "    except OSError:\n"
+    "        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024\n"
+)
+
+CASES = {
+    "dicts": (
+        "import json, config\n"
+        "with open(config.CATALOG_SOURCE, encoding='utf-8') as f:\n"
+        "    raw_data = json.load(f)\n"
+        "processed_data = {}\n"
+        "for item in raw_data['data']['courses'].keys():\n"
+        "    newKey = raw_data['data']['courses'][item]['courseCode']\n"
+        "    processed_data[newKey] = raw_data['data']['courses'][item]\n"
+    ),
+    "catalog": (
+        "course_catalog = catalog.get_catalog()\n"
+        "sections = [course_catalog.section(code) for code in course_catalog]\n"
+    ),
+    # The dictionaries had nothing like these, the time conflicts used to
+    # be worked out again for every request
+    "catalog+conflicts": (
+        "course_catalog = catalog.get_catalog()\n"
+        "sections = [course_catalog.section(code) for code in course_catalog]\n"
+        "course_catalog.conflict_matrix()\n"
+    ),
+}
+
+
+def measure(case):
+    code = (
+        MEASURE_RSS
+        + "import catalog, conflict_matrix, interval_index, numpy, optimizer\n"
+        + "before = rss()\n"
+        + CASES[case]
+        + "print(rss() - before)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return int(output.strip().splitlines()[-1])
+
+
+def main():
+    # Compiled here if needed, so the case only maps it
+    catalog.get_catalog()
+    usage = {}
+    for case in CASES:
+        usage[case] = measure(case)
+        print(f"{case:<18} {usage[case] / 2**20:8.1f} MB")
+
+    if usage["catalog"] > usage["dicts"]:
+        print("the catalog takes more memory than the dictionaries")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Times how long it takes to build the optimization model (not to solve it)
+for 10, 50 and 200 candidate sections drawn from the catalog.
+
+Run from the root of the repository:
+    python -m benchmarks.model_build
+"""
+
+import random
+import time
+
+import catalog
+import mip_engine
+import solver_pool
+
+SIZES = [10, 50, 200]
+REPEATS = 20
+
+
+def sample_problem(size, rng):
+    set_courses = set(rng.sample(sorted(catalog.get_catalog().codes()), size))
+    courses_cost = {course: rng.randint(0, 10) for course in set_courses}
+    departments = sorted({course.split(" ")[0] for course in set_courses})
+
+    set_alternates = {"alternates0", "alternates1", "alternates2"}
+    alternates_dict = {
+        "alternates0": [" "],
+        "alternates1": rng.sample(departments, min(2, len(departments))),
+        "alternates2": [" HM-", " PO-"],
+    }
+    lower_bounds = {"alternates0": 0, "alternates1": 1, "alternates2": 0}
+    upper_bounds = {"alternates0": 4, "alternates1": 2, "alternates2": 3}
+    return (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    )
+
+
+def time_build(problem):
+    with solver_pool.get_default_pool().solver() as solver:
+        start = time.perf_counter()
+        mip_engine.build_model(solver, *problem)
+        elapsed = time.perf_counter() - start
+        model_size = (solver.NumVariables(), solver.NumConstraints())
+    return elapsed, model_size
+
+
+def main(seed=0):
+    rng = random.Random(seed)
+    print(f"{'sections':>8} {'build ms':>10} {'variables':>10} {'constraints':>12}")
+    for size in SIZES:
+        timings = []
+        for _ in range(REPEATS):
+            elapsed, (num_vars, num_constraints) = time_build(sample_problem(size, rng))
+            timings.append(elapsed)
+        timings.sort()
+        median = timings[len(timings) // 2] * 1000
+        print(f"{size:>8} {median:>10.2f} {num_vars:>10} {num_constraints:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Measures the bytes that cross the wire in the callbacks of the web page
+once the HyperSchedule JSON is pasted, through the test client of the app.
+
+The JSON is parsed in the browser (see assets/paste.js): only the codes of
+the pasted courses are sent to find their conflicts, and the codes and
+ratings of the selected ones with the requirements when calculating, the
+job then being polled. Every request and response has to stay within a
+budget that grows with the number of pasted courses, far below the size
+of the pasted JSON itself, which is printed for comparison. The response
+with the schedules holds the HyperSchedule JSON of the courses chosen,
+so its budget grows with the most courses a schedule can have instead.
+
+Run from the root of the repository:
+    python -m benchmarks.payloads [number of pasted courses]
+
+The test client posts the callbacks straight to the server, which would
+run them even if the page could not: the callbacks declared in
+/_dash-dependencies are checked first for outputs written by more than
+one callback without allow_duplicate, which keep dash-renderer from
+running any callback at all.
+
+Exits with status 1 when some output is duplicated or some request or
+response is over its budget.
+"""
+
+import json
+import random
+import sys
+import time
+from collections import Counter
+
+import app
+import catalog
+
+# Budgets of a request or response, in bytes
+BASE_BUDGET_BYTES = 2048
+BUDGET_BYTES_PER_COURSE = 64
+RESULT_BUDGET_BYTES_PER_SCHEDULED_COURSE = 2048
+
+# Bounds on the number of courses of the schedules
+MIN_COURSES = 3
+MAX_COURSES = 5
+
+POLL_SECONDS = 0.2
+MAX_POLLS = 300
+
+
+def split_outputs(output):
+    # The "id.property" of every output of a callback of /_dash-dependencies
+    if output.startswith(".."):
+        return output[2:-2].split("...")
+    return [output]
+
+
+def duplicate_outputs(dependencies):
+    counts = Counter(
+        output
+        for callback in dependencies
+        for output in split_outputs(callback["output"])
+    )
+    return sorted(output for output, count in counts.items() if count > 1)
+
+
+def callback_output(dependencies, output):
+    # The output of the callback writing the given "id.property"
+    for callback in dependencies:
+        if output in split_outputs(callback["output"]):
+            return callback["output"]
+    raise KeyError(output)
+
+
+def callback_body(output, inputs, state, trigger):
+    # The body the page posts to /_dash-update-component
+    outputs = [
+        dict(zip(("id", "property"), name.split(".", 1)))
+        for name in split_outputs(output)
+    ]
+    return {
+        "output": output,
+        "outputs": outputs if output.startswith("..") else outputs[0],
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": [trigger],
+    }
+
+
+def post(client, body):
+    # Returns (request bytes, response bytes, response)
+    request = json.dumps(body).encode("utf-8")
+    response = client.post(
+        "/_dash-update-component", data=request, content_type="application/json"
+    )
+    data = response.get_data()
+    return len(request), len(data), json.loads(data) if data else None
+
+
+def main(num_courses=20, seed=0):
+    rng = random.Random(seed)
+    course_catalog = catalog.get_catalog()
+    codes = rng.sample(sorted(course_catalog.codes()), num_courses)
+    pasted = json.dumps([course_catalog.course(code) for code in codes])
+    budget = BASE_BUDGET_BYTES + BUDGET_BYTES_PER_COURSE * num_courses
+    result_budget = (
+        BASE_BUDGET_BYTES + RESULT_BUDGET_BYTES_PER_SCHEDULED_COURSE * MAX_COURSES
+    )
+
+    client = app.app.server.test_client()
+    client.get("/")
+    dependencies = client.get("/_dash-dependencies").get_json()
+    duplicates = duplicate_outputs(dependencies)
+    if duplicates:
+        print(f"outputs of more than one callback: {', '.join(duplicates)}")
+        return 1
+    job_output = callback_output(dependencies, "job-status.children")
+    sizes = {}
+
+    sizes["conflicts"] = post(
+        client,
+        callback_body(
+            callback_output(dependencies, "course-conflicts.data"),
+            [("pasted-codes", "data", codes)],
+            [],
+            "pasted-codes.data",
+        ),
+    )
+
+    request = {
+        "courses": [[code, rng.randint(0, 10)] for code in codes],
+        "requirements": [
+            dict(row, **{"Total Number of Courses": value})
+            for row, value in zip(
+                app.requirements_template_records, [MIN_COURSES, MAX_COURSES]
+            )
+        ]
+        + app.requirements_template_records[2:],
+    }
+    job_state = [("session-id", "data", "payloads"), ("job-id", "data", None)]
+    sizes["calculate"] = post(
+        client,
+        callback_body(
+            job_output,
+            [
+                ("calculate-request", "data", request),
+                ("job-interval", "n_intervals", 0),
+                ("cancel-job-button", "n_clicks", None),
+            ],
+            job_state,
+            "calculate-request.data",
+        ),
+    )
+    response = sizes["calculate"][2]["response"]
+    job_id = response["job-id"]["data"]
+    # Cleared once the job is queued, so it isn't sent with every poll
+    request = response["calculate-request"]["data"]
+
+    # Polled until the schedules are rendered
+    for n in range(1, MAX_POLLS):
+        time.sleep(POLL_SECONDS)
+        poll = post(
+            client,
+            callback_body(
+                job_output,
+                [
+                    ("calculate-request", "data", request),
+                    ("job-interval", "n_intervals", n),
+                    ("cancel-job-button", "n_clicks", None),
+                ],
+                [job_state[0], ("job-id", "data", job_id)],
+                "job-interval.n_intervals",
+            ),
+        )
+        if "final-result" in poll[2]["response"]:
+            sizes["result"] = poll
+            break
+        sizes["poll"] = poll
+
+    print(f"pasted JSON of {num_courses} courses: {len(pasted)} bytes")
+    over = []
+    for name, (request_bytes, response_bytes, _) in sizes.items():
+        print(
+            f"{name:<10} request {request_bytes:8d} B   response {response_bytes:8d} B"
+        )
+        if name == "result":
+            if request_bytes > budget or response_bytes > result_budget:
+                print(f"result over the budget of {result_budget} bytes")
+                over.append(name)
+        elif request_bytes > budget or response_bytes > budget:
+            print(f"{name} over the budget of {budget} bytes")
+            over.append(name)
+    if over:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:2])))
@@ -0,0 +1,198 @@
+"""
+Times every phase of a solve on a reproducible workload (see
+workload.py) and reports the results as JSON:
+
+    catalog_load     opening the compiled catalog
+    conflict_matrix  the catalog-wide conflict matrix (once per catalog)
+    constraints      the rows of a problem (model_builder.build_constraints)
+    build_model      the rows, variables and objective handed to SCIP
+                     (mip_engine.build_model)
+    solve            SCIP's search and reading the schedule
+                     (mip_engine.solve_model)
+    extraction       the HyperSchedule data of the schedule
+
+Run from the root of the repository:
+    python -m benchmarks.phases [--output results.json]
+
+In regression mode the results are compared with a stored baseline, and
+the script exits with status 1 when a phase got slower than threshold
+times its baseline:
+    python -m benchmarks.phases --baseline benchmarks/baseline.json
+
+A new baseline is recorded with --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import ortools
+
+import catalog
+import config
+import conflict_matrix
+import mip_engine
+import model_builder
+import optimizer
+import solver_pool
+from benchmarks.workload import workload
+
+SIZES = [10, 40, 160]
+PROBLEMS_PER_SIZE = 10
+CATALOG_REPEATS = 5
+
+# Phases whose median is only this much slower than the baseline are
+# never regressions, however large the ratio (timer noise).
+MIN_SLOWDOWN_MS = 2.0
+
+
+class Timings:
+    def __init__(self):
+        # phase -> list of seconds
+        self.samples = {}
+
+    def add(self, phase, seconds):
+        self.samples.setdefault(phase, []).append(seconds)
+
+    def summary(self):
+        summary = {}
+        for phase, samples in self.samples.items():
+            samples = sorted(samples)
+            summary[phase] = {
+                "count": len(samples),
+                "median_ms": samples[len(samples) // 2] * 1000,
+                "p90_ms": samples[int(len(samples) * 0.9)] * 1000,
+                "max_ms": samples[-1] * 1000,
+            }
+        return summary
+
+
+def time_catalog(timings):
+    for _ in range(CATALOG_REPEATS):
+        start = time.perf_counter()
+        course_catalog = catalog.load()
+        course_catalog.codes()
+        timings.add("catalog_load", time.perf_counter() - start)
+        course_catalog.close()
+
+    course_catalog = catalog.get_catalog()
+    start = time.perf_counter()
+    conflict_matrix.build(course_catalog)
+    timings.add("conflict_matrix", time.perf_counter() - start)
+    # Built outside of the timings, so the first problem doesn't pay for it
+    course_catalog.conflict_matrix()
+
+
+def time_problem(timings, size, problem):
+    (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    ) = problem
+
+    # The functions the MIP engine runs (see mip_engine.solve_anytime)
+    start = time.perf_counter()
+    model_builder.build_constraints(
+        set_courses, set_alternates, alternates_dict, lower_bounds, upper_bounds
+    )
+    timings.add(f"constraints/{size}", time.perf_counter() - start)
+
+    with solver_pool.get_default_pool().solver() as solver:
+        start = time.perf_counter()
+        courses_bool = mip_engine.build_model(solver, *problem)
+        timings.add(f"build_model/{size}", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _, result = mip_engine.solve_model(solver, courses_bool)
+        timings.add(f"solve/{size}", time.perf_counter() - start)
+
+    solved = result is not None
+    if solved:
+        start = time.perf_counter()
+        optimizer.courseToHyperScheduleFormat(result[1])
+        timings.add(f"extraction/{size}", time.perf_counter() - start)
+    return solved
+
+
+def run(sizes=SIZES, problems_per_size=PROBLEMS_PER_SIZE, seed=0):
+    timings = Timings()
+    time_catalog(timings)
+
+    # Problems of every size that have a schedule, infeasible ones are
+    # solved a lot faster
+    solved = {str(size): 0 for size in sizes}
+    for size, problem in workload(sizes, problems_per_size, seed):
+        solved[str(size)] += time_problem(timings, size, problem)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "ortools": ortools.__version__,
+            "backend": config.SOLVER_BACKEND,
+            "catalog_sections": len(catalog.get_catalog()),
+            "sizes": sizes,
+            "problems_per_size": problems_per_size,
+            "seed": seed,
+            "solved_per_size": solved,
+        },
+        "phases": timings.summary(),
+    }
+
+
+def regressions(results, baseline, threshold):
+    """
+    Returns a line for every phase whose median got slower than threshold
+    times the baseline's.
+    """
+    found = []
+    for phase, expected in sorted(baseline["phases"].items()):
+        if phase not in results["phases"]:
+            continue
+        median = results["phases"][phase]["median_ms"]
+        limit = expected["median_ms"] * threshold
+        if median > limit and median - expected["median_ms"] > MIN_SLOWDOWN_MS:
+            found.append(
+                f"{phase}: {median:.2f} ms, baseline {expected['median_ms']:.2f} ms"
+                f" (limit {limit:.2f} ms)"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--problems", type=int, default=PROBLEMS_PER_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument("--baseline", help="results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("--save-baseline", help="file to record a baseline in")
+    args = parser.parse_args()
+
+    results = run(
+        [int(size) for size in args.sizes.split(",")], args.problems, args.seed
+    )
+    encoded = json.dumps(results, indent=4, sort_keys=True)
+    print(encoded)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            f.write(encoded + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print(f"Regression in {line}", file=sys.stderr)
+        if found:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
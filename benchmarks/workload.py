@@ -0,0 +1,118 @@
+"""
+Generates optimizer inputs that look like the ones students submit.
+
+A student is interested in a number of courses, mostly at their home
+campus, and pastes in every section of them, so most problems hold
+several sections of the same course (which the uniqueness rows keep from
+being taken together). Sections of a course get about the same rating.
+Besides the total number of courses, students ask for a few requirements:
+at least one course of their major's department, at most a few courses
+off their home campus and so on.
+
+The same seed always gives the same problems, so runs can be compared.
+"""
+
+import random
+from collections import defaultdict
+
+import catalog
+from course_codes import campus
+
+# Bounds of the "Total Number of Courses" row
+MIN_COURSES = (3, 4)
+MAX_COURSES = (4, 5)
+
+
+def underlying_course(code):
+    # Example: CSCI 140 HM-01 -> CSCI 140
+    return " ".join(code.split(" ")[:2])
+
+
+def course_sections(course_catalog):
+    """
+    Returns a dictionary from every (underlying course, campus) pair to the
+    codes of its sections.
+    """
+    sections = defaultdict(list)
+    for code in sorted(course_catalog.codes()):
+        sections[(underlying_course(code), campus(code))].append(code)
+    return sections
+
+
+def generate_problem(num_sections, rng, sections=None):
+    """
+    Returns an optimizer input with about num_sections candidate sections.
+    """
+    if sections is None:
+        sections = course_sections(catalog.get_catalog())
+    courses = sorted(sections)
+
+    # Home campus, picked in proportion to the number of courses it offers
+    home = rng.choice([course_campus for _, course_campus in courses])
+    home_courses = [course for course in courses if course[1] == home]
+    major = rng.choice(home_courses)[0].split(" ")[0]
+
+    set_courses = set()
+    courses_cost = {}
+    while len(set_courses) < num_sections:
+        # Four out of five courses are taken at the home campus
+        pool = home_courses if rng.random() < 0.8 else courses
+        course = rng.choice(pool)
+        rating = rng.choice([0, 2, 4, 5, 6, 7, 8, 9, 10])
+        for code in sections[course]:
+            if code not in set_courses:
+                set_courses.add(code)
+                # Sections of a course are rated about the same
+                courses_cost[code] = max(0, rating - rng.choice([0, 0, 0, 1]))
+
+    set_alternates = {"alternates0", "alternates1", "alternates2"}
+    alternates_dict = {
+        # Total number of courses
+        "alternates0": [" "],
+        # At least one course of the major
+        "alternates1": [f"{major} "],
+        # Only a few courses away from the home campus
+        "alternates2": [
+            f" {other}-" for other in sorted({course[1] for course in courses} - {home})
+        ],
+    }
+    lower_bounds = {
+        "alternates0": rng.choice(MIN_COURSES),
+        "alternates1": 1,
+        "alternates2": 0,
+    }
+    upper_bounds = {
+        "alternates0": rng.choice(MAX_COURSES),
+        "alternates1": 2,
+        "alternates2": rng.choice([1, 2]),
+    }
+    if rng.random() < 0.5:
+        # A second department the student has to take a course from
+        other_major = rng.choice(courses)[0].split(" ")[0]
+        set_alternates.add("alternates3")
+        alternates_dict["alternates3"] = [f"{other_major} "]
+        lower_bounds["alternates3"] = 0
+        upper_bounds["alternates3"] = 1
+
+    return (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    )
+
+
+def workload(sizes, problems_per_size, seed=0):
+    """
+    Returns a list of (size, problem) pairs, problems_per_size of them for
+    every size.
+    """
+    rng = random.Random(seed)
+    sections = course_sections(catalog.get_catalog())
+    return [
+        (size, generate_problem(size, rng, sections))
+        for size in sizes
+        for _ in range(problems_per_size)
+    ]
@@ -0,0 +1,263 @@
+"""
+An exact branch and bound engine for small problems, in plain Python.
+
+Typical inputs have 10 to 40 sections, where building an or-tools model
+and starting SCIP costs more than the search itself. Here every section is
+a bit of a Python int: for every section we keep the set of sections it
+can't be taken with (time conflicts and the same course in another
+section) and for every alternates row the set of sections it counts. The
+search picks sections best rating first and prunes any branch whose
+optimistic value (everything still allowed with a positive rating) can't
+beat the schedules found so far, or that can no longer meet a bound.
+
+The masks are over the candidate sections rather than over the time
+slots a schedule occupies: the catalog's conflict matrix already knows
+which sections overlap, including the ones that don't fit the slots, so
+a section's mask of conflicts is a single lookup. The engine is checked
+against the others by benchmarks/differential.py.
+"""
+
+import heapq
+import time
+
+import anytime
+import catalog
+import metrics
+import model_builder
+
+
+def _popcount(mask):
+    return bin(mask).count("1")
+
+
+def build_model(
+    set_courses,
+    courses_cost,
+    set_alternates,
+    alternates_dict,
+    lower_bounds,
+    upper_bounds,
+):
+    """
+    Returns (courses, ratings, incompatible masks, counting rows), with
+    courses ordered best rating first and bit i standing for courses[i].
+    """
+    courses = sorted(set_courses, key=lambda course: (-courses_cost[course], course))
+    bit = {course: 1 << i for i, course in enumerate(courses)}
+    ratings = [courses_cost[course] for course in courses]
+
+    rows = model_builder.build_constraints(
+        set_courses, set_alternates, alternates_dict, lower_bounds, upper_bounds
+    ).canonical_rows()
+
+    incompatible = [0] * len(courses)
+    counting_rows = []  # (row mask, lower, upper)
+    for row_courses, (lower, upper) in rows.items():
+        mask = 0
+        for course in row_courses:
+            mask |= bit[course]
+        if lower <= 0 and upper == 1:
+            # "At most one of these" is the same as every pair conflicting
+            for i, course in enumerate(courses):
+                if mask & bit[course]:
+                    incompatible[i] |= mask & ~bit[course]
+        else:
+            counting_rows.append((mask, lower, upper))
+
+    metrics.model_size("bitset", len(courses), len(rows), sum(len(row) for row in rows))
+    return courses, ratings, incompatible, counting_rows
+
+
+def search(
+    courses,
+    ratings,
+    incompatible,
+    counting_rows,
+    k=1,
+    deadline=None,
+    gap_limit=0.0,
+    on_incumbent=None,
+):
+    """
+    Returns (the k best (value, selected mask) pairs best first, whether the
+    search was finished before the deadline, an upper bound on the value
+    of any schedule or None if there is none).
+
+    Branches that can't beat the k-th best schedule by more than gap_limit
+    (relative, see anytime.py) are pruned, and on_incumbent(value, bound)
+    is called every time a better schedule is found.
+    """
+    n = len(courses)
+    full = (1 << n) - 1
+    # The sections with a positive rating
+    positive = 0
+    for i in range(n):
+        if ratings[i] > 0:
+            positive |= 1 << i
+
+    best = []  # min-heap of (value, selected mask), at most k entries
+    best_value = None
+    # Highest optimistic value of the branches that were pruned or left
+    # unexplored, the bound is the higher of this and the best value
+    pruned_bound = None
+    nodes = 0
+    timed_out = False
+
+    def total(bits):
+        # Sum of the ratings of the given sections
+        value = 0
+        while bits:
+            low = bits & -bits
+            value += ratings[low.bit_length() - 1]
+            bits ^= low
+        return value
+
+    def optimistic(value, selected, allowed):
+        # Everything still allowed with a positive rating, except that a
+        # row with an upper bound only lets its best few sections count.
+        # Sections are ordered best rating first, so those are its lowest
+        # bits.
+        bits = allowed & positive
+        bound = None
+        for mask, _, upper in counting_rows:
+            room = upper - _popcount(selected & mask)
+            inside = bits & mask
+            outside_value = total(bits & ~mask)
+            inside_value = 0
+            while inside and room > 0:
+                low = inside & -inside
+                inside_value += ratings[low.bit_length() - 1]
+                inside ^= low
+                room -= 1
+            if bound is None or outside_value + inside_value < bound:
+                bound = outside_value + inside_value
+        return value + (total(bits) if bound is None else bound)
+
+    def feasible(selected, allowed):
+        for mask, lower, upper in counting_rows:
+            count = _popcount(selected & mask)
+            if count > upper or count + _popcount(allowed & mask) < lower:
+                return False
+        return True
+
+    def prune(bound):
+        nonlocal pruned_bound
+        if pruned_bound is None or bound > pruned_bound:
+            pruned_bound = bound
+
+    def visit(selected, allowed, value):
+        # allowed: sections that haven't been decided on and can still be
+        # added, sections are decided on lowest bit first
+        nonlocal nodes, timed_out, best_value
+        nodes += 1
+        if deadline is not None and nodes % 1024 == 0 and time.monotonic() > deadline:
+            timed_out = True
+        if not feasible(selected, allowed):
+            return
+        if timed_out:
+            prune(optimistic(value, selected, allowed))
+            return
+        if len(best) == k:
+            bound = optimistic(value, selected, allowed)
+            tolerance = gap_limit * max(abs(best[0][0]), 1.0)
+            if bound <= best[0][0] + tolerance + 1e-9:
+                prune(bound)
+                return
+
+        if not allowed:
+            if len(best) < k:
+                heapq.heappush(best, (value, selected))
+            elif value > best[0][0] + 1e-9:
+                heapq.heapreplace(best, (value, selected))
+            if best_value is None or value > best_value + 1e-9:
+                best_value = value
+                if on_incumbent is not None:
+                    on_incumbent(value, root_bound)
+            return
+
+        i = (allowed & -allowed).bit_length() - 1
+        here = 1 << i
+        # Taking section i first, then leaving it out
+        visit(selected | here, allowed & ~here & ~incompatible[i], value + ratings[i])
+        visit(selected, allowed & ~here, value)
+
+    root_bound = optimistic(0, 0, full)
+    visit(0, full, 0)
+
+    if best_value is None:
+        bound = pruned_bound
+    elif pruned_bound is None:
+        bound = best_value
+    else:
+        bound = max(best_value, pruned_bound)
+    return sorted(best, reverse=True), not timed_out, bound
+
+
+def _result(courses, value, selected):
+    course_catalog = catalog.get_catalog()
+    res = []  # list of courses that the user should take
+    with metrics.phase("extraction", engine="bitset"):
+        for i, course in enumerate(courses):
+            if selected & (1 << i):
+                courseName = course_catalog.name(course_catalog.index(course))
+                res.append((course, courseName))
+    return (float(value), res)
+
+
+def solve(data, time_limit=None, gap_limit=0.0):
+    return anytime.as_result(solve_anytime(data, time_limit, gap_limit))
+
+
+def solve_anytime(data, time_limit=None, gap_limit=0.0, on_incumbent=None):
+    """
+    Returns a report of the best schedule found within time_limit seconds
+    (see anytime.py), calling on_incumbent(value, bound) every time a
+    better schedule is found.
+    """
+    start = time.monotonic()
+    deadline = None if time_limit is None else start + time_limit
+    with metrics.phase("build_model", engine="bitset"):
+        courses, ratings, incompatible, counting_rows = build_model(*data)
+    with metrics.phase("solver", engine="bitset"):
+        best, complete, bound = search(
+            courses,
+            ratings,
+            incompatible,
+            counting_rows,
+            1,
+            deadline,
+            gap_limit,
+            on_incumbent,
+        )
+    elapsed = time.monotonic() - start
+    if bound is not None:
+        bound = float(bound)
+
+    if not best:
+        status = anytime.INFEASIBLE if complete else anytime.UNKNOWN
+        return anytime.report(status, bound=bound, elapsed=elapsed)
+    value, selected = best[0]
+    value, res = _result(courses, value, selected)
+    return anytime.report(anytime.FEASIBLE, value, res, bound, gap_limit, elapsed)
+
+
+def top_k(data, k, time_limit, on_incumbent=None):
+    """
+    Same as mip_engine.top_k, except that the k best schedules are found
+    in a single search. Returns (schedules, whether the search finished
+    within time_limit seconds).
+    """
+    deadline = time.monotonic() + time_limit
+    with metrics.phase("build_model", engine="bitset"):
+        courses, ratings, incompatible, counting_rows = build_model(*data)
+    with metrics.phase("solver", engine="bitset"):
+        best, complete, _ = search(
+            courses,
+            ratings,
+            incompatible,
+            counting_rows,
+            k,
+            deadline,
+            on_incumbent=on_incumbent,
+        )
+    return [_result(courses, value, selected) for value, selected in best], complete
@@ -0,0 +1,801 @@
+"""
+Read-only access to the compiled course catalog.
+
+data_preprocessing.py compiles rawData/course_data3.json into a compact
+binary file (see the layout below). The file is memory-mapped instead of
+parsed, so loading it is close to instant and every Dash worker forked
+from the same machine shares the same pages. Full course dictionaries are
+only decoded for the sections that are actually asked for.
+
+Layout (little-endian):
+    header
+    string table:  offsets (u32 * (string_count + 1)) followed by utf-8 bytes
+    records:       one RECORD per section, sorted by course code
+    meetings:      one MEETING per courseSchedule entry
+    exclusions:    u32 string ids of the courseMutualExclusionKey entries
+    raw:           every section's original JSON, decoded on demand
+
+The catalog can also be updated while the server runs, without
+recompiling or reloading anything (see UPDATES below): sections that
+changed are kept in memory on top of the file, and every update makes a
+new Catalog, so the requests using the previous one are never affected.
+"""
+
+import copy
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+import config
+from conflicts import to_days, to_minutes
+from course_codes import campus
+
+MAGIC = b"CSCATLOG"
+FORMAT_VERSION = 4
+
+HEADER = struct.Struct(
+    "<8sHxx"  # magic, format version
+    "IIII"  # section, string, meeting and exclusion counts
+    "IIIIII"  # string offsets/bytes, records, meetings, exclusions, raw offsets
+    "qq"  # mtime (ns) and size of the source file it was compiled from
+    "16s"  # digest of the source file
+    "q"  # until (timestamp of the source data)
+    "16s"  # digest of the terms and campuses selected (see selected())
+)
+# code, name, term (string ids), first meeting, meeting count,
+# first exclusion key, exclusion key count, credits, seats total,
+# seats filled, raw JSON offset, raw JSON length, key in the source data
+# (string id)
+RECORD = struct.Struct("<IIIIHIHfiiIII")
+# day bitmask, start minute, end minute, first and last day (both
+# included, in days since conflicts.DATE_EPOCH)
+MEETING = struct.Struct("<BxHHHH")
+STRING_ID = struct.Struct("<I")
+
+# The same layouts for reading whole tables at once with numpy
+RECORD_DTYPE = [
+    ("code", "<u4"),
+    ("name", "<u4"),
+    ("term", "<u4"),
+    ("first_meeting", "<u4"),
+    ("meeting_count", "<u2"),
+    ("first_exclusion", "<u4"),
+    ("exclusion_count", "<u2"),
+    ("credits", "<f4"),
+    ("seats_total", "<i4"),
+    ("seats_filled", "<i4"),
+    ("raw_offset", "<u4"),
+    ("raw_length", "<u4"),
+    ("key", "<u4"),
+]
+MEETING_DTYPE = [
+    ("days", "u1"),
+    ("padding", "u1"),
+    ("start", "<u2"),
+    ("end", "<u2"),
+    ("first_day", "<u2"),
+    ("last_day", "<u2"),
+]
+
+# Date range of the meetings that come without dates
+FIRST_DAY = 0
+LAST_DAY = 0xFFFF
+
+DAYS = "MTWRFSU"
+
+
+def day_mask(days):
+    mask = 0
+    for day in days:
+        if day in DAYS:
+            mask |= 1 << DAYS.index(day)
+    return mask
+
+
+def mask_days(mask):
+    return "".join(day for i, day in enumerate(DAYS) if mask & (1 << i))
+
+
+def meeting_fields(item):
+    # The fields of the MEETING of a courseSchedule entry
+    return (
+        day_mask(item["scheduleDays"]),
+        to_minutes(item["scheduleStartTime"]),
+        to_minutes(item["scheduleEndTime"]),
+        (
+            to_days(item["scheduleStartDate"])
+            if item.get("scheduleStartDate")
+            else FIRST_DAY
+        ),
+        to_days(item["scheduleEndDate"]) if item.get("scheduleEndDate") else LAST_DAY,
+    )
+
+
+def selected(course, terms=config.CATALOG_TERMS, campuses=config.CATALOG_CAMPUSES):
+    """
+    Whether a section belongs in the catalog: its term starts with one of
+    the terms (so FA2021 takes in FA2021F1 too) and it is taught at one of
+    the campuses, an empty list taking in everything.
+    """
+    if terms and not course["courseTerm"].startswith(tuple(terms)):
+        return False
+    return not campuses or campus(course["courseCode"]) in campuses
+
+
+def selection_digest(terms=config.CATALOG_TERMS, campuses=config.CATALOG_CAMPUSES):
+    selection = json.dumps([sorted(terms), sorted(campuses)])
+    return hashlib.md5(selection.encode("utf-8")).digest()
+
+
+def course_key(course):
+    # Key of a section in the courses of the source data
+    return " ".join(course["courseSortKey"])
+
+
+def encode_course(course):
+    # The raw JSON of a section, as stored in the file
+    return json.dumps(course, separators=(",", ":")).encode("utf-8")
+
+
+########## SECTIONS ##############
+
+
+class Meeting:
+    """
+    One courseSchedule entry: days as a bitmask of DAYS, start and end in
+    minutes since midnight, first and last day in days since
+    conflicts.DATE_EPOCH.
+    """
+
+    __slots__ = ("day_mask", "start", "end", "first_day", "last_day")
+
+    def __init__(self, day_mask, start, end, first_day, last_day):
+        self.day_mask = day_mask
+        self.start = start
+        self.end = end
+        self.first_day = first_day
+        self.last_day = last_day
+
+    @property
+    def days(self):
+        return mask_days(self.day_mask)
+
+    def __repr__(self):
+        return f"Meeting({self.days}, {self.start}-{self.end})"
+
+
+class Course:
+    """
+    The fields of a section the optimizer and the app use, read out of the
+    catalog without decoding its JSON. The description and instructors are
+    only decoded from the raw JSON when they are asked for.
+    """
+
+    __slots__ = (
+        "index",
+        "code",
+        "name",
+        "term",
+        "credits",
+        "seats_total",
+        "seats_filled",
+        "meetings",
+        "_catalog",
+        "_details",
+    )
+
+    def __init__(self, course_catalog, index):
+        self._catalog = course_catalog
+        self._details = None
+        self.index = index
+        self.code = course_catalog.code(index)
+        self.name = sys.intern(course_catalog.name(index))
+        self.term = sys.intern(course_catalog.term(index))
+        self.credits = course_catalog.credits(index)
+        self.seats_total, self.seats_filled = course_catalog.seats(index)
+        self.meetings = tuple(
+            Meeting(*row) for row in course_catalog.meeting_rows(index)
+        )
+
+    def _detail(self, field):
+        if self._details is None:
+            self._details = self._catalog.course(self.code)
+        return self._details.get(field)
+
+    @property
+    def description(self):
+        return self._detail("courseDescription")
+
+    @property
+    def instructors(self):
+        return self._detail("courseInstructors") or []
+
+    def __repr__(self):
+        return f"Course({self.code!r}, {self.name!r})"
+
+
+class Catalog:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            format_version,
+            self._section_count,
+            self._string_count,
+            self._meeting_count,
+            self._exclusion_count,
+            self._string_offsets,
+            self._string_bytes,
+            self._records,
+            self._meetings,
+            self._exclusions,
+            self._raw,
+            self.source_mtime_ns,
+            self.source_size,
+            digest,
+            self.until,
+            _,
+        ) = HEADER.unpack_from(self._buffer, 0)
+
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(
+                f"{path} is not a compiled catalog (version {FORMAT_VERSION})"
+            )
+
+        # The compiled file this catalog and every update of it are based on
+        self.lineage = digest.hex()
+        # Number of updates applied since it was loaded
+        self.generation = 0
+        # Identifies the catalog contents, e.g. for caching solutions.
+        self.version = self.lineage
+        # Sections changed by updates: index -> course dictionary, and the
+        # indices of the sections removed since
+        self._changed = {}
+        self._removed = frozenset()
+        # code -> generation of the last update that changed the section
+        self._revisions = {}
+        # (generation, changed codes) of every update applied
+        self.updates = ()
+        self._size = self._section_count
+        self._index = None
+        self._keys = None
+        self._conflict_matrix = None
+        self._interval_index = None
+        # Built at load: the exclusion keys of every section and the
+        # sections of every exclusion key
+        self._section_exclusions, self._exclusion_sections = self._exclusion_index()
+        # Reentrant, the conflict matrix is built from the interval index
+        self._lock = threading.RLock()
+
+    def close(self):
+        self._buffer.close()
+
+    ########## STRINGS ##############
+
+    def _string(self, string_id):
+        start, end = struct.unpack_from(
+            "<II", self._buffer, self._string_offsets + 4 * string_id
+        )
+        return self._buffer[
+            self._string_bytes + start : self._string_bytes + end
+        ].decode("utf-8")
+
+    def _record(self, i):
+        if not 0 <= i < self._section_count:
+            raise IndexError(i)
+        return RECORD.unpack_from(self._buffer, self._records + RECORD.size * i)
+
+    def _exclusion_index(self):
+        key_ids = [
+            key_id
+            for (key_id,) in STRING_ID.iter_unpack(
+                self._buffer[
+                    self._exclusions : self._exclusions + 4 * self._exclusion_count
+                ]
+            )
+        ]
+        keys = {key_id: self._string(key_id) for key_id in set(key_ids)}
+        records = self._buffer[
+            self._records : self._records + RECORD.size * self._section_count
+        ]
+        section_exclusions = []
+        exclusion_sections = {}
+        for i, record in enumerate(RECORD.iter_unpack(records)):
+            start, count = record[5], record[6]
+            section_keys = tuple(
+                keys[key_id] for key_id in key_ids[start : start + count]
+            )
+            section_exclusions.append(section_keys)
+            for key in section_keys:
+                exclusion_sections.setdefault(key, []).append(i)
+        return section_exclusions, {
+            key: tuple(sections) for key, sections in exclusion_sections.items()
+        }
+
+    ########## LOOKUPS ##############
+
+    def __len__(self):
+        # Removed sections keep their index, sections added by updates get
+        # the next ones
+        return self._size
+
+    def __contains__(self, code):
+        return code in self._code_index()
+
+    def __iter__(self):
+        return iter(self.codes())
+
+    def _code_index(self):
+        # Built on first use: course code -> position of its record
+        if self._index is None:
+            self._index = {self.code(i): i for i in range(self._section_count)}
+        return self._index
+
+    def _key_index(self):
+        # Built on first use: key in the source data -> position of its record
+        if self._keys is None:
+            self._keys = {
+                self._string(self._record(i)[12]): i for i in range(self._section_count)
+            }
+        return self._keys
+
+    def codes(self):
+        return list(self._code_index())
+
+    def index(self, code):
+        return self._code_index()[code]
+
+    ########## SECTION FIELDS ##############
+
+    def code(self, i):
+        if i in self._changed:
+            return self._changed[i]["courseCode"]
+        return self._string(self._record(i)[0])
+
+    def name(self, i):
+        if i in self._changed:
+            return self._changed[i]["courseName"]
+        return self._string(self._record(i)[1])
+
+    def term(self, i):
+        if i in self._changed:
+            return self._changed[i]["courseTerm"]
+        return self._string(self._record(i)[2])
+
+    def exclusion_keys(self, i):
+        if i in self._removed:
+            return ()
+        if i in self._changed:
+            return tuple(self._changed[i]["courseMutualExclusionKey"])
+        if not 0 <= i < self._section_count:
+            raise IndexError(i)
+        return self._section_exclusions[i]
+
+    def exclusion_group(self, key):
+        """
+        Returns the indices of every section with the given
+        courseMutualExclusionKey, i.e. every section of the same course.
+        """
+        return self._exclusion_sections.get(key, ())
+
+    def credits(self, i):
+        if i in self._changed:
+            return self._changed[i]["courseCredits"]
+        return self._record(i)[7]
+
+    def seats(self, i):
+        # (seats total, seats filled)
+        if i in self._changed:
+            course = self._changed[i]
+            return course["courseSeatsTotal"] or 0, course["courseSeatsFilled"] or 0
+        record = self._record(i)
+        return record[8], record[9]
+
+    def meeting_rows(self, i):
+        # The MEETING fields of every courseSchedule entry of the section
+        if i in self._removed:
+            return []
+        if i in self._changed:
+            return [meeting_fields(item) for item in self._changed[i]["courseSchedule"]]
+        record = self._record(i)
+        start, count = record[3], record[4]
+        return [
+            MEETING.unpack_from(self._buffer, self._meetings + MEETING.size * j)
+            for j in range(start, start + count)
+        ]
+
+    def meetings(self, i):
+        """
+        Returns a list of (day, start, end) tuples, one for every day the
+        section meets on, with start and end in minutes since midnight.
+        """
+        return [
+            (day, start_time, end_time)
+            for day, start_time, end_time, _, _ in self.dated_meetings(i)
+        ]
+
+    def dated_meetings(self, i):
+        """
+        Same as meetings(), with the first and last day of the date range
+        of every meeting added: (day, start, end, first day, last day).
+        """
+        intervals = []
+        for mask, start_time, end_time, first_day, last_day in self.meeting_rows(i):
+            if end_time <= start_time:
+                continue
+            for day in mask_days(mask):
+                intervals.append((day, start_time, end_time, first_day, last_day))
+        return intervals
+
+    def meeting_table(self):
+        """
+        All meetings of the catalog as numpy arrays, read straight out of
+        the file: (section index, day bitmask, start minute, end minute,
+        first day, last day). Meetings of the sections changed by updates
+        come last.
+        """
+        import numpy as np
+
+        meetings = np.frombuffer(
+            self._buffer,
+            dtype=MEETING_DTYPE,
+            count=self._meeting_count,
+            offset=self._meetings,
+        )
+        records = np.frombuffer(
+            self._buffer,
+            dtype=RECORD_DTYPE,
+            count=self._section_count,
+            offset=self._records,
+        )
+        # Meetings are stored in the same order as the sections
+        sections = np.repeat(np.arange(self._section_count), records["meeting_count"])
+        table = (
+            sections,
+            meetings["days"],
+            meetings["start"].astype(np.int32),
+            meetings["end"].astype(np.int32),
+            meetings["first_day"].astype(np.int32),
+            meetings["last_day"].astype(np.int32),
+        )
+        if not self._changed and not self._removed:
+            return table
+
+        current = ~np.isin(sections, list(self._changed.keys() | self._removed))
+        changed = [
+            (i, *meeting_fields(item))
+            for i, course in sorted(self._changed.items())
+            if i not in self._removed
+            for item in course["courseSchedule"]
+        ]
+        changed = np.array(changed, dtype=np.int64).reshape(-1, 6)
+        return tuple(
+            np.concatenate([column[current], changed[:, n].astype(column.dtype)])
+            for n, column in enumerate(table)
+        )
+
+    def conflict_matrix(self):
+        """
+        The pairwise time conflicts between every two sections of the
+        catalog, computed on first use. (See conflict_matrix.py)
+        """
+        if self._conflict_matrix is None:
+            with self._lock:
+                if self._conflict_matrix is None:
+                    import conflict_matrix
+
+                    self._conflict_matrix = conflict_matrix.build(self)
+        return self._conflict_matrix
+
+    def interval_index(self):
+        """
+        The meetings of every section of the catalog in an interval tree,
+        built on first use. (See interval_index.py)
+        """
+        if self._interval_index is None:
+            with self._lock:
+                if self._interval_index is None:
+                    import interval_index
+
+                    self._interval_index = interval_index.IntervalIndex(self)
+        return self._interval_index
+
+    def section(self, code):
+        # The section as a Course
+        return Course(self, self.index(code))
+
+    def course(self, code):
+        """
+        Returns a new dictionary with the full HyperSchedule data of the
+        section, exactly as it was in the source file.
+        """
+        i = self.index(code)
+        if i in self._changed:
+            return copy.deepcopy(self._changed[i])
+        return json.loads(self._raw_json(i).decode("utf-8"))
+
+    def _raw_json(self, i):
+        if i in self._changed:
+            return encode_course(self._changed[i])
+        record = self._record(i)
+        start = self._raw + record[10]
+        return self._buffer[start : start + record[11]]
+
+    ########## UPDATES ##############
+
+    def revision(self, code):
+        # Generation of the last update that changed the section
+        return self._revisions.get(code, 0)
+
+    def cache_version(self, codes):
+        """
+        Identifies the data of the given sections, e.g. for caching the
+        solutions of problems among them: it only changes when an update
+        changes one of them.
+        """
+        return f"{self.lineage}.{max(map(self.revision, codes), default=0)}"
+
+    def changed_since(self, generation):
+        # Codes of the sections changed by the updates after that generation
+        return {
+            code
+            for update_generation, codes in self.updates
+            if update_generation > generation
+            for code in codes
+        }
+
+    def changes_from(self, payload):
+        """
+        Returns the changes that bring this catalog up to a HyperSchedule
+        payload ({"data": {"courses": ...}, "full": ...}), in the format of
+        updated(). Sections set to null in the payload are removed, as are
+        the sections missing from a full payload, and sections identical to
+        the ones of the catalog are left out.
+        """
+        courses = payload["data"]["courses"]
+        code_index = self._code_index()
+        changes = {}
+        for key, course in courses.items():
+            if course is None:
+                i = self._key_index().get(key)
+                if i is not None and i not in self._removed:
+                    changes[self.code(i)] = None
+                continue
+            i = code_index.get(course["courseCode"])
+            if not selected(course):
+                if i is not None:
+                    changes[course["courseCode"]] = None
+                continue
+            if i is None or self._raw_json(i) != encode_course(course):
+                changes[course["courseCode"]] = course
+        if payload.get("full"):
+            present = {course["courseCode"] for course in courses.values() if course}
+            for code in code_index:
+                if code not in present:
+                    changes[code] = None
+        return changes
+
+    def with_metadata(self, until=None, source_stat=None):
+        """
+        Returns a copy of this catalog with the same contents (and version)
+        and new metadata: the "until" of the latest payload applied, and
+        the (mtime in ns, size) of the source file it reflects. This catalog
+        is left untouched for the requests and workers still using it.
+        """
+        new = copy.copy(self)
+        new._lock = threading.RLock()
+        if until is not None:
+            new.until = until
+        if source_stat is not None:
+            new.source_mtime_ns, new.source_size = source_stat
+        return new
+
+    def updated(self, changes, until=None, source_stat=None):
+        """
+        Returns a new catalog with the changes applied, a dictionary from
+        course code to the new course dictionary or None to remove the
+        section, and the given metadata (see with_metadata()). This catalog
+        is left untouched for the requests still using it. Only the changed
+        sections are updated in the indices and the conflict matrix that
+        were already built, so the cost is proportional to the size of the
+        update.
+        """
+        new = self.with_metadata(until, source_stat)
+        new.generation = self.generation + 1
+        new.version = f"{self.lineage}.{new.generation}"
+        new._changed = dict(self._changed)
+        new._revisions = dict(self._revisions)
+        new._index = dict(self._code_index())
+        new._keys = dict(self._key_index())
+        new._exclusion_sections = dict(self._exclusion_sections)
+        removed = set(self._removed)
+
+        touched = []
+        for code, course in changes.items():
+            i = new._index.get(code)
+            if i is None:
+                if course is None:
+                    continue
+                i = new._size
+                new._size += 1
+            else:
+                for key in self.exclusion_keys(i):
+                    group = tuple(j for j in new._exclusion_sections[key] if j != i)
+                    new._exclusion_sections[key] = group
+                    if not group:
+                        del new._exclusion_sections[key]
+
+            if course is None:
+                removed.add(i)
+                del new._index[code]
+            else:
+                removed.discard(i)
+                new._changed[i] = course
+                new._index[code] = i
+                new._keys[course_key(course)] = i
+                for key in course["courseMutualExclusionKey"]:
+                    new._exclusion_sections[key] = tuple(
+                        sorted(new._exclusion_sections.get(key, ()) + (i,))
+                    )
+            new._revisions[code] = new.generation
+            touched.append(i)
+        new._removed = frozenset(removed)
+        new.updates = self.updates + ((new.generation, frozenset(changes)),)
+
+        if self._interval_index is not None:
+            new._interval_index = self._interval_index.updated(new, touched)
+        if self._conflict_matrix is not None:
+            new._conflict_matrix = self._conflict_matrix.updated(new, touched)
+        return new
+
+
+########## LOADING ##############
+
+
+def is_stale(path, source):
+    """
+    True if the compiled catalog at path is missing or was compiled from a
+    different version of the source file.
+    """
+    if not os.path.exists(path):
+        return True
+    if not os.path.exists(source):
+        return False
+
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return True
+    fields = HEADER.unpack(header)
+    if fields[0] != MAGIC or fields[1] != FORMAT_VERSION:
+        return True
+    if fields[16] != selection_digest():
+        return True
+
+    stat = os.stat(source)
+    return (fields[12], fields[13]) != (stat.st_mtime_ns, stat.st_size)
+
+
+def load(path=config.CATALOG_PATH, source=config.CATALOG_SOURCE):
+    # Compiling on the fly keeps the dev server working when the
+    # source file changes; deployments can run data_preprocessing.py ahead.
+    if is_stale(path, source):
+        import data_preprocessing
+
+        data_preprocessing.compile_catalog(source, path)
+    return Catalog(path)
+
+
+def update_files(directory=config.CATALOG_UPDATES_DIR):
+    # Update files waiting in the directory, in the order to apply them
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names if name.endswith(".json")]
+
+
+# update file -> its mtime (ns) when it was last read
+_read_updates = {}
+
+
+def _apply(course_catalog, payload, until, source_stat=None):
+    # Always a new catalog, the one given may be in use by other requests.
+    # Only the metadata changes when the payload has nothing new.
+    changes = course_catalog.changes_from(payload)
+    if changes:
+        return course_catalog.updated(changes, until, source_stat)
+    return course_catalog.with_metadata(until, source_stat)
+
+
+def check_for_updates(
+    course_catalog,
+    path=config.CATALOG_PATH,
+    source=config.CATALOG_SOURCE,
+    directory=config.CATALOG_UPDATES_DIR,
+):
+    """
+    Returns the catalog with every newer snapshot and update applied, or
+    the same catalog if there is nothing new.
+
+    A new source file is compiled for the next start, and only the
+    sections that differ from the catalog are applied now. Update files
+    are HyperSchedule payloads too, usually with "full": false and only
+    the sections that changed (null for a removed section); those whose
+    "until" isn't later than the catalog's are skipped.
+    """
+    stat = os.stat(source) if os.path.exists(source) else None
+    if stat is not None and (stat.st_mtime_ns, stat.st_size) != (
+        course_catalog.source_mtime_ns,
+        course_catalog.source_size,
+    ):
+        import data_preprocessing
+
+        payload = data_preprocessing.read_payload(source)
+        if is_stale(path, source):
+            # Another process may have compiled it already
+            data_preprocessing.compile_catalog(source, path)
+        course_catalog = _apply(
+            course_catalog,
+            payload,
+            payload.get("until") or course_catalog.until,
+            (stat.st_mtime_ns, stat.st_size),
+        )
+
+    for update_path in update_files(directory):
+        try:
+            mtime_ns = os.stat(update_path).st_mtime_ns
+            if _read_updates.get(update_path) == mtime_ns:
+                continue
+            with open(update_path, encoding="utf-8") as f:
+                payload = json.load(f)
+            _read_updates[update_path] = mtime_ns
+            until = payload.get("until") or 0
+            if until > course_catalog.until:
+                course_catalog = _apply(course_catalog, payload, until)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Still being written, or not an update: tried again next time
+            _read_updates.pop(update_path, None)
+    return course_catalog
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_last_checked = 0.0
+
+
+def get_catalog():
+    """
+    The catalog shared by the whole process, loaded on first use. Every
+    few seconds the source file and the update files are checked, and a
+    new catalog with the changes applied replaces this one (which also
+    changes catalog.version). Only one thread checks, the others keep
+    getting the current catalog meanwhile instead of waiting for it.
+    """
+    global _catalog, _last_checked
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = check_for_updates(load())
+                _last_checked = time.monotonic()
+        return _catalog
+
+    if time.monotonic() - _last_checked > config.CATALOG_CHECK_INTERVAL_SECONDS:
+        if _catalog_lock.acquire(blocking=False):
+            try:
+                # The old catalog isn't closed, requests that are still
+                # using it keep working until they let go of it.
+                _catalog = check_for_updates(_catalog)
+                _last_checked = time.monotonic()
+            finally:
+                _catalog_lock.release()
+    return _catalog
@@ -0,0 +1,132 @@
+"""
+Settings that can be changed per deployment through environment
+variables, so that gunicorn workers / the dev server can be tuned
+without touching the code.
+"""
+
+import os
+
+########## SOLVER ##############
+# Engine used by optimizer() unless one is passed in: "mip", "cpsat",
+# "bitset" or "auto" (bitset for small problems, mip for the others).
+OPTIMIZER_ENGINE = os.environ.get("OPTIMIZER_ENGINE", "auto")
+
+# Largest number of courses "auto" hands to the bitset engine.
+BITSET_MAX_SECTIONS = int(os.environ.get("BITSET_MAX_SECTIONS", 25))
+
+# Number of parallel search workers of the CP-SAT engine.
+CPSAT_NUM_WORKERS = int(os.environ.get("CPSAT_NUM_WORKERS", 8))
+
+# Which or-tools MIP backend to create solvers with.
+SOLVER_BACKEND = os.environ.get("SOLVER_BACKEND", "SCIP")
+
+# Maximum number of solves allowed to run at the same time in a process.
+# Requests beyond this wait in line for a free solver.
+SOLVER_MAX_CONCURRENCY = int(os.environ.get("SOLVER_MAX_CONCURRENCY", 4))
+
+# Maximum number of idle solver instances kept around for reuse.
+SOLVER_POOL_SIZE = int(os.environ.get("SOLVER_POOL_SIZE", SOLVER_MAX_CONCURRENCY))
+
+# Wall-clock time (in seconds) optimizer() may spend on a problem before it
+# returns the best schedule found so far, and the relative gap to the best
+# possible schedule at which it may stop early (0 = prove the best one).
+SOLVE_TIME_LIMIT_SECONDS = float(os.environ.get("SOLVE_TIME_LIMIT_SECONDS", 10))
+SOLVE_GAP_LIMIT = float(os.environ.get("SOLVE_GAP_LIMIT", 0))
+
+# Number of alternative schedules shown to the user, and the wall-clock
+# time (in seconds) allowed for finding all of them.
+TOP_K_SCHEDULES = int(os.environ.get("TOP_K_SCHEDULES", 3))
+TOP_K_TIME_LIMIT_SECONDS = float(os.environ.get("TOP_K_TIME_LIMIT_SECONDS", 5))
+
+########## JOB QUEUE ##############
+# Worker processes solving queued optimization jobs (see jobs.py).
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+
+# Jobs that may be waiting or running at once before new ones are turned
+# away with a "busy, try again" message.
+JOB_MAX_QUEUE = int(os.environ.get("JOB_MAX_QUEUE", 32))
+
+# Seconds a job may run before it is reported as timed out.
+JOB_TIMEOUT_SECONDS = float(os.environ.get("JOB_TIMEOUT_SECONDS", 30))
+
+# Seconds the result of a finished job is kept for the page to fetch.
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("JOB_RESULT_TTL_SECONDS", 600))
+
+# How often (in milliseconds) the page asks for the status of its job.
+JOB_POLL_INTERVAL_MS = int(os.environ.get("JOB_POLL_INTERVAL_MS", 500))
+
+########## BATCH ##############
+# Worker processes solving a cohort of students at once (see batch.py).
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+
+# Seat pricing iterations of a joint allocation (see allocation.py), and
+# the largest change of a seat's price (in rating points) in the first one.
+ALLOCATION_ITERATIONS = int(os.environ.get("ALLOCATION_ITERATIONS", 30))
+ALLOCATION_PRICE_STEP = float(os.environ.get("ALLOCATION_PRICE_STEP", 2))
+
+########## SESSIONS ##############
+# Live models kept per browser session for warm-started re-solves.
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", 64))
+
+# Seconds of inactivity after which a session's model is dropped.
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", 1800))
+
+# Relaxed constraints a session's model may pile up before it is rebuilt.
+SESSION_MAX_DEAD_ROWS = int(os.environ.get("SESSION_MAX_DEAD_ROWS", 200))
+
+########## CATALOG ##############
+# HyperSchedule course data the catalog is compiled from.
+CATALOG_SOURCE = os.environ.get("CATALOG_SOURCE", "rawData/course_data3.json")
+
+# Terms and campuses (comma separated, e.g. "FA2021" and "HM,PO") of the
+# sections kept in the catalog, all of them when empty. A term takes in its
+# half semesters (FA2021 keeps FA2021F1 and FA2021F2 too).
+CATALOG_TERMS = [
+    term.strip() for term in os.environ.get("CATALOG_TERMS", "").split(",") if term
+]
+CATALOG_CAMPUSES = [
+    campus.strip()
+    for campus in os.environ.get("CATALOG_CAMPUSES", "").split(",")
+    if campus
+]
+
+# Compiled binary catalog (see data_preprocessing.py and catalog.py).
+CATALOG_PATH = os.environ.get("CATALOG_PATH", "rawData/course_data3.catalog")
+
+# How often (in seconds) to check whether the source file changed.
+CATALOG_CHECK_INTERVAL_SECONDS = float(
+    os.environ.get("CATALOG_CHECK_INTERVAL_SECONDS", 5)
+)
+
+# Directory of catalog update files (HyperSchedule payloads with only the
+# sections that changed), applied without a restart.
+CATALOG_UPDATES_DIR = os.environ.get("CATALOG_UPDATES_DIR", "rawData/updates")
+
+########## SOLUTION CACHE ##############
+# Number of solved problems kept in memory by each process.
+SOLUTION_CACHE_SIZE = int(os.environ.get("SOLUTION_CACHE_SIZE", 256))
+
+# Seconds after which a cached solution is solved again (0 = never).
+SOLUTION_CACHE_TTL_SECONDS = float(os.environ.get("SOLUTION_CACHE_TTL_SECONDS", 3600))
+
+# Directory shared by all workers for cached solutions (empty = disabled).
+SOLUTION_CACHE_DIR = os.environ.get("SOLUTION_CACHE_DIR", "")
+
+# Cached solutions kept in that directory, the oldest ones are deleted
+# beyond it.
+SOLUTION_CACHE_DIR_MAX_FILES = int(
+    os.environ.get("SOLUTION_CACHE_DIR_MAX_FILES", 10000)
+)
+
+########## SAVED SCHEDULES ##############
+# SQLite database the schedules are saved in (see schedule_store.py).
+SCHEDULE_STORE_PATH = os.environ.get("SCHEDULE_STORE_PATH", "rawData/schedules.sqlite3")
+
+# Seconds between two batches of writes to the database.
+SCHEDULE_STORE_FLUSH_SECONDS = float(os.environ.get("SCHEDULE_STORE_FLUSH_SECONDS", 1))
+
+# Days a saved schedule is kept after it was last looked at.
+SCHEDULE_RETENTION_DAYS = float(os.environ.get("SCHEDULE_RETENTION_DAYS", 90))
+
+# Most schedules kept, the least recently looked at are dropped first.
+SCHEDULE_STORE_MAX_ROWS = int(os.environ.get("SCHEDULE_STORE_MAX_ROWS", 100000))
@@ -0,0 +1,154 @@
+"""
+Catalog-wide time conflicts, computed once with numpy.
+
+Every section's weekly meetings are encoded as a row of bits, one bit per
+(day, 5 minute slot). Two sections conflict when their rows share a set
+bit, so the conflicts between the few hundred distinct rows are a single
+matrix product, expanded into the ~2000 x 2000 conflict matrix. It is
+kept packed (8 sections per byte), and the conflicts between a set of
+candidate sections are found by slicing it.
+
+The bits only know about the days of the week, so the rows of the few
+sections that don't fit them (half semester courses, meetings that don't
+start and end on a slot boundary) are looked up in the interval index
+instead (see interval_index.py), as are the rows of the sections changed
+by catalog updates.
+"""
+
+import numpy as np
+
+from catalog import DAYS
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WIDTH = len(DAYS) * SLOTS_PER_DAY
+# Rows of the conflict matrix expanded at once while building it
+BLOCK_ROWS = 256
+
+
+def time_bitmasks(course_catalog):
+    """
+    Returns a (number of sections, WIDTH) boolean array where
+    [i, day * SLOTS_PER_DAY + slot] is True if section i is taking place
+    during that slot.
+    """
+    sections, day_masks, starts, ends, _, _ = course_catalog.meeting_table()
+    valid = ends > starts
+
+    rows = []
+    start_slots = []
+    end_slots = []
+    for day in range(len(DAYS)):
+        on_day = valid & ((day_masks & (1 << day)) != 0)
+        offset = day * SLOTS_PER_DAY
+        rows.append(sections[on_day])
+        start_slots.append(offset + starts[on_day] // SLOT_MINUTES)
+        # Rounded up so that a meeting covers every slot it touches
+        end_slots.append(offset - (-ends[on_day] // SLOT_MINUTES))
+    rows = np.concatenate(rows)
+
+    # +1 where a meeting starts and -1 where it ends, so that the running
+    # sum along a row is positive exactly during the meetings. (A byte is
+    # plenty, no section has that many meetings at once.)
+    changes = np.zeros((len(course_catalog), WIDTH + 1), dtype=np.int8)
+    np.add.at(changes, (rows, np.concatenate(start_slots)), 1)
+    np.add.at(changes, (rows, np.concatenate(end_slots)), -1)
+    return np.cumsum(changes, axis=1, dtype=np.int8)[:, :WIDTH] > 0
+
+
+class ConflictMatrix:
+    def __init__(self, packed, size, exact=frozenset()):
+        # packed[i] holds the bits of row i of the conflict matrix
+        self.packed = packed
+        self.size = size
+        # Sections whose rows were looked up in the interval index
+        self.exact = exact
+
+    def conflicts(self, i, j):
+        return bool(self.packed[i, j // 8] & (0x80 >> (j % 8)))
+
+    def submatrix(self, indices):
+        """
+        Boolean matrix of the conflicts between the given sections,
+        in the order they were given.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        rows = np.unpackbits(self.packed[indices], axis=1, count=self.size)
+        return rows[:, indices].astype(bool)
+
+    def edges(self, indices):
+        """
+        Returns the (a, b) pairs, a < b, of positions in indices whose
+        sections conflict with each other.
+        """
+        first, second = np.nonzero(np.triu(self.submatrix(indices), 1))
+        return list(zip(first.tolist(), second.tolist()))
+
+    def updated(self, course_catalog, sections):
+        """
+        Returns the conflict matrix of course_catalog, an update of this
+        matrix's catalog that changed the given sections. Only their rows
+        and columns are recomputed.
+        """
+        size = len(course_catalog)
+        packed = np.zeros((size, -(-size // 8)), dtype=np.uint8)
+        packed[: self.size, : self.packed.shape[1]] = self.packed
+        _set_exact_rows(packed, sections, course_catalog.interval_index())
+        return ConflictMatrix(packed, size, self.exact | frozenset(sections))
+
+
+def _set_exact_rows(packed, sections, index):
+    # Replaces the rows and columns of the sections in the packed matrix by
+    # their conflicts in the interval index
+    for i in sections:
+        packed[i, :] = 0
+        packed[:, i // 8] &= np.uint8(~(0x80 >> (i % 8)) & 0xFF)
+    for i in sections:
+        for j in index.conflicts_with(i):
+            packed[i, j // 8] |= 0x80 >> (j % 8)
+            packed[j, i // 8] |= 0x80 >> (i % 8)
+
+
+def build(course_catalog):
+    # Most sections meet at one of a few hundred distinct times, so the
+    # overlaps are computed between those and then expanded a block of
+    # rows at a time, never holding more than the packed matrix.
+    # (Rows are compared as opaque bytes, much faster than np.unique on axis 0)
+    rows = np.packbits(time_bitmasks(course_catalog), axis=1)
+    patterns, pattern_of = np.unique(
+        rows.view(f"V{rows.shape[1]}").reshape(-1), return_inverse=True
+    )
+    pattern_of = pattern_of.reshape(-1)
+    patterns = np.unpackbits(patterns.view(np.uint8).reshape(len(patterns), -1), axis=1)
+    as_floats = patterns.astype(np.float32)
+    pattern_overlap = (as_floats @ as_floats.T) > 0
+
+    size = len(course_catalog)
+    packed = np.empty((size, -(-size // 8)), dtype=np.uint8)
+    for start in range(0, size, BLOCK_ROWS):
+        block = pattern_overlap[pattern_of[start : start + BLOCK_ROWS]]
+        packed[start : start + BLOCK_ROWS] = np.packbits(block[:, pattern_of], axis=1)
+    # No section conflicts with itself
+    diagonal = np.arange(size)
+    packed[diagonal, diagonal // 8] &= ~(0x80 >> (diagonal % 8)).astype(np.uint8)
+
+    # Meetings that don't start and end on a slot boundary are rounded
+    # outwards, which could make back to back sections look like they
+    # conflict, and two sections that meet at the same time in different
+    # halves of the semester don't conflict. The rows of those sections
+    # are replaced by their exact conflicts, as every other section meets
+    # over the same dates.
+    sections, _, starts, ends, first_days, last_days = course_catalog.meeting_table()
+    dates = first_days.astype(np.int64) << 16 | last_days
+    values, counts = np.unique(dates, return_counts=True)
+    usual_dates = values[counts.argmax()] if len(values) else 0
+    irregular = np.unique(
+        sections[
+            (starts % SLOT_MINUTES != 0)
+            | (ends % SLOT_MINUTES != 0)
+            | (dates != usual_dates)
+        ]
+    )
+    irregular = irregular.tolist()
+    _set_exact_rows(packed, irregular, course_catalog.interval_index())
+    return ConflictMatrix(packed, size, frozenset(irregular))
@@ -0,0 +1,139 @@
+"""
+Builds the time conflict part of the optimization model.
+
+Which sections conflict is read from the catalog's conflict matrix (see
+conflict_matrix.py), built once from the meeting times of every section.
+The conflicting pairs among the courses of a request are then grouped
+into cliques of courses that all conflict with each other, so that an
+"at most one of them" constraint per clique covers every pair and the
+number of constraints grows with the number of real overlaps instead of
+with the number of pairs.
+
+The few sections that aren't on the regular slots (half semester
+courses, meetings that don't start and end on a slot boundary) fall
+back to a sweep line over their meetings, every day of the week, which
+finds the maximal cliques they take part in exactly.
+
+Meeting times are stored as integer minutes and dates as integer days, see
+to_minutes() and to_days().
+"""
+
+import datetime
+from collections import defaultdict
+
+# Dates are stored as the number of days since this one
+DATE_EPOCH = datetime.date(2000, 1, 1)
+
+# At the same minute (or day), end events are processed before start events
+# because courses can take place back to back.
+END = 0
+START = 1
+
+
+def to_minutes(time_string):
+    # "hh:mm" -> minutes since midnight
+    hours, minutes = time_string.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def to_days(date_string):
+    # "yyyy-mm-dd" -> days since DATE_EPOCH
+    return (datetime.date.fromisoformat(date_string) - DATE_EPOCH).days
+
+
+def clique_cover(edges):
+    """
+    Groups conflicting pairs of courses (e.g. from the catalog's conflict
+    matrix) into cliques of courses that all conflict with each other, so
+    that every pair is covered by at least one "at most one of them"
+    constraint while needing fewer, tighter constraints than one per pair.
+    """
+    neighbours = defaultdict(set)
+    for a, b in edges:
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    covered = set()
+    cliques = []
+    for a, b in sorted(edges):
+        if (a, b) in covered:
+            continue
+        clique = [a, b]
+        candidates = neighbours[a] & neighbours[b]
+        # Greedily grow the clique, trying the most connected courses first
+        for course in sorted(candidates, key=lambda c: (-len(neighbours[c]), c)):
+            if course in candidates:
+                clique.append(course)
+                candidates &= neighbours[course]
+        clique.sort()
+        for i, first in enumerate(clique):
+            for second in clique[i + 1 :]:
+                covered.add((first, second))
+        cliques.append(tuple(clique))
+    return cliques
+
+
+def _sweep(intervals):
+    """
+    intervals is a list of (start, end, key) tuples, with end excluded.
+
+    Returns the sets of keys of the maximal groups of intervals that all
+    overlap at some point.
+    """
+    events = []
+    for start, end, key in intervals:
+        events.append((start, START, key))
+        events.append((end, END, key))
+    events.sort()
+    groups = []
+    active = set()
+    last_was_start = False
+    for _, kind, key in events:
+        if kind == START:
+            active.add(key)
+            last_was_start = True
+        else:
+            # The set of active intervals right before the first end event
+            # following a start is a maximal group.
+            if last_was_start:
+                groups.append(set(active))
+            last_was_start = False
+            active.discard(key)
+    return groups
+
+
+def conflict_cliques(course_meetings):
+    """
+    course_meetings is a dictionary from course code to the meetings of
+    its section, as returned by catalog.Catalog.dated_meetings.
+
+    Returns a list of tuples of courses that all overlap at some point in
+    the semester. Picking at most one course out of every tuple is exactly
+    the "no two courses at the same time" constraint for these courses.
+    """
+    meetings = []
+    by_day = defaultdict(list)
+    for course, dated_meetings in course_meetings.items():
+        for day, start_time, end_time, first_day, last_day in dated_meetings:
+            by_day[day].append((start_time, end_time, len(meetings)))
+            meetings.append((course, first_day, last_day))
+
+    cliques = set()
+    for intervals in by_day.values():
+        for group in _sweep(intervals):
+            if len(group) < 2:
+                continue
+            # Meetings at the same time of day only overlap if their date
+            # ranges do, which is the same sweep over days
+            dated = [(meetings[i][1], meetings[i][2] + 1, i) for i in group]
+            for dated_group in _sweep(dated):
+                clique = frozenset(meetings[i][0] for i in dated_group)
+                if len(clique) > 1:
+                    cliques.add(clique)
+    # A clique found on one day can be contained in a bigger one found on
+    # another day, in which case its constraint is redundant.
+    maximal = []
+    for clique in sorted(cliques, key=len, reverse=True):
+        if not any(clique <= other for other in maximal):
+            maximal.append(clique)
+    return sorted(tuple(sorted(clique)) for clique in maximal)
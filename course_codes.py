@@ -0,0 +1,125 @@
+"""
+Structured course codes, and the patterns requirements are written in.
+
+A code like "CSCI 140 HM-01" is made of a department (CSCI), a course
+number (140, a few are two tokens like "001 L") and a section (HM-01,
+taught at the HM campus). Every requirement lists patterns of the courses
+that count towards it, which are matched part by part:
+
+    CSCI        every CSCI course
+    CSCI 140    every section of CSCI 140
+    CSCI 1*     CSCI courses whose number starts with 1 (CSCI 1** too)
+    * HM-*      every course taught at HM (HM- works too)
+    *           every course, as does a blank pattern
+
+"*" stands for any number of characters and "?" for exactly one, parts
+without them have to match exactly (ignoring case). Patterns used to be
+matched as plain substrings of the code, so "CS" counted both CSCI and
+CSMT courses and "MATH 1" counted MATH 10 as well as MATH 189.
+"""
+
+import fnmatch
+import re
+from collections import namedtuple
+
+CourseCode = namedtuple("CourseCode", ["department", "number", "section"])
+
+WILDCARDS = "*?["
+
+
+def parse_code(code):
+    # Example: ASTR 001 L PO-01 -> ("ASTR", "001 L", "PO-01")
+    tokens = code.split()
+    section = tokens.pop() if len(tokens) > 1 and "-" in tokens[-1] else ""
+    department = tokens[0] if tokens else ""
+    return CourseCode(department, " ".join(tokens[1:]), section)
+
+
+def campus(code):
+    # Example: CSCI 140 HM-01 -> HM
+    return parse_code(code).section.split("-")[0]
+
+
+def parse_pattern(pattern):
+    """
+    Returns the (department, number, section) parts of a pattern, None
+    standing for a part that matches anything.
+    """
+    tokens = str(pattern).upper().split()
+    section = None
+    if tokens and "-" in tokens[-1]:
+        section = tokens.pop()
+        if section.endswith("-"):
+            # The campus only: HM- -> HM-*
+            section += "*"
+    department = tokens[0] if tokens else None
+    number = " ".join(tokens[1:]) or None
+    return CourseCode(
+        *(
+            None if part is None or not part.strip("*") else part
+            for part in (department, number, section)
+        )
+    )
+
+
+def _selector(part):
+    """
+    Returns a function from a trie node to its children whose keys match
+    a part of a pattern.
+    """
+    if part is None:
+        return lambda node: node.values()
+    if not any(wildcard in part for wildcard in WILDCARDS):
+        return lambda node: [node[part]] if part in node else []
+    matches = re.compile(fnmatch.translate(part)).match
+    return lambda node: [child for key, child in node.items() if matches(key)]
+
+
+class CodeTrie:
+    """
+    Course codes stored along their department, number and section, so a
+    pattern only has to look at the branches its parts can match (e.g.
+    "CSCI 1*" only at the numbers of CSCI). Patterns of sections only
+    (e.g. "* HM-*") are looked up among the sections directly.
+    """
+
+    def __init__(self, codes=()):
+        # department -> number -> section -> code
+        self.root = {}
+        # section -> codes
+        self.sections = {}
+        for code in codes:
+            self.add(code)
+
+    def add(self, code):
+        department, number, section = (part.upper() for part in parse_code(code))
+        self.root.setdefault(department, {}).setdefault(number, {})[section] = code
+        self.sections.setdefault(section, []).append(code)
+
+    def match(self, pattern):
+        """
+        Returns the codes that match the pattern, in no particular order.
+        """
+        department, number, section = parse_pattern(pattern)
+        if department is None and number is None:
+            return [
+                code for codes in _selector(section)(self.sections) for code in codes
+            ]
+        numbers_of, sections_of, codes_of = map(
+            _selector, (department, number, section)
+        )
+        return [
+            code
+            for numbers in numbers_of(self.root)
+            for sections in sections_of(numbers)
+            for code in codes_of(sections)
+        ]
+
+    def match_any(self, patterns):
+        """
+        Returns the set of codes that match at least one of the patterns.
+        """
+        matched = set()
+        for pattern in patterns:
+            matched.update(self.match(pattern))
+        return matched
@@ -0,0 +1,278 @@
+"""
+The constraint programming engine, using or-tools' CP-SAT solver.
+
+Instead of "at most one of these courses" rows for time conflicts, every
+meeting of a course is an optional interval that is only present if the
+course is selected, and the intervals of every day may not overlap. The
+semester is split into the periods over which the candidate courses meet
+(e.g. its two halves), and every period has its own days. The search
+runs on several workers in parallel (see config.py).
+"""
+
+import time
+from collections import defaultdict
+
+from ortools.sat.python import cp_model
+
+import anytime
+import catalog
+import config
+import metrics
+import model_builder
+
+
+def _merged_meetings(meetings):
+    """
+    Returns the meetings of one course as non-overlapping (day, start, end)
+    intervals. Some sections list the same meeting twice, which would
+    otherwise keep them from ever being selected.
+    """
+    by_day = defaultdict(list)
+    for day, start_time, end_time in meetings:
+        by_day[day].append([start_time, end_time])
+
+    merged = []
+    for day, intervals in by_day.items():
+        intervals.sort()
+        current = intervals[0]
+        for start_time, end_time in intervals[1:]:
+            if start_time < current[1]:
+                current[1] = max(current[1], end_time)
+            else:
+                merged.append((day, current[0], current[1]))
+                current = [start_time, end_time]
+        merged.append((day, current[0], current[1]))
+    return merged
+
+
+def _periods(dated_meetings):
+    """
+    Returns the meetings as (period, day, start, end) tuples, one for
+    every period of the semester a meeting takes place in. Periods are
+    the ranges of dates between the first and last days of all of the
+    meetings, so meetings of different periods never conflict.
+    """
+    boundaries = sorted(
+        {first_day for meetings in dated_meetings for *_, first_day, _ in meetings}
+        | {last_day + 1 for meetings in dated_meetings for *_, last_day in meetings}
+    )
+    return [
+        [
+            (period, day, start_time, end_time)
+            for day, start_time, end_time, first_day, last_day in meetings
+            for period, boundary in enumerate(boundaries)
+            if first_day <= boundary <= last_day
+        ]
+        for meetings in dated_meetings
+    ]
+
+
+def _objective_scale(courses_cost):
+    # CP-SAT only takes integer coefficients, so ratings with decimals are
+    # scaled up by the smallest power of 10 that makes them whole.
+    scale = 1
+    while scale < 10**6 and any(
+        abs(cost * scale - round(cost * scale)) > 1e-9 for cost in courses_cost
+    ):
+        scale *= 10
+    return scale
+
+
+def build_model(
+    set_courses,
+    courses_cost,
+    set_alternates,
+    alternates_dict,
+    lower_bounds,
+    upper_bounds,
+):
+    """
+    Returns (model, course -> bool variable, objective scale).
+    """
+    model = cp_model.CpModel()
+    course_catalog = catalog.get_catalog()
+
+    courses = sorted(set_courses)
+    courses_bool = {course: model.NewBoolVar(course) for course in courses}
+
+    # Time constraint: no two present meetings on the same day of the same
+    # period overlap
+    intervals_by_day = defaultdict(list)
+    periods = _periods(
+        [
+            course_catalog.dated_meetings(course_catalog.index(course))
+            for course in courses
+        ]
+    )
+    for course, meetings in zip(courses, periods):
+        meetings = [((period, day), start, end) for period, day, start, end in meetings]
+        for day, start_time, end_time in _merged_meetings(meetings):
+            intervals_by_day[day].append(
+                model.NewOptionalFixedSizeIntervalVar(
+                    start_time, end_time - start_time, courses_bool[course], ""
+                )
+            )
+    for intervals in intervals_by_day.values():
+        if len(intervals) > 1:
+            model.AddNoOverlap(intervals)
+
+    # Uniqueness and alternates constraints
+    rows = model_builder.build_constraints(
+        set_courses,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+        time_conflicts=False,
+    ).canonical_rows()
+    nonzeros = 0
+    for row_courses, (lower, upper) in rows.items():
+        nonzeros += len(row_courses)
+        if not row_courses:
+            # A requirement no selected course can count towards
+            model.AddBoolOr([])
+            continue
+        model.AddLinearConstraint(
+            sum(courses_bool[course] for course in row_courses), lower, upper
+        )
+
+    # Objective
+    scale = _objective_scale([courses_cost[course] for course in courses])
+    model.Maximize(
+        sum(
+            int(round(courses_cost[course] * scale)) * courses_bool[course]
+            for course in courses
+            if courses_cost[course]
+        )
+    )
+    metrics.model_size(
+        "cpsat",
+        len(courses_bool),
+        len(model.Proto().constraints),
+        nonzeros + sum(len(intervals) for intervals in intervals_by_day.values()),
+    )
+    return model, courses_bool, scale
+
+
+def _new_solver(time_limit):
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = config.CPSAT_NUM_WORKERS
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.001)
+    return solver
+
+
+class _IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    # Hands every improving schedule to on_incumbent(value, bound)
+    def __init__(self, scale, on_incumbent):
+        super().__init__()
+        self.scale = scale
+        self.on_incumbent = on_incumbent
+
+    def on_solution_callback(self):
+        self.on_incumbent(
+            self.ObjectiveValue() / self.scale,
+            self.BestObjectiveBound() / self.scale,
+        )
+
+
+# CP-SAT statuses -> statuses of anytime.py, anything else is UNKNOWN
+STATUSES = {
+    cp_model.OPTIMAL: anytime.OPTIMAL,
+    cp_model.FEASIBLE: anytime.FEASIBLE,
+    cp_model.INFEASIBLE: anytime.INFEASIBLE,
+}
+
+
+def solve_model(solver, model, courses_bool, scale, on_incumbent=None):
+    """
+    Same as mip_engine.solve_model: returns (status, (total value, courses)
+    or None when no schedule was found).
+    """
+    with metrics.phase("solver", engine="cpsat"):
+        if on_incumbent is None:
+            status = solver.Solve(model)
+        else:
+            status = solver.Solve(model, _IncumbentCallback(scale, on_incumbent))
+    status = STATUSES.get(status, anytime.UNKNOWN)
+
+    res = []  # list of courses that the user should take
+    course_catalog = catalog.get_catalog()
+    if status == anytime.OPTIMAL or status == anytime.FEASIBLE:
+        with metrics.phase("extraction", engine="cpsat"):
+            for course, variable in courses_bool.items():
+                if solver.Value(variable):
+                    courseName = course_catalog.name(course_catalog.index(course))
+                    res.append((course, courseName))
+    else:
+        return status, None
+
+    return status, (solver.ObjectiveValue() / scale, res)
+
+
+def solve(data, time_limit=None, gap_limit=0.0):
+    return anytime.as_result(solve_anytime(data, time_limit, gap_limit))
+
+
+def solve_anytime(data, time_limit=None, gap_limit=0.0, on_incumbent=None):
+    """
+    Returns a report of the best schedule found within time_limit seconds
+    (see anytime.py), calling on_incumbent(value, bound) every time a
+    better schedule is found.
+    """
+    start = time.monotonic()
+    with metrics.phase("build_model", engine="cpsat"):
+        model, courses_bool, scale = build_model(*data)
+    solver = _new_solver(time_limit)
+    solver.parameters.relative_gap_limit = gap_limit
+    status, result = solve_model(solver, model, courses_bool, scale, on_incumbent)
+    elapsed = time.monotonic() - start
+
+    if result is None:
+        return anytime.report(status, elapsed=elapsed)
+
+    value, courses = result
+    bound = solver.BestObjectiveBound() / scale
+    return anytime.report(status, value, courses, bound, gap_limit, elapsed)
+
+
+def top_k(data, k, time_limit, on_incumbent=None):
+    """
+    Same as mip_engine.top_k: every schedule found is excluded from the
+    following solves of the same model. Returns (schedules, whether the
+    search finished), stopping at the first solve that isn't proven like
+    mip_engine.find_schedules().
+    """
+    deadline = time.monotonic() + time_limit
+    with metrics.phase("build_model", engine="cpsat"):
+        model, courses_bool, scale = build_model(*data)
+
+    schedules = []
+    while len(schedules) < k:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return schedules, False
+
+        # Only the search for the best schedule reports its progress
+        status, result = solve_model(
+            _new_solver(remaining),
+            model,
+            courses_bool,
+            scale,
+            on_incumbent if not schedules else None,
+        )
+        if result is not None:
+            schedules.append(result)
+        if status != anytime.OPTIMAL:
+            return schedules, status == anytime.INFEASIBLE
+
+        # At least one course has to be chosen differently
+        selected = {course for course, _ in result[1]}
+        model.AddBoolOr(
+            [
+                variable.Not() if course in selected else variable
+                for course, variable in courses_bool.items()
+            ]
+        )
+
+    return schedules, True
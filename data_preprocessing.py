@@ -1,13 +1,347 @@
+"""
+Compiles the HyperSchedule course data into the binary catalog read by
+catalog.py.
+
+The source file is parsed as a stream, one section at a time, and only
+the sections of the terms and campuses in config.CATALOG_TERMS and
+config.CATALOG_CAMPUSES are kept (compacted as soon as they are parsed),
+so feeds of several terms or colleges never have to fit in memory whole.
+
+Usage:
+    python data_preprocessing.py [source.json] [target.catalog]
+"""
+
+import codecs
+import hashlib
 import json
+import os
+import re
+import struct
+import sys
+
+import catalog
+import config
+
+# Bytes read from the source file at a time
+CHUNK_SIZE = 1 << 16
+
+DECODER = json.JSONDecoder()
+NOT_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# What matters when going past an object or array without decoding it
+STRUCTURE = re.compile(r'[{}\[\]"]')
+# What is left of the buffer after a number cut short by its end
+NUMBER_CUT = re.compile(r"(?:\.|[eE][+-]?)?\Z")
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, string):
+        if string not in self.ids:
+            self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return self.ids[string]
+
+    def to_bytes(self):
+        offsets = [0]
+        encoded = []
+        for string in self.strings:
+            data = string.encode("utf-8")
+            encoded.append(data)
+            offsets.append(offsets[-1] + len(data))
+        return struct.pack(f"<{len(offsets)}I", *offsets), b"".join(encoded)
+
+
+########## STREAMING ##############
+
+
+class JSONStream:
+    """
+    Reads a JSON document from a binary file a value at a time, so that
+    only the value being read and a chunk of the file are in memory.
+    """
+
+    def __init__(self, f, on_chunk=None):
+        self.f = f
+        # Called with every chunk of bytes read, e.g. to hash the file
+        self.on_chunk = on_chunk
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def _fill(self):
+        # Reads the next chunk, False at the end of the file
+        chunk = self.f.read(CHUNK_SIZE)
+        if self.on_chunk is not None and chunk:
+            self.on_chunk(chunk)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position :] + self._utf8.decode(
+            chunk, final=self.eof
+        )
+        self.position = 0
+        return not self.eof
+
+    def peek(self):
+        # The next character that isn't whitespace
+        while True:
+            match = NOT_WHITESPACE.search(self.buffer, self.position)
+            if match:
+                self.position = match.start()
+                return self.buffer[self.position]
+            self.position = len(self.buffer)
+            if not self._fill():
+                raise ValueError("unexpected end of the JSON document")
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise ValueError(
+                f"expected {character!r} in the JSON document, "
+                f"found {self.buffer[self.position]!r}"
+            )
+        self.position += 1
+
+    def value(self):
+        # Decodes the next value
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next
+            # chunk, and it stops short of the end when cut right after a
+            # ".", an "e" or its sign
+            if (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and not self.eof
+                and NUMBER_CUT.match(self.buffer, end)
+                and self._fill()
+            ):
+                continue
+            self.position = end
+            return value
+
+    def skip(self):
+        # Goes past the next value without decoding it
+        if self.peek() not in "{[":
+            self.value()
+            return
+        depth = 0
+        while True:
+            match = STRUCTURE.search(self.buffer, self.position)
+            if match is None:
+                self.position = len(self.buffer)
+                if not self._fill():
+                    raise ValueError("unexpected end of the JSON document")
+                continue
+            if match.group() == '"':
+                # Strings may hold brackets, they are decoded to get past them
+                self.position = match.start()
+                self.value()
+                continue
+            self.position = match.end()
+            depth += 1 if match.group() in "{[" else -1
+            if depth == 0:
+                return
+
+    def keys(self):
+        """
+        Yields the keys of the next object. The value of every key has to
+        be read (or skipped) before asking for the next key.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("}")
+            return
+
+    def finish(self):
+        # Reads the rest of the file, e.g. so on_chunk sees all of it
+        while self._fill():
+            pass
+
+
+def read_source(
+    f, on_course, terms=config.CATALOG_TERMS, campuses=config.CATALOG_CAMPUSES
+):
+    """
+    Walks a HyperSchedule document, calling on_course(key, course) for
+    every section of data.courses selected by the terms and campuses (see
+    catalog.selected) as soon as it is parsed. The terms map and the
+    sections that aren't selected are never kept. Returns the other top
+    level fields (until, full, error).
+    """
+    stream = f if isinstance(f, JSONStream) else JSONStream(f)
+    fields = {}
+    for name in stream.keys():
+        if name != "data":
+            fields[name] = stream.value()
+            continue
+        for data_name in stream.keys():
+            if data_name != "courses":
+                stream.skip()
+                continue
+            for key in stream.keys():
+                course = stream.value()
+                if course is not None and catalog.selected(course, terms, campuses):
+                    on_course(key, course)
+    return fields
+
+
+def read_payload(source=config.CATALOG_SOURCE):
+    """
+    The source file as a payload (see catalog.Catalog.changes_from), with
+    only the selected sections.
+    """
+    courses = {}
+    with open(source, "rb") as f:
+        fields = read_source(f, courses.__setitem__)
+    return {**fields, "data": {"courses": courses}}
+
+
+########## COMPILING ##############
+
+
+def compile_catalog(source=config.CATALOG_SOURCE, target=config.CATALOG_PATH):
+    stat = os.stat(source)
+    digest = hashlib.md5()
+
+    # course code -> (key, raw JSON, packed meetings, meeting count,
+    # exclusion keys, name, term, credits, seats total, seats filled) of
+    # every selected section, compacted as soon as it is parsed
+    processed_data = {}
+
+    def add(key, course):
+        meetings = [
+            catalog.MEETING.pack(*catalog.meeting_fields(item))
+            for item in course["courseSchedule"]
+        ]
+        processed_data[course["courseCode"]] = (
+            key,
+            catalog.encode_course(course),
+            b"".join(meetings),
+            len(meetings),
+            tuple(course["courseMutualExclusionKey"]),
+            course["courseName"],
+            course["courseTerm"],
+            course["courseCredits"],
+            course["courseSeatsTotal"] or 0,
+            course["courseSeatsFilled"] or 0,
+        )
+
+    with open(source, "rb") as f:
+        stream = JSONStream(f, digest.update)
+        fields = read_source(stream, add)
+        stream.finish()
+
+    strings = StringTable()
+    records = []
+    meetings = []
+    meeting_count = 0
+    exclusions = []
+    raw = []
+    raw_length = 0
+
+    for code in sorted(processed_data):
+        (
+            key,
+            course_json,
+            course_meetings,
+            course_meeting_count,
+            exclusion_keys,
+            name,
+            term,
+            credits,
+            seats_total,
+            seats_filled,
+        ) = processed_data[code]
+
+        first_meeting = meeting_count
+        meetings.append(course_meetings)
+        meeting_count += course_meeting_count
+
+        first_exclusion = len(exclusions)
+        for exclusion_key in exclusion_keys:
+            exclusions.append(catalog.STRING_ID.pack(strings.add(exclusion_key)))
+
+        raw.append(course_json)
+
+        records.append(
+            catalog.RECORD.pack(
+                strings.add(code),
+                strings.add(name),
+                strings.add(term),
+                first_meeting,
+                course_meeting_count,
+                first_exclusion,
+                len(exclusions) - first_exclusion,
+                credits,
+                seats_total,
+                seats_filled,
+                raw_length,
+                len(course_json),
+                strings.add(key),
+            )
+        )
+        raw_length += len(course_json)
+    string_offsets, string_bytes = strings.to_bytes()
+    sections = [
+        string_offsets,
+        string_bytes,
+        b"".join(records),
+        b"".join(meetings),
+        b"".join(exclusions),
+        b"".join(raw),
+    ]
+    offsets = []
+    position = catalog.HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+
+    header = catalog.HEADER.pack(
+        catalog.MAGIC,
+        catalog.FORMAT_VERSION,
+        len(records),
+        len(strings.strings),
+        meeting_count,
+        len(exclusions),
+        *offsets,
+        stat.st_mtime_ns,
+        stat.st_size,
+        digest.digest(),
+        int(fields.get("until") or 0),
+        catalog.selection_digest(),
+    )
 
-with open(r"rawData/course_data3.json", encoding="utf-8") as f:
-    raw_data = json.load(f)
+    # Written next to the target and then renamed, so that workers never
+    # map a half written file.
+    temp_target = f"{target}.{os.getpid()}.tmp"
+    with open(temp_target, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+    os.replace(temp_target, target)
 
-processed_data = {}
+    return len(records)
 
-for item in raw_data["data"]["courses"].keys():
-    newKey = raw_data["data"]["courses"][item]["courseCode"]
-    processed_data[newKey] = raw_data["data"]["courses"][item]
 
-with open(r"rawData/processed_data.json", "w") as f:
-    json.dump(processed_data, f, indent=4)
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else config.CATALOG_SOURCE
+    target = sys.argv[2] if len(sys.argv) > 2 else config.CATALOG_PATH
+    count = compile_catalog(source, target)
+    print(f"Compiled {count} sections from {source} into {target}")
@@ -1,12 +1,23 @@
-import pandas as pd
+from functools import lru_cache
 
 curr_dat_filename = "data"  # do not include filetype
 excel_file_name = "course_preferences.xlsx"  # include .xlsx
 excel_sheet_name = "Inputs"
-default_df = pd.read_excel(excel_file_name, sheet_name=excel_sheet_name)
 
 
-def parse_csv(df=default_df):
+@lru_cache(maxsize=1)
+def get_default_df():
+    # Only read (and pandas only imported) the first time the workbook is
+    # actually needed, so importing this module has no side effects.
+    import pandas as pd
+
+    return pd.read_excel(excel_file_name, sheet_name=excel_sheet_name)
+
+
+def parse_csv(df=None):
+    if df is None:
+        # parse_csv renames the columns, so the cached DataFrame is copied
+        df = get_default_df().copy()
     columns = [
         "Course Preferences",
         "Course Rankings",
@@ -0,0 +1,160 @@
+"""
+Time conflicts of single sections and of small sets of sections, looked up
+in an interval tree over the meetings of the catalog.
+
+Two meetings conflict when they are on the same day of the week, their
+times overlap and so do their date ranges. A course of the first half of
+the semester (e.g. FA2021F1) therefore never conflicts with a course of
+the second half (FA2021F2) taught at the same time.
+
+The meetings of every day are sorted by start time and laid out as an
+implicit balanced binary tree, the middle meeting of every range being
+the root of the range, along with the latest end time in every subtree.
+A query skips every subtree that ends before it starts or starts after
+it ends, so it takes logarithmic time plus the number of meetings found.
+
+When the catalog is updated, the trees are kept and only the meetings of
+the sections that changed are put in trees of their own, a layer on top
+of the trees of the earlier updates. A section is only looked up in the
+newest layer that has it. So that queries don't have to go through one
+layer per update, a new layer is merged with the layer below it while
+that one has no more sections than it (like a binary counter): every
+section is rebuilt a logarithmic number of times over all the updates,
+and there are at most logarithmically many layers.
+"""
+
+import copy
+
+import catalog
+
+
+class DayTree:
+    def __init__(self, meetings):
+        # (start, end, first day, last day, section) tuples
+        self.meetings = sorted(meetings)
+        # max_end[i] is the latest end in the subtree rooted at meeting i
+        self.max_end = [0] * len(self.meetings)
+        self._fill_max_end(0, len(self.meetings))
+
+    def _fill_max_end(self, low, high):
+        if low >= high:
+            return 0
+        middle = (low + high) // 2
+        self.max_end[middle] = max(
+            self.meetings[middle][1],
+            self._fill_max_end(low, middle),
+            self._fill_max_end(middle + 1, high),
+        )
+        return self.max_end[middle]
+
+    def overlapping(self, start, end, first_day, last_day):
+        """
+        Returns the sections of the meetings that overlap the given times
+        and date range (a section can be listed more than once).
+        """
+        found = []
+        ranges = [(0, len(self.meetings))]
+        while ranges:
+            low, high = ranges.pop()
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            if self.max_end[middle] <= start:
+                # Everything in this subtree is over before the start
+                continue
+            ranges.append((low, middle))
+            meeting_start, meeting_end, meeting_first, meeting_last, section = (
+                self.meetings[middle]
+            )
+            if meeting_start < end:
+                if (
+                    start < meeting_end
+                    and meeting_first <= last_day
+                    and first_day <= meeting_last
+                ):
+                    found.append(section)
+                # Later meetings only start after this one
+                ranges.append((middle + 1, high))
+        return found
+
+
+def _day_trees(course_catalog, sections):
+    by_day = {day: [] for day in catalog.DAYS}
+    for i in sections:
+        for day, start, end, first_day, last_day in course_catalog.dated_meetings(i):
+            by_day[day].append((start, end, first_day, last_day, i))
+    return {day: DayTree(meetings) for day, meetings in by_day.items()}
+
+
+class IntervalIndex:
+    def __init__(self, course_catalog):
+        self.course_catalog = course_catalog
+        self.trees = _day_trees(course_catalog, range(len(course_catalog)))
+        # Sections changed by catalog updates since the trees were built,
+        # whose meetings in trees are out of date
+        self.changed = frozenset()
+        # (sections, their trees, sections of the newer layers) of every
+        # layer of changed sections, oldest first
+        self.layers = ()
+
+    def updated(self, course_catalog, sections):
+        """
+        Returns the index of course_catalog, an update of this index's
+        catalog that changed the given sections. Only their trees are built,
+        along with the layers they are merged with.
+        """
+        layers = [sections for sections, _, _ in self.layers]
+        merged = frozenset(sections)
+        while layers and len(layers[-1]) <= len(merged):
+            merged |= layers.pop()
+        rebuilt = len(layers)
+        layers.append(merged)
+
+        new = copy.copy(self)
+        new.course_catalog = course_catalog
+        new.changed = self.changed | merged
+        new_layers = []
+        newer = frozenset()
+        for position in range(len(layers) - 1, -1, -1):
+            if position < rebuilt:
+                _, trees, _ = self.layers[position]
+            else:
+                trees = _day_trees(course_catalog, sorted(layers[position]))
+            new_layers.append((layers[position], trees, newer))
+            newer |= layers[position]
+        new.layers = tuple(reversed(new_layers))
+        return new
+
+    def conflicts_with(self, i):
+        """
+        Returns the set of indices of the sections that conflict with
+        section i.
+        """
+        meetings = self.course_catalog.dated_meetings(i)
+        found = set()
+        for day, start, end, first_day, last_day in meetings:
+            found.update(self.trees[day].overlapping(start, end, first_day, last_day))
+        found -= self.changed
+        for _, trees, newer in self.layers:
+            for day, start, end, first_day, last_day in meetings:
+                found.update(
+                    j
+                    for j in trees[day].overlapping(start, end, first_day, last_day)
+                    if j not in newer
+                )
+        found.discard(i)
+        return found
+
+    def conflicting_pairs(self, indices):
+        """
+        Returns the (a, b) pairs, a < b, of the given section indices that
+        conflict with each other.
+        """
+        indices = set(indices)
+        return sorted(
+            (a, b) for a in indices for b in self.conflicts_with(a) & indices if a < b
+        )
+
+    def is_conflict_free(self, indices):
+        indices = set(indices)
+        return not any(self.conflicts_with(i) & indices for i in indices)
@@ -0,0 +1,412 @@
+"""
+Background queue for optimization jobs.
+
+Solving used to happen inside the Dash callback, so a slow solve kept a
+server worker busy (and could run into the HTTP timeout) while everyone
+else waited behind it. Instead, the callback submits a job and gets back
+a job id right away, and the page polls the job's status with a
+dcc.Interval until the schedules are ready.
+
+Jobs run in a pool of worker processes (config.JOB_WORKERS). At most
+config.JOB_MAX_QUEUE jobs may be waiting or running at once, beyond that
+submit() raises QueueFull so the page can ask the user to try again
+instead of piling up requests. Every job is given a solver time limit
+that fits in its timeout, and one that still runs past the timeout is
+reported as timed out and its result thrown away (checked every
+SWEEP_SECONDS, whether or not the page still polls it). Jobs can be
+cancelled while they wait; cancelling a running job also throws its result
+away. A running job that is cancelled or timed out can't be stopped, so its
+worker is retired: it exits once the solver's time limit is up, and a new
+one takes its place for the next job right away.
+
+Every worker is a pool of its own process. The jobs of a browser session
+always go to the same worker, which keeps the session's model around to
+warm start its next solve (see sessions.py), and wait for it when it is
+busy. Jobs without a session go to any free worker. The sessions are
+spread over the workers, so each of them keeps at most its share of
+config.SESSION_MAX_SESSIONS models.
+
+While a job runs, the workers send back every better schedule they find
+(see optimizer.solve_anytime()), so the page can show the best total
+rating found so far. The schedules of every job that is done are saved
+with its input (see schedule_store.py).
+"""
+
+import math
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+import metrics
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMED_OUT = "timed out"
+CANCELLED = "cancelled"
+
+FINISHED = {DONE, FAILED, TIMED_OUT, CANCELLED}
+
+# How often running jobs are checked for their timeout
+SWEEP_SECONDS = 1.0
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _init_worker(max_sessions):
+    # Loads the catalog before the first job instead of during it
+    import catalog
+    import sessions
+
+    catalog.get_catalog()
+    sessions.get_default_store().max_sessions = max_sessions
+
+
+def _run(data, k, time_limit, session_id, job_id, updates):
+    import optimizer
+
+    def on_incumbent(value, bound):
+        updates.put((job_id, value, bound))
+
+    # A worker runs one job at a time, so what is recorded from here on
+    # belongs to this job (see metrics.py)
+    metrics.REGISTRY.reset()
+    schedules = optimizer.top_k_schedules(
+        data,
+        k=k,
+        time_limit=time_limit,
+        session_id=session_id,
+        on_incumbent=on_incumbent,
+    )
+    return schedules, metrics.REGISTRY.export()
+
+
+class Job:
+    def __init__(self, data, k, timeout, session_id):
+        self.id = uuid.uuid4().hex
+        self.data = data
+        self.k = k
+        self.timeout = timeout
+        # Leaves some of the timeout for starting up and sending results
+        self.time_limit = max(min(config.TOP_K_TIME_LIMIT_SECONDS, timeout * 0.8), 0.1)
+        self.session_id = session_id
+        # Index of the worker that runs it and its executor, until the job
+        # gives the worker back
+        self.worker = None
+        self.executor = None
+
+        self.state = QUEUED
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.result = None
+        # Id the schedules were saved under (see schedule_store.py)
+        self.schedule_id = None
+        self.error = None
+        # (value, bound) of the best schedule found so far
+        self.incumbent = None
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers=config.JOB_WORKERS,
+        max_queue=config.JOB_MAX_QUEUE,
+        timeout=config.JOB_TIMEOUT_SECONDS,
+        result_ttl=config.JOB_RESULT_TTL_SECONDS,
+        store=None,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        # Where the schedules of finished jobs are saved, if anywhere
+        self.store = store
+
+        # job id -> Job, oldest first
+        self._jobs = OrderedDict()
+        # Jobs waiting for a worker, in order
+        self._pending = []
+        self._running = 0
+        # Reentrant, as a future that fails right away calls _on_done from
+        # within _dispatch
+        self._lock = threading.RLock()
+        # A single process pool per worker, started on first use
+        self._executors = [None] * workers
+        # Indices of the workers running a job
+        self._busy = set()
+        # Queue the workers send (job id, value, bound) updates through
+        self._manager = None
+        self._updates = None
+        self._sweeper = None
+
+        self.submitted = 0
+        self.rejected = 0
+
+    def _get_executor(self, worker):
+        # Started on first use, with "spawn" so the workers don't inherit
+        # the web server's threads and locks.
+        if self._updates is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+            self._updates = self._manager.Queue()
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(
+                target=self._sweep_forever, name="job-sweeper", daemon=True
+            )
+            self._sweeper.start()
+        if self._executors[worker] is None:
+            self._executors[worker] = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(math.ceil(config.SESSION_MAX_SESSIONS / self.workers),),
+            )
+        return self._executors[worker]
+
+    def _worker_for(self, job):
+        # The worker of the job's session, or any free one for a job
+        # without a session. None when it has to wait.
+        if job.session_id is not None:
+            worker = zlib.crc32(job.session_id.encode("utf-8")) % self.workers
+            return None if worker in self._busy else worker
+        return next(
+            (worker for worker in range(self.workers) if worker not in self._busy),
+            None,
+        )
+
+    def submit(self, data, k=config.TOP_K_SCHEDULES, session_id=None):
+        """
+        Queues a top_k_schedules() call and returns its job id.
+        Raises QueueFull when too many jobs are already waiting or running.
+        """
+        with self._lock:
+            self._forget_old_jobs()
+            if len(self._pending) + self._running >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(
+                    f"{len(self._pending) + self._running} jobs are already queued"
+                )
+            job = Job(data, k, self.timeout, session_id)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self.submitted += 1
+            self._dispatch()
+        return job.id
+
+    def _dispatch(self):
+        # Hands waiting jobs to their workers while some are free, in order
+        # except for the jobs whose worker is busy. Jobs are only given to
+        # an executor once it can start them, so that waiting ones can still
+        # be cancelled and their position is known.
+        for job in list(self._pending):
+            if len(self._busy) == self.workers:
+                break
+            if job.state != QUEUED:
+                # Started by a nested call from _on_done()
+                continue
+            worker = self._worker_for(job)
+            if worker is None:
+                continue
+            self._pending.remove(job)
+            job.state = RUNNING
+            job.started_at = time.monotonic()
+            job.worker = worker
+            job.executor = self._get_executor(worker)
+            self._busy.add(worker)
+            self._running += 1
+            job.future = job.executor.submit(
+                _run,
+                job.data,
+                job.k,
+                job.time_limit,
+                job.session_id,
+                job.id,
+                self._updates,
+            )
+            job.future.add_done_callback(
+                lambda future, job=job: self._on_done(job, future)
+            )
+
+    def _release(self, job, retire=False):
+        # Gives the job's worker back, with a new process when retired
+        if job.worker is None:
+            return
+        if retire:
+            if self._executors[job.worker] is job.executor:
+                self._executors[job.worker] = None
+            job.executor.shutdown(wait=False, cancel_futures=True)
+        self._running -= 1
+        self._busy.discard(job.worker)
+        job.worker = None
+        job.executor = None
+
+    def _on_done(self, job, future):
+        with self._lock:
+            if future.cancelled():
+                # Its worker was retired before starting it
+                return
+            error = future.exception()
+            # The worker died (e.g. killed for using too much memory), its
+            # next job gets a new pool
+            self._release(job, retire=isinstance(error, BrokenProcessPool))
+            if error is None:
+                schedules, recorded = future.result()
+                metrics.REGISTRY.merge(recorded)
+            if job.state == RUNNING:
+                job.finished_at = time.monotonic()
+                if error is not None:
+                    job.state = FAILED
+                    job.error = str(error) or type(error).__name__
+                else:
+                    job.state = DONE
+                    job.result = schedules
+                    if self.store is not None:
+                        job.schedule_id = self._save(job)
+            # The input isn't needed anymore
+            job.data = None
+            self._dispatch()
+
+    def _save(self, job):
+        import batch
+
+        return self.store.save(
+            {
+                "input": batch.from_optimizer_input(job.data),
+                "schedules": [
+                    {"value": value, "courses": [list(course) for course in courses]}
+                    for value, courses in job.result
+                ],
+            }
+        )
+
+    def _check_timeout(self, job, now):
+        if job.state == RUNNING and now - job.started_at > job.timeout:
+            job.state = TIMED_OUT
+            job.finished_at = now
+            job.data = None
+            self._release(job, retire=True)
+            self._dispatch()
+
+    def _sweep(self):
+        with self._lock:
+            self._read_updates()
+            now = time.monotonic()
+            for job in list(self._jobs.values()):
+                self._check_timeout(job, now)
+            self._forget_old_jobs()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(SWEEP_SECONDS)
+            self._sweep()
+
+    def _read_updates(self):
+        if self._updates is None:
+            return
+        while True:
+            try:
+                job_id, value, bound = self._updates.get_nowait()
+            except (queue.Empty, OSError, EOFError):
+                break
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.incumbent = (value, bound)
+
+    def _forget_old_jobs(self):
+        now = time.monotonic()
+        for job_id in [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.state in FINISHED and now - job.finished_at > self.result_ttl
+        ]:
+            del self._jobs[job_id]
+
+    def status(self, job_id):
+        """
+        Returns a dictionary describing the job, or None for an unknown (or
+        forgotten) job id:
+            state: one of queued, running, done, failed, timed out, cancelled
+            position: jobs ahead of it in line (while queued)
+            elapsed: seconds since it started running
+            time_limit: seconds the solver was given
+            incumbent: (value, bound) of the best schedule found so far
+            result: the schedules (once done)
+            schedule_id: id they were saved under (once done)
+            error: what went wrong (once failed)
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._read_updates()
+            now = time.monotonic()
+            self._check_timeout(job, now)
+            return {
+                "state": job.state,
+                "position": self._pending.index(job) if job.state == QUEUED else None,
+                "elapsed": (
+                    (job.finished_at or now) - job.started_at
+                    if job.started_at is not None
+                    else 0.0
+                ),
+                "time_limit": job.time_limit,
+                "incumbent": job.incumbent,
+                "result": job.result,
+                "schedule_id": job.schedule_id,
+                "error": job.error,
+            }
+
+    def cancel(self, job_id):
+        """
+        Cancels a job that hasn't finished yet. Returns whether it was.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return False
+            if job.state == QUEUED:
+                self._pending.remove(job)
+            job.state = CANCELLED
+            job.finished_at = time.monotonic()
+            job.data = None
+            # A running job can't be stopped, its worker finishes it (within
+            # its time limit) without taking new ones and its result is
+            # ignored
+            self._release(job, retire=True)
+            self._dispatch()
+            return True
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "queued": len(self._pending),
+                "running": self._running,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+            }
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_default_queue():
+    global _default_queue
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                import schedule_store
+
+                _default_queue = JobQueue(store=schedule_store.get_default_store())
+    return _default_queue
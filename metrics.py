@@ -0,0 +1,232 @@
+"""
+Timers, gauges and counters exported on the /metrics route of the server
+in the Prometheus text format.
+
+When a student reports that the site is slow, the phase timers tell where
+the time went: parsing the pasted JSON, building the tables, building the
+model, the solver, or turning the result into HyperSchedule JSON. The
+model size gauges and solver status counters tell what kind of problems
+were being solved.
+
+Solves run in the job worker processes (see jobs.py), which record into
+their own registry; what a job recorded is sent back with its result and
+merged into the web server's registry.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (in seconds) of the buckets of every latency histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        # sorted (label, value) pairs -> value
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                yield f"{self.name}{_format_labels(labels)} {value:g}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, key, value):
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+    def merge(self, key, value):
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            if key not in self.values:
+                # [count per bucket (not cumulative), sum, count]
+                self.values[key] = [[0] * len(BUCKETS), 0.0, 0]
+            counts, _, _ = self.values[key]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.values[key][1] += value
+            self.values[key][2] += 1
+
+    def merge(self, key, value):
+        counts, total, count = value
+        with self.lock:
+            if key not in self.values:
+                self.values[key] = [[0] * len(BUCKETS), 0.0, 0]
+            current = self.values[key]
+            current[0] = [a + b for a, b in zip(current[0], counts)]
+            current[1] += total
+            current[2] += count
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, counts):
+                    cumulative += bucket_count
+                    le = _format_labels(labels, [("le", f"{bound:g}")])
+                    yield f"{self.name}_bucket{le} {cumulative}"
+                le = _format_labels(labels, [("le", "+Inf")])
+                yield f"{self.name}_bucket{le} {count}"
+                yield f"{self.name}_sum{_format_labels(labels)} {total:g}"
+                yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, kind, name, documentation):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = kind(name, documentation)
+            return self.metrics[name]
+
+    def counter(self, name, documentation):
+        return self._get(Counter, name, documentation)
+
+    def gauge(self, name, documentation):
+        return self._get(Gauge, name, documentation)
+
+    def histogram(self, name, documentation):
+        return self._get(Histogram, name, documentation)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.lines()) + "\n"
+
+    ########## WORKER PROCESSES ##############
+
+    def reset(self):
+        for metric in list(self.metrics.values()):
+            with metric.lock:
+                metric.values.clear()
+
+    def export(self):
+        """
+        Returns everything recorded as plain data that can be sent to
+        another process and merged into its registry.
+        """
+        exported = {}
+        for name, metric in list(self.metrics.items()):
+            with metric.lock:
+                exported[name] = (
+                    metric.kind,
+                    metric.documentation,
+                    [
+                        (
+                            (key, [list(value[0]), value[1], value[2]])
+                            if metric.kind == "histogram"
+                            else (key, value)
+                        )
+                        for key, value in metric.values.items()
+                    ],
+                )
+        return exported
+
+    def merge(self, exported):
+        kinds = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+        for name, (kind, documentation, values) in exported.items():
+            metric = self._get(kinds[kind], name, documentation)
+            for key, value in values:
+                metric.merge(tuple(tuple(pair) for pair in key), value)
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = REGISTRY.histogram(
+    "course_optimizer_phase_seconds",
+    "Time spent in every phase of the callbacks and of the optimizer.",
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "course_optimizer_http_request_seconds",
+    "Time spent answering HTTP requests, by path.",
+)
+MODEL_VARIABLES = REGISTRY.gauge(
+    "course_optimizer_model_variables",
+    "Number of variables of the last model built, by engine.",
+)
+MODEL_CONSTRAINTS = REGISTRY.gauge(
+    "course_optimizer_model_constraints",
+    "Number of constraints of the last model built, by engine.",
+)
+MODEL_NONZEROS = REGISTRY.gauge(
+    "course_optimizer_model_nonzeros",
+    "Number of non-zero constraint coefficients of the last model built, by engine.",
+)
+SOLVES = REGISTRY.counter(
+    "course_optimizer_solves_total",
+    "Solves by engine and outcome (see anytime.py).",
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "course_optimizer_cache_lookups_total",
+    "Solution cache lookups, by result.",
+)
+JOBS = REGISTRY.gauge(
+    "course_optimizer_jobs",
+    "Optimization jobs waiting or running (see jobs.py).",
+)
+
+
+@contextmanager
+def phase(name, **labels):
+    # Times the with-block as the given phase
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase=name, **labels)
+
+
+def model_size(engine, variables, constraints, nonzeros):
+    MODEL_VARIABLES.set(variables, engine=engine)
+    MODEL_CONSTRAINTS.set(constraints, engine=engine)
+    MODEL_NONZEROS.set(nonzeros, engine=engine)
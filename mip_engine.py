@@ -0,0 +1,190 @@
+"""
+The mixed integer programming engine: the problem is solved with
+or-tools' linear solver wrapper (SCIP by default, see config.py).
+"""
+
+import time
+
+from ortools.linear_solver import pywraplp
+import anytime
+import catalog
+import metrics
+import model_builder
+import solver_pool
+
+
+def solve(data, time_limit=None, gap_limit=0.0):
+    return anytime.as_result(solve_anytime(data, time_limit, gap_limit))
+
+
+def solve_anytime(data, time_limit=None, gap_limit=0.0, on_incumbent=None):
+    """
+    Returns a report of the best schedule found within time_limit seconds
+    (see anytime.py). SCIP can't hand out schedules while it is still
+    searching through pywraplp, so on_incumbent(value, bound) is only
+    called once, with the final schedule.
+    """
+    start = time.monotonic()
+    # Every solve gets its own empty model, borrowed from a bounded pool
+    # of solvers so concurrent callbacks can't touch each other's model.
+    with solver_pool.get_default_pool().solver() as solver:
+        if time_limit is not None:
+            solver.SetTimeLimit(max(1, int(time_limit * 1000)))
+        with metrics.phase("build_model", engine="mip"):
+            courses_bool = build_model(solver, *data)
+        status, result = solve_model(solver, courses_bool, _parameters(gap_limit))
+        elapsed = time.monotonic() - start
+
+        if result is None:
+            return anytime.report(status, elapsed=elapsed)
+
+        value, courses = result
+        bound = solver.Objective().BestBound()
+        if on_incumbent is not None:
+            on_incumbent(value, bound)
+        return anytime.report(status, value, courses, bound, gap_limit, elapsed)
+
+
+def _parameters(gap_limit):
+    parameters = pywraplp.MPSolverParameters()
+    parameters.SetDoubleParam(parameters.RELATIVE_MIP_GAP, gap_limit)
+    return parameters
+
+
+def top_k(data, k, time_limit, on_incumbent=None):
+    """
+    The model is only built once: after every solve, a cut excluding the
+    schedule that was just found is added to the same model and it is
+    solved again. Returns (schedules, whether the search finished within
+    time_limit seconds).
+    """
+    with solver_pool.get_default_pool().solver() as solver:
+        with metrics.phase("build_model", engine="mip"):
+            courses_bool = build_model(solver, *data)
+        schedules, _, complete = find_schedules(
+            solver, courses_bool, k, time_limit, on_incumbent
+        )
+    return schedules, complete
+
+
+def find_schedules(solver, courses_bool, k, time_limit, on_incumbent=None):
+    """
+    Solves the model in the solver up to k times, excluding every
+    schedule found from the following solves. on_incumbent(value, bound)
+    is called as soon as the best schedule is found.
+
+    Returns (schedules, the exclusion cuts that were added, whether the
+    search finished). Every schedule but the last one is proven to be the
+    next best. The search stops at the first solve that isn't proven,
+    keeping the schedule it found (if any) as the last one, and then it
+    hasn't finished.
+    """
+    deadline = time.monotonic() + time_limit
+    schedules = []
+    cuts = []
+    while len(schedules) < k:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return schedules, cuts, False
+        solver.SetTimeLimit(max(1, int(remaining * 1000)))
+
+        status, result = solve_model(solver, courses_bool)
+        if result is not None:
+            schedules.append(result)
+            if on_incumbent is not None and len(schedules) == 1:
+                on_incumbent(result[0], solver.Objective().BestBound())
+        if status != anytime.OPTIMAL:
+            # INFEASIBLE once every schedule has been found, otherwise the
+            # time ran out
+            return schedules, cuts, status == anytime.INFEASIBLE
+
+        selected = [course for course, _ in result[1]]
+        cuts.append(_exclude_schedule(solver, courses_bool, selected))
+
+    return schedules, cuts, True
+
+
+def _exclude_schedule(solver, courses_bool, selected):
+    """
+    Adds a "no-good" cut that only the given selection violates:
+        sum(selected courses) - sum(other courses) <= len(selected) - 1
+    """
+    selected = set(selected)
+    cut = solver.RowConstraint(-solver.infinity(), len(selected) - 1, "")
+    for course, variable in courses_bool.items():
+        cut.SetCoefficient(variable, 1 if course in selected else -1)
+    return cut
+
+
+def build_model(
+    solver,
+    set_courses,
+    courses_cost,
+    set_alternates,
+    alternates_dict,
+    lower_bounds,
+    upper_bounds,
+):
+    """
+    course_bool is a dictionary where the key is the
+    course name and the value is an integer variable that the
+    solver sets in order to optimize the cost.
+    0 stands for not taking the course and
+    1 stands for taking it.
+    """
+    courses_bool = {}
+    for course in set_courses:
+        courses_bool[course] = solver.IntVar(0, 1, "")
+
+    # CONSTRAINTS:
+    model = model_builder.build_constraints(
+        set_courses, set_alternates, alternates_dict, lower_bounds, upper_bounds
+    )
+    model.emit(solver, courses_bool)
+
+    # Objective (courses rated 0 don't need a term)
+    objective = solver.Objective()
+    for course in set_courses:
+        if courses_cost[course]:
+            objective.SetCoefficient(courses_bool[course], courses_cost[course])
+    objective.SetMaximization()
+
+    metrics.model_size(
+        "mip", solver.NumVariables(), solver.NumConstraints(), model.num_nonzeros()
+    )
+    return courses_bool
+
+
+# pywraplp statuses -> statuses of anytime.py, anything else is UNKNOWN
+STATUSES = {
+    pywraplp.Solver.OPTIMAL: anytime.OPTIMAL,
+    pywraplp.Solver.FEASIBLE: anytime.FEASIBLE,
+    pywraplp.Solver.INFEASIBLE: anytime.INFEASIBLE,
+}
+
+
+def solve_model(solver, courses_bool, parameters=None):
+    """
+    Returns (status, (total value, courses) or None when no schedule was
+    found), with one of the statuses of anytime.py: only an OPTIMAL
+    schedule is proven to be the best one.
+    """
+    with metrics.phase("solver", engine="mip"):
+        if parameters is None:
+            status = solver.Solve()
+        else:
+            status = solver.Solve(parameters)
+    status = STATUSES.get(status, anytime.UNKNOWN)
+
+    res = []  # list of courses that the user should take
+    course_catalog = catalog.get_catalog()
+    if status == anytime.OPTIMAL or status == anytime.FEASIBLE:
+        with metrics.phase("extraction", engine="mip"):
+            for course in courses_bool:
+                if courses_bool[course].solution_value() > 0.5:
+                    courseName = course_catalog.name(course_catalog.index(course))
+                    res.append((course, courseName))
+    else:
+        return status, None
+
+    return status, (solver.Objective().Value(), res)
@@ -0,0 +1,189 @@
+"""
+Sparse storage for the linear constraints of the optimization model.
+
+All of the constraints in optimizer() have the form
+
+    lower <= (number of selected courses out of some group) <= upper
+
+so instead of building a coefficient for every (constraint, course) pair,
+most of which are 0, we only keep the list of courses that are part of
+every constraint and hand exactly those variables to the solver.
+Building the model is then proportional to the number of non-zeros.
+"""
+
+import catalog
+import conflicts
+import course_codes
+
+
+class SparseModel:
+    def __init__(self):
+        # row name -> list of courses with a coefficient of 1 in that row
+        self.rows = {}
+        # row name -> (lower bound, upper bound), None meaning unbounded
+        self.bounds = {}
+
+    def add_row(self, name, courses, lower=None, upper=None):
+        if name in self.rows:
+            raise ValueError(f"Duplicate constraint {name!r}")
+        self.rows[name] = list(courses)
+        self.bounds[name] = (lower, upper)
+
+    def num_rows(self):
+        return len(self.rows)
+
+    def num_nonzeros(self):
+        return sum(len(courses) for courses in self.rows.values())
+
+    def canonical_rows(self):
+        """
+        Returns a dictionary from the frozenset of courses in a row to its
+        (lower, upper) bounds, merging rows over the same courses and
+        leaving out rows that can never be violated.
+        """
+        rows = {}
+        for name, courses in self.rows.items():
+            lower, upper = self.bounds[name]
+            lower = 0 if lower is None else max(lower, 0)
+            upper = len(courses) if upper is None else min(upper, len(courses))
+            key = frozenset(courses)
+            if key in rows:
+                lower = max(lower, rows[key][0])
+                upper = min(upper, rows[key][1])
+            rows[key] = (lower, upper)
+        return {
+            key: (lower, upper)
+            for key, (lower, upper) in rows.items()
+            if lower > 0 or upper < len(key)
+        }
+
+    def emit(self, solver, variables):
+        """
+        Adds every row to the solver as a constraint over the given
+        dictionary of course -> solver variable.
+        """
+        for name, courses in self.rows.items():
+            lower, upper = self.bounds[name]
+            # Skipping rows that can never be violated
+            if (lower is None or lower <= 0) and (
+                upper is None or upper >= len(courses)
+            ):
+                continue
+            add_constraint(solver, variables, courses, lower, upper, name)
+
+
+def add_constraint(solver, variables, courses, lower=None, upper=None, name=""):
+    # lower <= sum of the courses' variables <= upper
+    infinity = solver.infinity()
+    lower = -infinity if lower is None else lower
+    upper = infinity if upper is None else upper
+    constraint = solver.RowConstraint(lower, upper, name)
+    for course in courses:
+        constraint.SetCoefficient(variables[course], 1)
+    return constraint
+
+
+def build_constraints(
+    set_courses,
+    set_alternates,
+    alternates_dict,
+    lower_bounds,
+    upper_bounds,
+    time_conflicts=True,
+):
+    """
+    Returns a SparseModel holding, for every constraint, only the courses
+    that take part in it.
+
+    Engines that have their own way of keeping courses from overlapping
+    (see cpsat_engine.py) leave the time conflict rows out.
+    """
+    model = SparseModel()
+    course_catalog = catalog.get_catalog()
+
+    #######################
+    # Time constraint:
+    """
+    To encode the constraint that the program should not select two
+    courses that are taking place at the same time/overlap, we look up
+    which of the courses conflict in the catalog's precomputed conflict
+    matrix, group them into sets of courses that all overlap with each
+    other, and then ensure that at most one course of every set is
+    selected. The sets of the sections that aren't on the regular slots
+    are found by a sweep line over their meetings and the courses they
+    conflict with instead. (See conflict_matrix.py and conflicts.py)
+    """
+    if time_conflicts:
+        courses = sorted(set_courses)
+        indices = [course_catalog.index(course) for course in courses]
+        matrix = course_catalog.conflict_matrix()
+        conflict_edges = [(courses[a], courses[b]) for a, b in matrix.edges(indices)]
+        index = dict(zip(courses, indices))
+        irregular = {course for course in courses if index[course] in matrix.exact}
+        conflicting_courses = []
+        covered = set()
+        if irregular:
+            swept = set(irregular)
+            for a, b in conflict_edges:
+                if a in irregular or b in irregular:
+                    swept.update((a, b))
+            for clique in conflicts.conflict_cliques(
+                {
+                    course: course_catalog.dated_meetings(index[course])
+                    for course in swept
+                }
+            ):
+                if irregular.isdisjoint(clique):
+                    continue
+                conflicting_courses.append(clique)
+                for j, first in enumerate(clique):
+                    for second in clique[j + 1 :]:
+                        covered.add((first, second))
+        conflicting_courses += conflicts.clique_cover(
+            [edge for edge in conflict_edges if edge not in covered]
+        )
+        for i, clique in enumerate(conflicting_courses):
+            model.add_row(f"time{i}", clique, upper=1)
+
+    ################################
+    # No Two Same Courses Constraint:
+    """
+    This constraint prevents the program from selecting
+    two sections of the same course. Sections of the same course share
+    a courseMutualExclusionKey, and the catalog keeps the sections of
+    every key, so each row takes one lookup per candidate.
+    Example:
+    CSCI 140 HM-01 and CSCI 140 HM-02 share the key "CSCI140  HM",
+    while MATH 015 CM-01 and MATH 156 CM-01 (or ASTR 001 PO-01 and its
+    lab ASTR 001 L PO-01) have different keys.
+    """
+    candidates = {course_catalog.index(course): course for course in set_courses}
+    same_courses = {}
+    for i in sorted(candidates):
+        for key in course_catalog.exclusion_keys(i):
+            if key not in same_courses:
+                same_courses[key] = [
+                    candidates[j]
+                    for j in course_catalog.exclusion_group(key)
+                    if j in candidates
+                ]
+    for key, courses in same_courses.items():
+        model.add_row(f"same:{key}", courses, upper=1)
+
+    ########################################
+    ###### ALTERNATES ######################
+    """
+    Every course that matches one of the patterns of an alternate_id
+    (see course_codes.py) is part of that alternate_id's row.
+    """
+    code_trie = course_codes.CodeTrie(set_courses)
+    for alternate_id in set_alternates:
+        alt_courses = sorted(code_trie.match_any(alternates_dict[alternate_id]))
+        model.add_row(
+            alternate_id,
+            alt_courses,
+            lower=lower_bounds[alternate_id],
+            upper=upper_bounds[alternate_id],
+        )
+
+    return model
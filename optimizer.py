@@ -1,24 +1,45 @@
-import json
-from ortools.linear_solver import pywraplp
-from collections import defaultdict
+import importlib
+
+import anytime
+import catalog
+import config
 import excel_parser
+import metrics
+import sessions
+import solution_cache
+
+# Engines optimizer() can solve problems with. Every engine is a module
+# with solve(data, time_limit, gap_limit), solve_anytime(data, time_limit,
+# gap_limit, on_incumbent) and top_k(data, k, time_limit, on_incumbent)
+# functions, and is only imported once it is used.
+ENGINES = {
+    "mip": "mip_engine",
+    "cpsat": "cpsat_engine",
+    "bitset": "bitset_engine",
+}
 
-solver = pywraplp.Solver.CreateSolver("SCIP")
+########## FUNCTIONS ##############
 
-############### DATA #############
-processed_data = {}
 
-with open(r"rawData/course_data3.json", encoding="utf-8") as f:
-    raw_data = json.load(f)
+def resolve_engine(name, set_courses):
+    """
+    "auto" picks the bitset engine for problems with at most
+    BITSET_MAX_SECTIONS courses and the MIP engine for larger ones.
+    """
+    name = name or config.OPTIMIZER_ENGINE
+    if name == "auto":
+        return "bitset" if len(set_courses) <= config.BITSET_MAX_SECTIONS else "mip"
+    return name
 
-for item in raw_data["data"]["courses"].keys():
-    newKey = raw_data["data"]["courses"][item]["courseCode"]
-    processed_data[newKey] = raw_data["data"]["courses"][item]
 
-########## FUNCTIONS ##############
+def get_engine(name=None):
+    name = name or config.OPTIMIZER_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name!r}, expected one of {list(ENGINES)}")
+    return importlib.import_module(ENGINES[name])
 
 
-def optimizer(data, useCsv=False, currTerm=True):
+def optimizer(data, useCsv=False, currTerm=True, engine=None):
 
     ########## Input Format ###############
     if useCsv:
@@ -29,7 +50,7 @@ def optimizer(data, useCsv=False, currTerm=True):
             alternates_dict,
             lower_bounds,
             upper_bounds,
-        ) = excel_parser.parse_csv(df)
+        ) = excel_parser.parse_csv()
     else:
         (
             set_courses,
@@ -40,198 +61,130 @@ def optimizer(data, useCsv=False, currTerm=True):
             upper_bounds,
         ) = data
 
-    ###############################
-    """
-    course_bool is a dictionary where the key is the 
-    course name and the value is an integer variable that the
-    solver sets in order to optimize the cost.
-    0 stands for not taking the course and
-    1 stands for taking it.
-    """
-    courses_bool = {}
-    for course in set_courses:
-        courses_bool[course] = solver.IntVar(0, 1, "")
-
-    #######################
-    # Time constraint:
-    """ 
-    To encode the constraint that the program should not select two
-    courses that are taking place at the same time/overlap, we break time
-    into discrete intervals of ten minutes, and then ensure that for each 
-    discrete timestep, at most only one course is selected.
-
-    time_course_bool[(course, time)] = 1 if course taking place at that time,
-    otherwise 0
-    """
-    course_time_bool = {}
-    set_current_time_ids = set()
-    discrete_times = []
-    for k in range(7, 24):
-        for j in range(0, 6):
-            curr_time = "0" + str(k) + str(j) + "0"
-            curr_time = int(curr_time)
-            discrete_times.append(curr_time)
-
-    days = "MTWRF"
-    for curr_time in discrete_times:
-        for day in days:
-            curr_time_id = day + str(curr_time)
-            set_current_time_ids.add(curr_time_id)
-            for course in set_courses:
-                for item in processed_data[course]["courseSchedule"]:
-                    if day in item["scheduleDays"]:
-                        start_time = item["scheduleStartTime"]
-                        end_time = item["scheduleEndTime"]
-                        # Removing the colon from "hh:mm" and then converting it to an int
-                        start_time = int(start_time[0:2] + start_time[3:])
-                        end_time = int(end_time[0:2] + end_time[3:])
-                        # Not strictly greater than or less than because
-                        # courses can take place back to back.
-                        after_start_time = curr_time > start_time
-                        before_end_time = curr_time < end_time
-
-                        if after_start_time and before_end_time:
-                            course_time_bool[(course, curr_time_id)] = 1
-
-    # (Because defaultdict isn't playing well with or-tools)
-    for time_id in set_current_time_ids:
-        for course in set_courses:
-            if (course, time_id) not in course_time_bool:
-                course_time_bool[(course, time_id)] = 0
-
-    ################################
-    # No Two Same Courses Constraint:
-    """
-    This constraint prevents the program from selecting
-    two courses that are the same (but are different sections
-    or on different campuses)
-    """
-    course_same_bool = {}
-    underlying_courses = {}
-    # Grouping courses that are the same together:
-    for course in set_courses:
-        course_components = course.split(" ")
-        # Example: ENGR 190AV HM-01 -> ENGR 190AV
-        main_components = course_components[0] + " " + course_components[1]
-        if main_components in underlying_courses:
-            underlying_courses[main_components].append(course)
-        else:
-            underlying_courses[main_components] = [course]
+    return anytime.as_result(
+        solve_anytime(
+            (
+                set_courses,
+                courses_cost,
+                set_alternates,
+                alternates_dict,
+                lower_bounds,
+                upper_bounds,
+            ),
+            engine=engine,
+        )
+    )
 
+
+def solve_anytime(
+    data,
+    time_limit=config.SOLVE_TIME_LIMIT_SECONDS,
+    gap_limit=config.SOLVE_GAP_LIMIT,
+    on_incumbent=None,
+    engine=None,
+):
     """
-    Creating a dictionary where the key is
-    (course, underlying_course) and its value is
-    1 if course is essentially the underlying course and
-    0 otherwise.
-    Example:
-    course_same_bool[(ENGR 190AV HM-01, ENGR 190AV)] = 1
-    but
-    course_same_bool[(ENGR 190AV HM-01, CSCI 140)] = 0
-    """
-    for underlying_course in underlying_courses.keys():
-        for course in set_courses:
-            if underlying_course in course:
-                course_same_bool[(course, underlying_course)] = 1
-            else:
-                course_same_bool[(course, underlying_course)] = 0
-
-    ########################################
-    ###### ALTERNATES ######################
+    Returns a report of the best schedule found (see anytime.py): once
+    time_limit seconds have passed, the best schedule found so far is
+    returned along with how far from the best possible one it may be.
+    on_incumbent(value, bound) is called with every better schedule found
+    along the way (only with the final one for the MIP engine).
     """
-    For every course that falls under an alternate_id filter
-    set by the user, the value of 
-    course_alt_bool[(course, alternate_id)] will be 1. (Otherwise 0.)
+    # Identical problems are answered from the cache (see solution_cache.py)
+    cache, key = _cache_key(data, kind="optimizer", gap_limit=gap_limit)
+    with metrics.phase("cache_lookup"):
+        cached = cache.get(key)
+    metrics.CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+    if cached is not None:
+        value, courses = _as_result(cached)
+        return anytime.report(anytime.OPTIMAL, value, courses, bound=value)
+
+    engine = resolve_engine(engine, data[0])
+    report = get_engine(engine).solve_anytime(data, time_limit, gap_limit, on_incumbent)
+    metrics.SOLVES.inc(engine=engine, status=report["status"])
+
+    # Schedules cut short by the time limit are not cached, a later request
+    # might have the time to prove they are the best.
+    if report["status"] == anytime.OPTIMAL:
+        cache.put(key, (report["value"], report["courses"]), data[0])
+    return report
+
+
+def _cache_key(data, **params):
+    course_catalog = catalog.get_catalog()
+    cache = solution_cache.get_default_cache()
+    cache.check_catalog(course_catalog)
+    return cache, solution_cache.fingerprint(
+        course_catalog.cache_version(data[0]), data, **params
+    )
+
+
+def _as_result(value):
+    # Cached results may have been through JSON, which turns tuples into lists
+    total_value, courses = value
+    return (total_value, [tuple(course) for course in courses])
+
+
+def top_k_schedules(
+    data,
+    k=config.TOP_K_SCHEDULES,
+    time_limit=config.TOP_K_TIME_LIMIT_SECONDS,
+    session_id=None,
+    engine=None,
+    on_incumbent=None,
+):
     """
-    course_alt_bool = defaultdict()
-    for alternate_id in set_alternates:
-        for course in set_courses:
-            for alt in alternates_dict[alternate_id]:
-                if alt in course:
-                    course_alt_bool[(course, alternate_id)] = 1
-
-    # (Because defaultdict isn't playing well with or-tools, this is
-    # manually coding in the "otherwise 0" part.
-    for alternate_id in set_alternates:
-        for course in set_courses:
-            if (course, alternate_id) not in course_alt_bool:
-                course_alt_bool[(course, alternate_id)] = 0
-
-    # CONSTRAINTS:
-
-    # UNIQUENESS CONSTRAINT
-    for underlying_course in underlying_courses.keys():
-        solver.Add(
-            solver.Sum(
-                [
-                    course_same_bool[(course, underlying_course)] * courses_bool[course]
-                    for course in set_courses
-                ]
-            )
-            <= 1
-        )
+    Returns up to k distinct schedules as a list of (total value, courses)
+    tuples, best first, in the same format as optimizer().
 
-    # TIME CONFLICT CONSTRAINT
-    for time_id in set_current_time_ids:
-        solver.Add(
-            solver.Sum(
-                [
-                    course_time_bool[(course, time_id)] * courses_bool[course]
-                    for course in set_courses
-                ]
-            )
-            <= 1
-        )
+    Every schedule found is excluded from the following solves. Stops
+    early once time_limit seconds have passed, so fewer than k schedules
+    may be returned (none if there is no feasible schedule).
 
-    # ALTERNATES CONSTRAINT
-    for alternate_id in set_alternates:
-        solver.Add(
-            solver.Sum(
-                [
-                    course_alt_bool[(course, alternate_id)] * courses_bool[course]
-                    for course in set_courses
-                ]
-            )
-            <= upper_bounds[alternate_id]
-        )
+    With a session_id (and the MIP engine), the session's model from its
+    previous request is updated and warm started instead of building a
+    new one. (See sessions.py)
 
-        solver.Add(
-            solver.Sum(
-                [
-                    course_alt_bool[(course, alternate_id)] * courses_bool[course]
-                    for course in set_courses
-                ]
-            )
-            >= lower_bounds[alternate_id]
+    on_incumbent(value, bound) is called as better candidates for the best
+    schedule are found, see solve_anytime().
+    """
+    cache, key = _cache_key(data, kind="top_k", k=k)
+    with metrics.phase("cache_lookup"):
+        cached = cache.get(key)
+    metrics.CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+    if cached is not None:
+        return [_as_result(schedule) for schedule in cached]
+
+    engine = resolve_engine(engine, data[0])
+    if session_id is not None and engine == "mip":
+        session = sessions.get_default_store().get(session_id)
+        schedules, complete = session.top_k(data, k, time_limit, on_incumbent)
+    else:
+        schedules, complete = get_engine(engine).top_k(
+            data, k, time_limit, on_incumbent
         )
+    metrics.SOLVES.inc(engine=engine, status=_top_k_status(schedules, complete))
 
-    # Objective
-    objective_terms = []
-    for course in set_courses:
-        objective_terms.append(courses_bool[course] * courses_cost[course])
-
-    solver.Maximize(solver.Sum(objective_terms))
+    # Results cut short by the time limit are not cached, a later request
+    # might have the time to find all of them.
+    if complete:
+        cache.put(key, schedules, data[0])
+    return schedules
 
-    # Solve
-    status = solver.Solve()
-
-    res = []  # list of courses that the user should take
-    if status == pywraplp.Solver.OPTIMAL or status == pywraplp.Solver.FEASIBLE:
-        # print('Total cost = ', solver.Objective().Value(), '\n')
-        for course in set_courses:
-            if courses_bool[course].solution_value() > 0.5:
-                courseName = processed_data[course]["courseName"]
-                # print(course)
-                res.append((course, courseName))
-    else:
-        return [("Status: ", status)]
 
-    return (solver.Objective().Value(), res)
+def _top_k_status(schedules, complete):
+    # The status of the search for the best schedule, see anytime.py
+    if schedules:
+        return anytime.OPTIMAL if complete else anytime.FEASIBLE
+    return anytime.INFEASIBLE if complete else anytime.UNKNOWN
 
 
 def courseToHyperScheduleFormat(listOfCourses):
     res = []
+    course_catalog = catalog.get_catalog()
     for course, _ in listOfCourses:
-        currCourseInfo = processed_data[course]
+        # Only the returned sections are decoded from the catalog
+        currCourseInfo = course_catalog.course(course)
         currCourseInfo["selected"] = True
         res.append(currCourseInfo)
 
@@ -0,0 +1,231 @@
+"""
+Saved schedules, each under a short id that can be shared.
+
+Every finished optimization job is saved with its input, so that a
+schedule can be fetched again (GET /schedules/<id>) without solving it
+again. Saving never touches the disk on the request path: schedules wait
+in memory (where they can already be fetched) and a background thread
+writes them to SQLite in one transaction every
+config.SCHEDULE_STORE_FLUSH_SECONDS. The database is in WAL mode, so the
+server workers read it while another one writes.
+
+Schedules that weren't looked at for config.SCHEDULE_RETENTION_DAYS are
+deleted, as are the least recently looked at beyond
+config.SCHEDULE_STORE_MAX_ROWS.
+"""
+
+import atexit
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+import config
+
+# Random bytes of an id, 12 url-safe characters
+ID_BYTES = 9
+# Seconds a connection waits for another process's write to finish
+BUSY_TIMEOUT_SECONDS = 5
+# Seconds between two deletions of old schedules
+PRUNE_INTERVAL_SECONDS = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    record TEXT NOT NULL
+)
+"""
+
+
+class ScheduleStore:
+    def __init__(
+        self,
+        path=config.SCHEDULE_STORE_PATH,
+        flush_interval=config.SCHEDULE_STORE_FLUSH_SECONDS,
+        retention=config.SCHEDULE_RETENTION_DAYS * 24 * 3600,
+        max_rows=config.SCHEDULE_STORE_MAX_ROWS,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.max_rows = max_rows
+
+        # id -> (time saved, record), waiting to be written
+        self._pending = {}
+        # id -> time it was last fetched, waiting to be written
+        self._accessed = {}
+        self._lock = threading.Lock()
+        # Held while writing, by the writer thread or flush()
+        self._write_lock = threading.Lock()
+        self._connection = None
+        self._last_pruned = 0.0
+        # Read connections, one per thread
+        self._local = threading.local()
+        self._writer = None
+        self._stopped = threading.Event()
+
+        self.saved = 0
+        self.written = 0
+        self.pruned = 0
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(SCHEMA)
+        return connection
+
+    def _reader(self):
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = self._connect()
+        return self._local.connection
+
+    def _start_writer(self):
+        # Started on first use, so that importing the module (or forking a
+        # server worker) doesn't start a thread
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._run, name="schedule-store", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.close)
+
+    ########## SAVING AND FETCHING ##############
+
+    def save(self, record):
+        """
+        Saves a JSON serializable dictionary. Returns its id right away, the
+        record is written to the database with the next batch.
+        """
+        schedule_id = secrets.token_urlsafe(ID_BYTES)
+        with self._lock:
+            self._pending[schedule_id] = (time.time(), record)
+            self.saved += 1
+            self._start_writer()
+        return schedule_id
+
+    def get(self, schedule_id):
+        """
+        Returns the record saved under the id, with its id and the time it
+        was saved added, or None if there is none.
+        """
+        with self._lock:
+            if schedule_id in self._pending:
+                created, record = self._pending[schedule_id]
+                return {**record, "id": schedule_id, "created": created}
+
+        row = (
+            self._reader()
+            .execute(
+                "SELECT created, record FROM schedules WHERE id = ?", (schedule_id,)
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        with self._lock:
+            self._accessed[schedule_id] = time.time()
+            self._start_writer()
+        created, record = row
+        return {**json.loads(record), "id": schedule_id, "created": created}
+
+    ########## WRITING ##############
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Tried again with the next batch, nothing is dropped
+                pass
+
+    def flush(self):
+        """
+        Writes every pending schedule and access time in one transaction,
+        and deletes the old schedules now and then.
+        """
+        with self._write_lock:
+            with self._lock:
+                pending = list(self._pending.items())
+                accessed = list(self._accessed.items())
+                self._accessed = {}
+            if not pending and not accessed and not self._prune_due():
+                return
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                with self._connection:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?)",
+                        [
+                            (schedule_id, created, created, json.dumps(record))
+                            for schedule_id, (created, record) in pending
+                        ],
+                    )
+                    self._connection.executemany(
+                        "UPDATE schedules SET accessed = max(accessed, ?) WHERE id = ?",
+                        [(when, schedule_id) for schedule_id, when in accessed],
+                    )
+                    if self._prune_due():
+                        self._prune()
+            except sqlite3.Error:
+                with self._lock:
+                    for schedule_id, when in accessed:
+                        self._accessed.setdefault(schedule_id, when)
+                raise
+            with self._lock:
+                # Only once written, so they can be fetched all along
+                for schedule_id, _ in pending:
+                    del self._pending[schedule_id]
+                self.written += len(pending)
+
+    def _prune_due(self):
+        return time.monotonic() - self._last_pruned > PRUNE_INTERVAL_SECONDS
+
+    def _prune(self):
+        deleted = self._connection.execute(
+            "DELETE FROM schedules WHERE accessed < ?",
+            (time.time() - self.retention,),
+        ).rowcount
+        deleted += self._connection.execute(
+            "DELETE FROM schedules WHERE id IN ("
+            "SELECT id FROM schedules ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        ).rowcount
+        self.pruned += deleted
+        self._last_pruned = time.monotonic()
+
+    def close(self):
+        self._stopped.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "saved": self.saved,
+                "written": self.written,
+                "pruned": self.pruned,
+            }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store():
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ScheduleStore()
+    return _default_store
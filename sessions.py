@@ -0,0 +1,213 @@
+"""
+Incremental re-solving for users who tweak their inputs.
+
+After the first solve, a user typically changes one rating or one
+requirement and solves again. Instead of rebuilding the model, every
+browser session keeps its own live model and only applies the difference:
+
+    - objective coefficients of courses whose rating changed,
+    - constraints that were added, removed (relaxed) or re-bounded,
+    - courses that were selected or unselected (their variable is fixed
+      to 0 rather than deleted),
+
+and the previous solution is given to the solver as a hint.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+import mip_engine
+import model_builder
+import solver_pool
+
+# SCIP keeps every hint it is given as a partial solution until the model is
+# freed, and refuses more than its limits/maxorigsol (10 by default), so the
+# model is rebuilt before reaching that.
+MAX_HINTED_SOLVES = 9
+
+
+class IncrementalModel:
+    def __init__(self):
+        self.solver = solver_pool.get_default_pool().new_solver()
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+        # course -> solver variable, for every course seen in the session
+        self.courses_bool = {}
+        self.active_courses = set()
+        self.costs = {}
+        # frozenset of courses -> (constraint, (lower, upper))
+        self.rows = {}
+        # Constraints that were relaxed instead of deleted (or-tools can't
+        # delete them), the model is rebuilt once there are too many.
+        self.dead_rows = 0
+        self.hint = {}
+        self.hinted_solves = 0
+
+    def _reset(self):
+        self.solver.Clear()
+        self.courses_bool = {}
+        self.active_courses = set()
+        self.costs = {}
+        self.rows = {}
+        self.dead_rows = 0
+        self.hinted_solves = 0
+
+    def _relax(self, constraint):
+        infinity = self.solver.infinity()
+        constraint.SetBounds(-infinity, infinity)
+        self.dead_rows += 1
+
+    def apply(self, data):
+        """
+        Brings the live model in line with the given optimizer input.
+        """
+        (
+            set_courses,
+            courses_cost,
+            set_alternates,
+            alternates_dict,
+            lower_bounds,
+            upper_bounds,
+        ) = data
+        target_rows = model_builder.build_constraints(
+            set_courses, set_alternates, alternates_dict, lower_bounds, upper_bounds
+        ).canonical_rows()
+
+        if (
+            self.dead_rows > max(config.SESSION_MAX_DEAD_ROWS, len(target_rows))
+            or self.hinted_solves >= MAX_HINTED_SOLVES
+        ):
+            self._reset()
+
+        # Courses
+        for course in set_courses:
+            if course not in self.courses_bool:
+                self.courses_bool[course] = self.solver.IntVar(0, 1, "")
+            elif course not in self.active_courses:
+                self.courses_bool[course].SetUb(1)
+        for course in self.active_courses - set(set_courses):
+            self.courses_bool[course].SetUb(0)
+        self.active_courses = set(set_courses)
+
+        # Objective
+        objective = self.solver.Objective()
+        for course in set_courses:
+            if self.costs.get(course) != courses_cost[course]:
+                objective.SetCoefficient(
+                    self.courses_bool[course], courses_cost[course]
+                )
+                self.costs[course] = courses_cost[course]
+        objective.SetMaximization()
+
+        # Constraints
+        for key in list(self.rows):
+            if key not in target_rows:
+                constraint, _ = self.rows.pop(key)
+                self._relax(constraint)
+        for key, bounds in target_rows.items():
+            if key not in self.rows:
+                constraint = model_builder.add_constraint(
+                    self.solver, self.courses_bool, key, *bounds
+                )
+                self.rows[key] = (constraint, bounds)
+            elif self.rows[key][1] != bounds:
+                constraint = self.rows[key][0]
+                constraint.SetBounds(*bounds)
+                self.rows[key] = (constraint, bounds)
+
+        # Warm start from the previous solution. Every variable gets a value
+        # (0 for unselected courses) so that SCIP can use the hint as a
+        # complete solution instead of trying to complete a partial one.
+        if self.hint:
+            variables = list(self.courses_bool)
+            self.solver.SetHint(
+                [self.courses_bool[course] for course in variables],
+                [
+                    self.hint.get(course, 0.0) if course in self.active_courses else 0.0
+                    for course in variables
+                ],
+            )
+            self.hinted_solves += 1
+
+    def top_k(self, data, k, time_limit, on_incumbent=None):
+        """
+        Same as mip_engine.top_k, on the session's live model.
+        Returns (schedules, whether the search finished within the limit).
+        """
+        self.last_used = time.monotonic()
+        with self.lock, solver_pool.get_default_pool().slot():
+            deadline = time.monotonic() + time_limit
+            with metrics.phase("session_update", engine="mip"):
+                self.apply(data)
+            # Only the first solve is warm started, the following ones
+            # exclude its solution anyway.
+            schedules, cuts, complete = mip_engine.find_schedules(
+                self.solver, self.courses_bool, min(k, 1), time_limit, on_incumbent
+            )
+            self.solver.SetHint([], [])
+            if schedules and complete and k > 1:
+                more_schedules, more_cuts, complete = mip_engine.find_schedules(
+                    self.solver,
+                    self.courses_bool,
+                    k - 1,
+                    deadline - time.monotonic(),
+                )
+                schedules += more_schedules
+                cuts += more_cuts
+            # The exclusion cuts only make sense for this request
+            for cut in cuts:
+                self._relax(cut)
+
+            if schedules:
+                selected = {course for course, _ in schedules[0][1]}
+                self.hint = {
+                    course: 1.0 if course in selected else 0.0
+                    for course in self.courses_bool
+                }
+        return schedules, complete
+
+
+class SessionStore:
+    def __init__(
+        self,
+        max_sessions=config.SESSION_MAX_SESSIONS,
+        ttl=config.SESSION_TTL_SECONDS,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            now = time.monotonic()
+            for expired in [
+                key
+                for key, session in self._sessions.items()
+                if now - session.last_used > self.ttl
+            ]:
+                del self._sessions[expired]
+
+            if session_id not in self._sessions:
+                self._sessions[session_id] = IncrementalModel()
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return self._sessions[session_id]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store():
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = SessionStore()
+    return _default_store
@@ -0,0 +1,260 @@
+"""
+Cache of optimizer results, keyed by a canonical fingerprint of the
+problem.
+
+Students often press "Calculate the Optimal Course Schedule!" several
+times with the same inputs, so solved problems are kept in an in-process
+LRU (bounded in size and age) and, optionally, in a directory shared by
+all workers. The directory is pruned every PRUNE_INTERVAL_SECONDS by the
+process writing to it: expired entries are deleted, then the oldest
+ones beyond config.SOLUTION_CACHE_DIR_MAX_FILES. The version of the
+catalog data of the problem's courses is part of every key, so results
+computed against older data are never returned, while an update of
+other sections leaves them usable.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# How often a process writing to the cache directory prunes it
+PRUNE_INTERVAL_SECONDS = 60
+
+
+def fingerprint(catalog_version, data, **params):
+    """
+    Hash of everything the result depends on. Courses and the patterns of
+    every alternates row are sorted and the alternates ids dropped, so the
+    same problem always gets the same key no matter how it was entered.
+    """
+    (
+        set_courses,
+        courses_cost,
+        set_alternates,
+        alternates_dict,
+        lower_bounds,
+        upper_bounds,
+    ) = data
+
+    courses = sorted(set_courses)
+    canonical = {
+        "catalog": catalog_version,
+        "courses": courses,
+        "ratings": [float(courses_cost[course]) for course in courses],
+        "alternates": sorted(
+            [
+                sorted(str(alt) for alt in alternates_dict[alternate_id]),
+                int(lower_bounds[alternate_id]),
+                int(upper_bounds[alternate_id]),
+            ]
+            for alternate_id in set_alternates
+        ),
+        "params": params,
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    def __init__(
+        self,
+        max_size=config.SOLUTION_CACHE_SIZE,
+        ttl=config.SOLUTION_CACHE_TTL_SECONDS,
+        directory=config.SOLUTION_CACHE_DIR,
+        max_files=config.SOLUTION_CACHE_DIR_MAX_FILES,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.directory = directory or None
+        self.max_files = max_files
+        self._last_pruned = 0.0
+
+        # key -> (time stored, value), least recently used first
+        self._entries = OrderedDict()
+        # key -> the courses of the problem, for the entries put in this
+        # process
+        self._courses = {}
+        self._lock = threading.Lock()
+        self._catalog_lineage = None
+        self._catalog_generation = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, stored_at):
+        return self.ttl > 0 and time.time() - stored_at > self.ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def check_catalog(self, course_catalog):
+        """
+        Drops the in-process entries that can't be used anymore: all of them
+        when a different catalog was loaded, and those involving the
+        sections changed when the catalog was updated. (Keys already
+        include the catalog version, this just frees the memory of stale
+        entries.)
+        """
+        with self._lock:
+            if self._catalog_lineage != course_catalog.lineage:
+                self._entries.clear()
+                self._courses.clear()
+                self._catalog_lineage = course_catalog.lineage
+                self._catalog_generation = course_catalog.generation
+            elif course_catalog.generation > self._catalog_generation:
+                changed = course_catalog.changed_since(self._catalog_generation)
+                stale = [
+                    key
+                    for key, courses in self._courses.items()
+                    if not changed.isdisjoint(courses)
+                ]
+                for key in stale:
+                    self._entries.pop(key, None)
+                    del self._courses[key]
+                self._catalog_generation = course_catalog.generation
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                stored_at, value = self._entries[key]
+                if not self._expired(stored_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self._courses.pop(key, None)
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value, courses=()):
+        with self._lock:
+            self._store(key, value)
+            self._courses[key] = frozenset(courses)
+        self._write_disk(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._courses.pop(evicted, None)
+            self.evictions += 1
+
+    ########## DISK TIER ##############
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            if self._expired(os.path.getmtime(path)):
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, value):
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Written to a temporary file first so other workers never read a
+        # partially written entry.
+        temp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            pass
+        if time.monotonic() - self._last_pruned > PRUNE_INTERVAL_SECONDS:
+            self._last_pruned = time.monotonic()
+            self.prune()
+
+    def prune(self):
+        """
+        Deletes the expired entries of the cache directory (and temporary
+        files left behind by crashed writers), then the oldest entries
+        beyond max_files. Returns the number of files deleted. Other
+        workers may prune at the same time, files already gone are
+        skipped.
+        """
+        if self.directory is None:
+            return 0
+        files = []  # (mtime, path) of the entries kept so far
+        deleted = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith((".json", ".tmp")):
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime
+                    except OSError:
+                        continue
+                    if self._expired(mtime) or (
+                        # Temporary files are renamed right after they are
+                        # written
+                        entry.name.endswith(".tmp")
+                        and time.time() - mtime > PRUNE_INTERVAL_SECONDS
+                    ):
+                        deleted += self._remove(entry.path)
+                    elif entry.name.endswith(".json"):
+                        files.append((mtime, entry.path))
+        except OSError:
+            return deleted
+        if len(files) > self.max_files:
+            files.sort()
+            for _, path in files[: len(files) - self.max_files]:
+                deleted += self._remove(path)
+        return deleted
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._courses.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = SolutionCache()
+    return _default_cache
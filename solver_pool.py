@@ -0,0 +1,149 @@
+"""
+A bounded pool of reusable or-tools solvers.
+
+Every call to optimizer() used to add its variables and constraints to a
+single module-level solver, so the model kept growing with every request
+and two Dash callbacks running at the same time would write into the same
+model. Instead, each solve now borrows its own solver from the pool, and
+the solver is cleared before it is handed to the next request.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from ortools.linear_solver import pywraplp
+
+import config
+
+
+class SolverPool:
+    def __init__(
+        self,
+        backend=config.SOLVER_BACKEND,
+        max_concurrency=config.SOLVER_MAX_CONCURRENCY,
+        max_idle=config.SOLVER_POOL_SIZE,
+    ):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_idle = max_idle
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        # Queueing metrics
+        self._created = 0
+        self._acquired = 0
+        self._waited = 0
+        self._in_use = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def new_solver(self):
+        """
+        Creates a solver that isn't managed by the pool, e.g. for a model
+        that is kept around between requests. (See sessions.py)
+        """
+        solver = pywraplp.Solver.CreateSolver(self.backend)
+        if solver is None:
+            raise RuntimeError(f"Could not create a {self.backend} solver")
+        with self._lock:
+            self._created += 1
+        return solver
+
+    @contextmanager
+    def slot(self):
+        """
+        Holds one of the max_concurrency solve slots for the duration of
+        the with-block, waiting in line if they are all taken.
+        """
+        wait_start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._waited += 1
+                self._queued += 1
+                self._peak_queued = max(self._peak_queued, self._queued)
+            self._slots.acquire()
+            with self._lock:
+                self._queued -= 1
+        wait_time = time.perf_counter() - wait_start
+
+        with self._lock:
+            self._in_use += 1
+            self._acquired += 1
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def solver(self):
+        """
+        Borrows a solver with an empty model for the duration of the
+        with-block. Blocks while max_concurrency solves are already running.
+        """
+        with self.slot():
+            with self._lock:
+                solver = self._idle.pop() if self._idle else None
+            if solver is None:
+                solver = self.new_solver()
+            try:
+                yield solver
+            finally:
+                self._release(solver)
+
+    def _release(self, solver):
+        # Reset the model so the next request starts from scratch.
+        # A solver that can't be reset is simply dropped.
+        try:
+            solver.Clear()
+            # 0 removes any time limit set by the previous request
+            solver.SetTimeLimit(0)
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._lock:
+            if reusable and len(self._idle) < self.max_idle:
+                self._idle.append(solver)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "max_concurrency": self.max_concurrency,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "queued": self._queued,
+                "peak_queued": self._peak_queued,
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "total_wait_seconds": self._total_wait,
+                "max_wait_seconds": self._max_wait,
+            }
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    """
+    The pool shared by the whole process, created on first use. Solvers
+    themselves are only created when a solve actually needs one.
+    """
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = SolverPool()
+    return _default_pool